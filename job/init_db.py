@@ -2,7 +2,7 @@ import os
 import sqlite3
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(script_dir, 'job_queue.db')
+DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join(script_dir, 'job_queue.db'))
 
 conn = sqlite3.connect(DB_PATH, timeout=30)
 conn.execute("PRAGMA journal_mode=WAL;")
@@ -11,11 +11,15 @@ c = conn.cursor()
 # Create a table "jobs" with:
 # - id: primary key
 # - prompt: text prompt for the job
-# - status: job status (queued, running, completed, failed)
+# - status: job status (queued, running, completed, failed, cancelled)
 # - created_at: timestamp when job was added
 # - started_at: timestamp when job started processing
 # - completed_at: timestamp when job finished processing
 # - error_message: error message if the job failed
+# - batch_id: identifier shared by jobs submitted together with --batch
+# - profile: 1 if the job's run should be profiled
+# - pid: process id of the job's run.py while it is running
+# - cancel_requested: set by job_cancel.py; the worker stops the running job
 c.execute('''
 CREATE TABLE IF NOT EXISTS jobs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -24,10 +28,26 @@ CREATE TABLE IF NOT EXISTS jobs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     started_at TIMESTAMP,
     completed_at TIMESTAMP,
-    error_message TEXT
+    error_message TEXT,
+    batch_id TEXT,
+    profile INTEGER NOT NULL DEFAULT 0,
+    pid INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
 )
 ''')
 
+# Add columns introduced after the table was first created
+existing_columns = {row[1] for row in c.execute("PRAGMA table_info(jobs)")}
+if 'batch_id' not in existing_columns:
+    c.execute("ALTER TABLE jobs ADD COLUMN batch_id TEXT")
+if 'profile' not in existing_columns:
+    c.execute("ALTER TABLE jobs ADD COLUMN profile INTEGER NOT NULL DEFAULT 0")
+if 'pid' not in existing_columns:
+    c.execute("ALTER TABLE jobs ADD COLUMN pid INTEGER")
+if 'cancel_requested' not in existing_columns:
+    c.execute("ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+c.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+
 conn.commit()
 conn.close()
 
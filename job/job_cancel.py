@@ -0,0 +1,45 @@
+"""Cancel queued or running research jobs, by ID or by batch."""
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+DB_PATH = os.environ.get('JOB_DB_PATH', '/app/job/job_queue.db')
+
+def cancel_jobs(conn, job_ids=None, batch_id=None):
+    """Cancel queued jobs right away and ask the worker to stop running ones.
+
+    Returns the number of queued and running jobs affected.
+    """
+    if batch_id is not None:
+        where, params = "batch_id=?", (batch_id,)
+    else:
+        where, params = f"id IN ({','.join('?' * len(job_ids))})", tuple(job_ids)
+    with conn:
+        queued = conn.execute(
+            f"UPDATE jobs SET status='cancelled', completed_at=?, error_message='Cancelled before start' "
+            f"WHERE status='queued' AND {where}", (datetime.now(),) + params).rowcount
+        # The worker polls this flag, stops the job's run.py and marks the job cancelled
+        running = conn.execute(
+            f"UPDATE jobs SET cancel_requested=1 WHERE status='running' AND {where}", params).rowcount
+    return queued, running
+
+def main():
+    """Cancel the jobs or batch named on the command line."""
+    parser = argparse.ArgumentParser(description="Cancel queued or running research jobs.")
+    parser.add_argument("job_ids", nargs="*", type=int, help="IDs of the jobs to cancel")
+    parser.add_argument("--batch", metavar="BATCH_ID", help="Cancel every queued or running job of a batch")
+    args = parser.parse_args()
+
+    if not args.job_ids and not args.batch:
+        parser.print_usage()
+        sys.exit(1)
+
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    queued, running = cancel_jobs(conn, args.job_ids, args.batch)
+    conn.close()
+    print(f"Cancelled {queued} queued jobs; requested stop of {running} running jobs")
+
+if __name__ == "__main__":
+    main()
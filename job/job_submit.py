@@ -1,17 +1,77 @@
+import argparse
+import csv
+import json
 import os
 import sys
 import sqlite3
+import uuid
+
+DB_PATH = os.environ.get('JOB_DB_PATH', '/app/job/job_queue.db')
+
+def read_batch(path):
+    """Read topics from a JSONL or CSV file.
+
+    JSONL lines may be plain strings or objects with a "prompt" or "topic" key.
+    CSV files may have a "prompt" or "topic" header; otherwise the first column is used.
+    """
+    prompts = []
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith(('.jsonl', '.ndjson', '.json')):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                prompt = item if isinstance(item, str) else item.get('prompt') or item.get('topic')
+                if prompt:
+                    prompts.append(prompt.strip())
+        else:
+            rows = list(csv.reader(f))
+            if rows:
+                header = [h.strip().lower() for h in rows[0]]
+                column = next((header.index(k) for k in ('prompt', 'topic') if k in header), None)
+                if column is None:
+                    column = 0
+                else:
+                    rows = rows[1:]
+                prompts = [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+    return prompts
+
+def submit_batch(path, profile=False):
+    """Insert every topic in the file as one batch, in a single transaction."""
+    prompts = read_batch(path)
+    if not prompts:
+        print(f"No topics found in {path}")
+        sys.exit(1)
+    batch_id = uuid.uuid4().hex[:12]
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    with conn:
+        conn.executemany("INSERT INTO jobs (prompt, status, batch_id, profile) VALUES (?, 'queued', ?, ?)",
+                         [(prompt, batch_id, int(profile)) for prompt in prompts])
+    conn.close()
+    print(f"Batch {batch_id} added with {len(prompts)} jobs")
 
 def main():
     """Main function to submit a new job"""
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description="Submit a research job, or a batch of jobs.")
+    parser.add_argument("prompt", nargs="?", help="The job prompt, or a file containing it")
+    parser.add_argument("--batch", metavar="FILE", help="JSONL or CSV file with one topic per line, submitted as one batch")
+    parser.add_argument("--profile", action="store_true", help="Profile the run and write a flamegraph and hotspot report to _output")
+    args = parser.parse_args()
+
+    if args.batch:
+        submit_batch(args.batch, args.profile)
+        return
+
+    if args.prompt is None:
         if not sys.stdin.isatty():
             prompt = sys.stdin.read().strip()
         else:
             print("Usage: python3 job_submit.py \"Your job prompt here\" or provide a file path")
+            print("       python3 job_submit.py --batch topics.jsonl")
             sys.exit(1)
     else:
-        arg = sys.argv[1]
+        arg = args.prompt
         # If the argument is a file, read its contents; otherwise, treat it as the prompt.
         if os.path.exists(arg) and os.path.isfile(arg):
             with open(arg, 'r', encoding='utf-8') as f:
@@ -19,9 +79,9 @@ def main():
         else:
             prompt = arg
     
-    conn = sqlite3.connect('/app/job/job_queue.db')
+    conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
-    c.execute("INSERT INTO jobs (prompt, status) VALUES (?, 'queued')", (prompt,))
+    c.execute("INSERT INTO jobs (prompt, status, profile) VALUES (?, 'queued', ?)", (prompt, int(args.profile)))
     conn.commit()
     job_id = c.lastrowid
     conn.close()
@@ -0,0 +1,527 @@
+"""Offline load test of the job pipeline.
+
+Starts local stand-ins for Ollama, SearXNG and web pages with configurable
+latency distributions, the production graph server and one or more queue
+runners against a temporary job database, then submits jobs through
+job_submit.py at a chosen arrival rate and reports queue wait, end-to-end
+latency percentiles, throughput and resource usage.
+
+Latencies are given as distributions:
+    const:2          always 2 seconds
+    uniform:0.5,3    uniformly between 0.5 and 3 seconds
+    exp:1.5          exponential with a mean of 1.5 seconds
+    lognormal:1,0.5  lognormal with a median of 1 second and sigma 0.5
+
+Example:
+    python3 job/loadtest.py --jobs 40 --rate 10 --workers 2 --batch-concurrency 4
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import resource
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+JOB_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKE_MODEL = "loadtest-model"
+WORDS = ("research model latency throughput queue worker summary source evidence result analysis "
+         "system report data method finding context detail topic search page").split()
+
+def parse_latency(spec):
+    """Return a function sampling seconds from a latency spec such as 'lognormal:1,0.5'."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "const":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda: random.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def lorem(words):
+    """Return filler text.
+
+    Args:
+        words (int): Number of words
+
+    Returns:
+        str: Random words from WORDS separated by spaces
+    """
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+def free_port():
+    """Return a TCP port on 127.0.0.1 that is free at the time of the call.
+
+    Returns:
+        int: The port number
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class Stats:
+    """Request counts and peak concurrency of a fake server."""
+
+    def __init__(self):
+        """Start with no requests seen."""
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak = 0
+
+    def __enter__(self):
+        """Count a request as started."""
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def __exit__(self, *exc):
+        """Count a request as finished."""
+        with self.lock:
+            self.in_flight -= 1
+
+class QuietHandler(BaseHTTPRequestHandler):
+    """Request handler that does not log requests and speaks JSON."""
+
+    def log_message(self, format, *args):
+        """Discard the access log line."""
+
+    def send_json(self, obj, status=200):
+        """Send a JSON response.
+
+        Args:
+            obj: The JSON-serializable body
+            status (int, optional): The HTTP status. Defaults to 200.
+        """
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        """Return the JSON body of the request, or an empty dict if there is none."""
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+def make_ollama_handler(args, stats):
+    """Build a handler class imitating the Ollama API.
+
+    Chat requests with a ``format`` are answered with a JSON object filling
+    every property of the schema; other chat requests with filler text, at
+    the configured time to first token and token rate.
+
+    Args:
+        args (argparse.Namespace): The command line, for llm_ttft, tokens_per_second and summary_tokens
+        stats (Stats): Where requests are counted
+
+    Returns:
+        type: A QuietHandler subclass
+    """
+    ttft = parse_latency(args.llm_ttft)
+    title_counter = iter(range(1, 10**9))
+
+    def json_answer(schema):
+        # Fill every string property, with unique text so follow-up queries never repeat
+        properties = (schema or {}).get("properties") or {"response": {}}
+        return json.dumps({name: f"{name} {uuid.uuid4().hex[:8]} {lorem(8)}" for name in properties})
+
+    class OllamaHandler(QuietHandler):
+        def do_GET(self):
+            if self.path.startswith("/api/ps"):
+                self.send_json({"models": [{"name": FAKE_MODEL, "model": FAKE_MODEL}]})
+            elif self.path.startswith("/api/tags"):
+                self.send_json({"models": [{"name": FAKE_MODEL, "model": FAKE_MODEL}]})
+            else:
+                self.send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            request = self.read_json()
+            with stats:
+                if self.path.startswith("/api/generate"):
+                    # Title generation in run.py and model warm-up
+                    time.sleep(ttft())
+                    self.send_json({"model": request.get("model"), "response": f"loadtest_{next(title_counter)}", "done": True})
+                elif self.path.startswith("/api/chat"):
+                    self.chat(request)
+                else:
+                    self.send_json({"error": "not found"}, 404)
+
+        def chat(self, request):
+            fmt = request.get("format")
+            if fmt:
+                text = json_answer(fmt if isinstance(fmt, dict) else None)
+                pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+            else:
+                pieces = [w + " " for w in lorem(args.summary_tokens).split()]
+            time.sleep(ttft())
+            delay = 1.0 / args.tokens_per_second if args.tokens_per_second else 0.0
+            model = request.get("model")
+            done = {"model": model, "created_at": datetime.utcnow().isoformat() + "Z",
+                    "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                    "total_duration": 0, "load_duration": 0, "prompt_eval_count": 1, "eval_count": len(pieces)}
+            if not request.get("stream", True):
+                time.sleep(delay * len(pieces))
+                done["message"]["content"] = "".join(pieces)
+                self.send_json(done)
+                return
+            # Stream NDJSON until the connection closes, like the Ollama API
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            try:
+                for piece in pieces:
+                    chunk = {"model": model, "created_at": done["created_at"],
+                             "message": {"role": "assistant", "content": piece}, "done": False}
+                    self.wfile.write((json.dumps(chunk) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(delay)
+                self.wfile.write((json.dumps(done) + "\n").encode("utf-8"))
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped early, e.g. once its JSON object was complete
+                pass
+
+    return OllamaHandler
+
+def make_search_handler(args, stats, page_base):
+    """Build a handler class imitating the SearXNG JSON API.
+
+    Args:
+        args (argparse.Namespace): The command line, for search_latency
+        stats (Stats): Where requests are counted
+        page_base (str): Base URL of the fake page server the results link to
+
+    Returns:
+        type: A QuietHandler subclass returning three fresh results per query
+    """
+    latency = parse_latency(args.search_latency)
+
+    class SearchHandler(QuietHandler):
+        def do_GET(self):
+            with stats:
+                query = parse_qs(urlsplit(self.path).query).get("q", [""])[0]
+                time.sleep(latency())
+                results = []
+                for _ in range(3):
+                    page = uuid.uuid4().hex[:12]
+                    results.append({"url": f"{page_base}/page/{page}", "title": f"Page {page} about {query[:40]}",
+                                    "content": lorem(40)})
+                self.send_json({"query": query, "results": results})
+
+    return SearchHandler
+
+def make_page_handler(args, stats):
+    """Build a handler class serving HTML pages of filler text.
+
+    Args:
+        args (argparse.Namespace): The command line, for page_latency and page_kb
+        stats (Stats): Where requests are counted
+
+    Returns:
+        type: A QuietHandler subclass
+    """
+    latency = parse_latency(args.page_latency)
+    words = max(1, args.page_kb * 1024 // 8)
+
+    class PageHandler(QuietHandler):
+        def do_GET(self):
+            with stats:
+                time.sleep(latency())
+                paragraphs = "".join(f"<p>{lorem(100)}</p>" for _ in range(max(1, words // 100)))
+                body = f"<html><head><title>{self.path}</title></head><body><h1>{self.path}</h1>{paragraphs}</body></html>".encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+    return PageHandler
+
+def start_server(handler):
+    """Serve a handler class on a free local port from a daemon thread.
+
+    Args:
+        handler (type): The request handler class
+
+    Returns:
+        tuple: The server and its base URL
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def wait_for_http(url, timeout=120):
+    """Wait until a URL answers a GET with a success status.
+
+    Args:
+        url (str): The URL to poll
+        timeout (float, optional): Seconds to wait. Defaults to 120.
+
+    Raises:
+        RuntimeError: If the URL does not come up in time
+    """
+    import requests
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def percentile(values, p):
+    """Return a percentile of a list of numbers (nearest rank).
+
+    Args:
+        values (list): The numbers
+        p (float): The percentile, from 0 to 100
+
+    Returns:
+        float: The value at the percentile, or NaN for an empty list
+    """
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))
+    return values[index]
+
+def parse_time(value):
+    """Return the Unix time of an ISO 8601 timestamp from the job database, or None if it is empty."""
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+class ResourceSampler:
+    """Sample CPU and memory of this process and its children, if psutil is installed."""
+
+    def __init__(self, interval=1.0):
+        """Prepare to sample every interval seconds."""
+        self.interval = interval
+        self.cpu_samples = []
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        try:
+            import psutil
+            self.psutil = psutil
+        except ImportError:
+            self.psutil = None
+
+    def start(self):
+        """Start sampling in a daemon thread; does nothing without psutil."""
+        if self.psutil:
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+
+    def _run(self):
+        root = self.psutil.Process()
+        known = {}
+        while not self._stop.wait(self.interval):
+            try:
+                processes = [root] + root.children(recursive=True)
+            except self.psutil.Error:
+                continue
+            cpu, rss = 0.0, 0
+            for proc in processes:
+                try:
+                    # cpu_percent needs a previous call on the same Process object
+                    proc = known.setdefault(proc.pid, proc)
+                    cpu += proc.cpu_percent(None)
+                    rss += proc.memory_info().rss
+                except self.psutil.Error:
+                    continue
+            self.cpu_samples.append(cpu)
+            self.peak_rss = max(self.peak_rss, rss)
+
+def submit_job(env, prompt):
+    """Submit a job through job_submit.py, as a user would.
+
+    Args:
+        env (dict): Environment of the job_submit.py process, naming the job database
+        prompt (str): The research topic
+
+    Returns:
+        int: The ID of the new job
+    """
+    result = subprocess.run([sys.executable, os.path.join(JOB_DIR, "job_submit.py"), prompt],
+                            env=env, capture_output=True, text=True)
+    match = re.search(r"Job added with ID (\d+)", result.stdout)
+    if not match:
+        raise RuntimeError(f"job_submit.py failed: {result.stdout}{result.stderr}")
+    return int(match.group(1))
+
+def main():
+    """Run the load test described by the command line and print its results."""
+    parser = argparse.ArgumentParser(description="Load-test the job pipeline against local stand-in services.",
+                                     formatter_class=argparse.RawDescriptionHelpFormatter, epilog=__doc__)
+    parser.add_argument("--jobs", type=int, default=20, help="Number of jobs to submit")
+    parser.add_argument("--rate", type=float, default=0, help="Mean arrival rate in jobs per minute (Poisson); 0 submits all at once")
+    parser.add_argument("--workers", type=int, default=1, help="Number of queue_runner processes")
+    parser.add_argument("--batch-concurrency", type=int, default=4, help="BATCH_CONCURRENCY of each queue runner")
+    parser.add_argument("--server-workers", type=int, default=1, help="Worker processes of the graph server")
+    parser.add_argument("--max-concurrent-runs", type=int, default=4, help="Concurrent runs per server worker")
+    parser.add_argument("--loops", type=int, default=1, help="MAX_WEB_RESEARCH_LOOPS of each run")
+    parser.add_argument("--llm-ttft", default="lognormal:0.5,0.5", help="Latency before the first token of each LLM call")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Token rate of the fake model; 0 for instant")
+    parser.add_argument("--summary-tokens", type=int, default=300, help="Tokens in each generated summary")
+    parser.add_argument("--search-latency", default="lognormal:0.8,0.4", help="Latency of each search")
+    parser.add_argument("--page-latency", default="lognormal:0.3,0.8", help="Latency of each page fetch")
+    parser.add_argument("--page-kb", type=int, default=40, help="Size of each fake page in KB")
+    parser.add_argument("--poll-interval", type=float, default=5, help="JOB_POLL_INTERVAL of the queue runners")
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds to wait for all jobs to finish")
+    parser.add_argument("--json", metavar="FILE", help="Also write the results as JSON")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary directory with logs and outputs")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    llm_stats, search_stats, page_stats = Stats(), Stats(), Stats()
+    _, page_url = start_server(make_page_handler(args, page_stats))
+    _, search_url = start_server(make_search_handler(args, search_stats, page_url))
+    _, ollama_url = start_server(make_ollama_handler(args, llm_stats))
+    server_port = free_port()
+    server_url = f"http://127.0.0.1:{server_port}"
+
+    env = dict(os.environ,
+               JOB_DB_PATH=os.path.join(workdir, "jobs.db"),
+               JOB_OUTPUT_DIR=os.path.join(workdir, "output"),
+               JOB_POLL_INTERVAL=str(args.poll_interval),
+               BATCH_CONCURRENCY=str(args.batch_concurrency),
+               LANGGRAPH_URL=server_url,
+               OLLAMA_BASE_URL=ollama_url,
+               OLLAMA_BASE_URLS="",
+               LLM_PROVIDER="ollama",
+               LOCAL_LLM=FAKE_MODEL,
+               TITLE_LLM=FAKE_MODEL,
+               SEARCH_API="searxng",
+               SEARCH_FALLBACK_APIS="",
+               SEARXNG_URL=search_url,
+               FETCH_FULL_PAGE="true",
+               MAX_WEB_RESEARCH_LOOPS=str(args.loops),
+               WARM_UP_MODELS="false",
+               SHARED_CACHE_TTL="0",
+               RUN_DB_PATH=os.path.join(workdir, "runs.db"),
+               PYTHONUNBUFFERED="1")
+    for name in ("CASSETTE_MODE", "PROFILE", "WARM_START", "LOCAL_CORPUS_MODE"):
+        env.pop(name, None)
+
+    processes = []
+    sampler = ResourceSampler()
+    try:
+        subprocess.run([sys.executable, os.path.join(JOB_DIR, "init_db.py")], env=env, check=True, capture_output=True)
+        server_log = open(os.path.join(workdir, "server.log"), "w")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "ollama_deep_researcher.server", "--host", "127.0.0.1", "--port", str(server_port),
+             "--workers", str(args.server_workers), "--max-concurrent-runs", str(args.max_concurrent_runs)],
+            env=env, stdout=server_log, stderr=subprocess.STDOUT))
+        wait_for_http(f"{server_url}/ok")
+        for i in range(args.workers):
+            worker_log = open(os.path.join(workdir, f"worker{i}.log"), "w")
+            processes.append(subprocess.Popen([sys.executable, os.path.join(JOB_DIR, "queue_runner.py")],
+                                              env=env, stdout=worker_log, stderr=subprocess.STDOUT))
+
+        print(f"Submitting {args.jobs} jobs ({'all at once' if not args.rate else f'{args.rate:g}/min'}) "
+              f"to {args.workers} worker(s); logs in {workdir}")
+        sampler.start()
+        start = time.time()
+        submitted = {}
+        for i in range(args.jobs):
+            if args.rate and i:
+                time.sleep(random.expovariate(args.rate / 60.0))
+            submitted[submit_job(env, f"Load test topic {i}: {lorem(6)}")] = time.time()
+
+        deadline = start + args.timeout
+        conn = sqlite3.connect(env["JOB_DB_PATH"], timeout=30)
+        while time.time() < deadline:
+            pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+            if pending == 0:
+                break
+            time.sleep(1)
+        elapsed = time.time() - start
+        rows = conn.execute("SELECT id, status, started_at, completed_at FROM jobs").fetchall()
+        conn.close()
+    finally:
+        sampler.stop()
+        for proc in processes:
+            proc.terminate()
+        for proc in processes:
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    queue_waits, end_to_end, service = [], [], []
+    statuses = {}
+    for job_id, status, started_at, completed_at in rows:
+        statuses[status] = statuses.get(status, 0) + 1
+        submitted_at, started, completed = submitted.get(job_id), parse_time(started_at), parse_time(completed_at)
+        if submitted_at and started:
+            queue_waits.append(started - submitted_at)
+        if status == "completed" and submitted_at and completed:
+            end_to_end.append(completed - submitted_at)
+            service.append(completed - started)
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    completed = statuses.get("completed", 0)
+    results = {
+        "jobs": args.jobs,
+        "statuses": statuses,
+        "elapsed_seconds": elapsed,
+        "jobs_per_hour": completed / elapsed * 3600 if elapsed else 0.0,
+        "queue_wait": {f"p{p}": percentile(queue_waits, p) for p in (50, 95, 99)},
+        "end_to_end": {f"p{p}": percentile(end_to_end, p) for p in (50, 95, 99)},
+        "service_time": {f"p{p}": percentile(service, p) for p in (50, 95, 99)},
+        "llm": {"requests": llm_stats.requests, "peak_concurrency": llm_stats.peak},
+        "search": {"requests": search_stats.requests, "peak_concurrency": search_stats.peak},
+        "pages": {"requests": page_stats.requests, "peak_concurrency": page_stats.peak},
+        "resources": {
+            "children_cpu_seconds": usage.ru_utime + usage.ru_stime,
+            "children_max_rss_mb": usage.ru_maxrss / 1024,
+            "mean_cpu_percent": sum(sampler.cpu_samples) / len(sampler.cpu_samples) if sampler.cpu_samples else None,
+            "peak_rss_mb": sampler.peak_rss / 2**20 if sampler.psutil else None,
+        },
+    }
+
+    print(f"\nJobs: {statuses} in {elapsed:.0f}s, {results['jobs_per_hour']:.1f} jobs/hour")
+    for name in ("queue_wait", "end_to_end", "service_time"):
+        p = results[name]
+        print(f"{name:<14} p50 {p['p50']:>8.1f}s   p95 {p['p95']:>8.1f}s   p99 {p['p99']:>8.1f}s")
+    for name in ("llm", "search", "pages"):
+        print(f"{name:<14} {results[name]['requests']:>6} requests, peak {results[name]['peak_concurrency']} concurrent")
+    res = results["resources"]
+    print(f"resources      {res['children_cpu_seconds']:.1f} CPU-s in child processes, max child RSS {res['children_max_rss_mb']:.0f} MB")
+    if res["mean_cpu_percent"] is not None:
+        print(f"               mean CPU {res['mean_cpu_percent']:.0f}%, peak RSS of the process tree {res['peak_rss_mb']:.0f} MB")
+    else:
+        print("               install psutil for sampled CPU and process tree memory")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.keep:
+        print(f"Logs and outputs kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
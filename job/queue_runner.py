@@ -1,76 +1,249 @@
+"""Worker that runs queued research jobs from the job database.
+
+Each job runs as a separate run.py process. Single jobs and jobs of batches
+are claimed separately, so a long batch never holds up a single job; see
+``main`` for the concurrency limits.
+"""
+import os
 import sqlite3
 import subprocess
+import sys
+import tempfile
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 
-DB_PATH = '/app/job/job_queue.db'
-POLL_INTERVAL = 5  # seconds between polling for new jobs
+DB_PATH = os.environ.get('JOB_DB_PATH', '/app/job/job_queue.db')
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "5"))  # seconds between polling for new jobs
+RUN_SCRIPT = os.environ.get("RUN_SCRIPT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "run.py"))
+# Jobs of the same batch run this many at a time, so one topic's searches overlap another's LLM calls
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+# Wall-clock limit per job; a job still running after this is stopped and marked failed
+JOB_TIMEOUT = float(os.environ.get("JOB_TIMEOUT", "14400"))
+# Seconds a stopped job gets to exit after SIGTERM before it is killed
+KILL_GRACE = 10
+
+def get_next_job(conn, batched):
+    """Return the oldest queued job that is (batched=True) or is not (batched=False) part of a batch.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the job database
+        batched (bool): Whether to look for a batch job or a single job
 
-def get_next_job(conn):
+    Returns:
+        tuple: (id, prompt, batch_id, profile), or None if there is no such job
+    """
     c = conn.cursor()
-    c.execute("SELECT id, prompt FROM jobs WHERE status='queued' ORDER BY created_at LIMIT 1")
+    condition = "batch_id IS NOT NULL" if batched else "batch_id IS NULL"
+    c.execute(f"SELECT id, prompt, batch_id, profile FROM jobs WHERE status='queued' AND {condition} ORDER BY created_at, id LIMIT 1")
     return c.fetchone()
 
 def mark_job_running(conn, job_id):
+    """Claim a queued job; returns False if another worker claimed it first."""
     c = conn.cursor()
-    c.execute("UPDATE jobs SET status='running', started_at=? WHERE id=?",
+    c.execute("UPDATE jobs SET status='running', started_at=? WHERE id=? AND status='queued'",
               (datetime.now(), job_id))
     conn.commit()
+    return c.rowcount == 1
 
 def mark_job_completed(conn, job_id):
+    """Mark a job as completed.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the job database
+        job_id (int): The job
+    """
     c = conn.cursor()
     c.execute("UPDATE jobs SET status='completed', completed_at=? WHERE id=?",
               (datetime.now(), job_id))
     conn.commit()
 
 def mark_job_failed(conn, job_id, error_message):
+    """Mark a job as failed.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the job database
+        job_id (int): The job
+        error_message (str): Why the job failed, shown to the user
+    """
     c = conn.cursor()
     c.execute("UPDATE jobs SET status='failed', completed_at=?, error_message=? WHERE id=?",
               (datetime.now(), error_message, job_id))
     conn.commit()
 
-def run_job(prompt):
-    # Use the full path to run.py, since it's in /app/job
-    cmd = ['python3', '/app/job/run.py', prompt]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result
+def set_job_pid(conn, job_id, pid):
+    """Record the process ID of a running job, so job_cancel.py can find it.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the job database
+        job_id (int): The job
+        pid (int): Process ID of the job's run.py
+    """
+    c = conn.cursor()
+    c.execute("UPDATE jobs SET pid=? WHERE id=?", (pid, job_id))
+    conn.commit()
+
+def mark_job_cancelled(conn, job_id, message):
+    """Mark a job as cancelled.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the job database
+        job_id (int): The job
+        message (str): Note recorded as the job's error message
+    """
+    c = conn.cursor()
+    c.execute("UPDATE jobs SET status='cancelled', completed_at=?, error_message=? WHERE id=?",
+              (datetime.now(), message, job_id))
+    conn.commit()
+
+def cancel_requested(job_id):
+    """Return whether cancellation of a job was requested.
+
+    Args:
+        job_id (int): The job
+
+    Returns:
+        bool: True once job_cancel.py has flagged the job
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    row = conn.execute("SELECT cancel_requested FROM jobs WHERE id=?", (job_id,)).fetchone()
+    conn.close()
+    return bool(row and row[0])
+
+def stop_process(proc):
+    """Ask the job to exit, then kill it if it does not within KILL_GRACE seconds.
+
+    run.py's connection to the server closes with it, and the server cancels the run.
+    """
+    proc.terminate()
+    try:
+        proc.wait(timeout=KILL_GRACE)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+def run_job(job_id, prompt, batch_id=None, profile=False):
+    """Run a job's run.py, stopping it on cancellation or after JOB_TIMEOUT seconds.
+
+    Returns (returncode, stderr, stop_reason), where stop_reason is None if the job
+    exited by itself, or "cancelled" or "timed out".
+    """
+    # Use the full path to run.py, which sits next to this script
+    cmd = [sys.executable, RUN_SCRIPT, prompt]
+    if batch_id:
+        cmd += ['--batch-id', batch_id]
+    if profile:
+        cmd.append('--profile')
+    # Output goes to temporary files so a chatty job cannot block on a full pipe
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(cmd, stdout=stdout, stderr=stderr)
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        set_job_pid(conn, job_id, proc.pid)
+        conn.close()
+        deadline = time.time() + JOB_TIMEOUT
+        stop_reason = None
+        while True:
+            try:
+                proc.wait(timeout=POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel_requested(job_id):
+                stop_reason = "cancelled"
+            elif time.time() >= deadline:
+                stop_reason = "timed out"
+            if stop_reason:
+                print(f"Job {job_id} {stop_reason}; stopping process {proc.pid}")
+                stop_process(proc)
+                break
+        stderr.seek(0)
+        return proc.returncode, stderr.read().decode("utf-8", errors="replace"), stop_reason
+
+def process_job(job_id, prompt, batch_id=None, profile=False):
+    """Run a claimed job to the end and record its outcome in the job database.
+
+    Args:
+        job_id (int): The job, already marked running
+        prompt (str): The research topic
+        batch_id (str, optional): The batch the job belongs to. Defaults to None.
+        profile (bool, optional): Whether to profile the run. Defaults to False.
+    """
+    try:
+        returncode, stderr, stop_reason = run_job(job_id, prompt, batch_id, profile)
+        conn = sqlite3.connect(DB_PATH)
+        if stop_reason == "cancelled":
+            mark_job_cancelled(conn, job_id, "Cancelled while running")
+            print(f"Job {job_id} cancelled.")
+        elif stop_reason == "timed out":
+            mark_job_failed(conn, job_id, f"Timed out after {JOB_TIMEOUT:.0f}s")
+            print(f"Job {job_id} timed out after {JOB_TIMEOUT:.0f}s.")
+        elif returncode == 0:
+            mark_job_completed(conn, job_id)
+            print(f"Job {job_id} completed successfully.")
+        else:
+            error_message = stderr.strip() or "Unknown error"
+            mark_job_failed(conn, job_id, error_message)
+            print(f"Job {job_id} failed. Error: {error_message}")
+        conn.close()
+    except Exception as e:
+        conn = sqlite3.connect(DB_PATH)
+        mark_job_failed(conn, job_id, str(e))
+        conn.close()
+        print(f"Job {job_id} encountered an exception: {e}")
+
+def claim_next_job(batched):
+    """Claim the oldest queued job of the given kind, skipping jobs other workers claim first.
+
+    Args:
+        batched (bool): Whether to claim a batch job or a single job
+
+    Returns:
+        tuple: (id, prompt, batch_id, profile) of the claimed job, or None if there is none
+    """
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        while True:
+            job = get_next_job(conn, batched)
+            if job is None or mark_job_running(conn, job[0]):
+                return job
+    finally:
+        conn.close()
 
 def main():
+    """Poll for jobs and run them: one single job and up to BATCH_CONCURRENCY batch jobs at a time.
+
+    Single jobs do not wait for batches: the worker keeps claiming jobs whenever
+    a slot is free, while earlier jobs are still running.
+    """
     print("Worker started, polling for jobs...")
+    executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY + 1)
+    single = None
+    batch_jobs = set()
     while True:
-        conn = sqlite3.connect(DB_PATH)
-        job = get_next_job(conn)
-        if job is None:
-            conn.close()
-            time.sleep(POLL_INTERVAL)
-            continue
+        if single is not None and single.done():
+            single = None
+        batch_jobs = {future for future in batch_jobs if not future.done()}
 
-        job_id, prompt = job
-        print(f"Processing job {job_id} with prompt: {prompt}")
-        mark_job_running(conn, job_id)
-        conn.close()
+        if single is None:
+            job = claim_next_job(batched=False)
+            if job is not None:
+                job_id, prompt, _, profile = job
+                print(f"Processing job {job_id} with prompt: {prompt}")
+                single = executor.submit(process_job, job_id, prompt, profile=profile)
+        while len(batch_jobs) < BATCH_CONCURRENCY:
+            job = claim_next_job(batched=True)
+            if job is None:
+                break
+            job_id, prompt, batch_id, profile = job
+            print(f"Processing job {job_id} of batch {batch_id} with prompt: {prompt}")
+            batch_jobs.add(executor.submit(process_job, job_id, prompt, batch_id, profile))
 
-        try:
-            result = run_job(prompt)
-            if result.returncode == 0:
-                conn = sqlite3.connect(DB_PATH)
-                mark_job_completed(conn, job_id)
-                conn.close()
-                print(f"Job {job_id} completed successfully.")
-            else:
-                error_message = result.stderr.strip() if result.stderr else "Unknown error"
-                conn = sqlite3.connect(DB_PATH)
-                mark_job_failed(conn, job_id, error_message)
-                conn.close()
-                print(f"Job {job_id} failed. Error: {error_message}")
-        except Exception as e:
-            conn = sqlite3.connect(DB_PATH)
-            mark_job_failed(conn, job_id, str(e))
-            conn.close()
-            print(f"Job {job_id} encountered an exception: {e}")
-
-        # Short delay before next polling iteration
-        time.sleep(1)
+        running = batch_jobs | ({single} if single is not None else set())
+        if running:
+            # Wake up when a job finishes, or to pick up newly queued jobs
+            wait(running, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        else:
+            time.sleep(POLL_INTERVAL)
 
 if __name__ == "__main__":
     main()
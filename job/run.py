@@ -2,22 +2,36 @@ import os
 import requests
 import json
 import argparse
+import sys
 import time
 from datetime import datetime
+from urllib3.exceptions import ReadTimeoutError
+
+# Abort the run when no stream event arrives for this many seconds; heartbeats do not count.
+# Longer than the server's NODE_TIMEOUT, after which the server fails a run with a hung node
+# and reports it on the stream.
+STALL_TIMEOUT = float(os.environ.get("STALL_TIMEOUT", "2400"))
 
 # Set up argument parser
 parser = argparse.ArgumentParser(description="Run LangGraph query.")
 parser.add_argument("query", help="The research topic to investigate")
+parser.add_argument("--batch-id", help="Batch the job belongs to, recorded in the run metadata")
+parser.add_argument("--profile", action="store_true", help="Profile every graph node and write a flamegraph and hotspot report")
 args = parser.parse_args()
 
 # Generate file title using the gemma model via Ollama API
-ollama_base_url = "http://192.168.50.250:30068"  # from your compose file's OLLAMA_BASE_URL
+ollama_base_url = os.environ.get("OLLAMA_BASE_URL", "http://192.168.50.250:30068").rstrip("/")  # from your compose file's OLLAMA_BASE_URL
+title_model = os.environ.get("TITLE_LLM", "gemma3:27b-it-q8_0")
 title_url = f"{ollama_base_url}/api/generate"
 title_payload = {
-    "model": "gemma3:27b-it-q8_0",
+    "model": title_model,
     "prompt": f"Generate a short filename (no explanation) for the research topic: '{args.query}'. DO NOT include any reference to dates, months, or years. Use US file naming conventions. Output ONLY the filename, using only letters, numbers, hyphens, or underscores, with no spaces or extra punctuation.",
-    "stream": False
+    "stream": False,
+    # Keep the title model resident between jobs so each job does not pay a cold load
+    "keep_alive": os.environ.get("KEEP_ALIVE", "30m")
 }
+if os.environ.get("NUM_CTX"):
+    title_payload["options"] = {"num_ctx": int(os.environ["NUM_CTX"])}
 title_headers = {"Content-Type": "application/json"}
 title_response = requests.post(title_url, headers=title_headers, json=title_payload)
 title_response.raise_for_status()
@@ -34,8 +48,8 @@ file_title = file_title.replace(" ", "_")
 max_filename_length = 100  
 file_title = file_title[:max_filename_length]
 
-# Define the output directory relative to this script's location
-output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_output")
+# Define the output directory: JOB_OUTPUT_DIR, or _output next to this script
+output_dir = os.environ.get("JOB_OUTPUT_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "_output")
 if not os.path.exists(output_dir):
     os.makedirs(output_dir)
 
@@ -44,7 +58,7 @@ timestamp = datetime.now().strftime("%Y-%m-%d_%I-%M-%S_%p")
 output_filename = os.path.join(output_dir, f"{timestamp}_{file_title}.jsonl")
 
 # Target LangGraph streaming endpoint
-url = "http://192.168.50.250:2024/runs/stream"
+url = os.environ.get("LANGGRAPH_URL", "http://192.168.50.250:2024").rstrip("/") + "/runs/stream"
 
 # Input payload
 payload = {
@@ -56,27 +70,71 @@ payload = {
     "config": {
         "recursion_limit": 150
     },
-    "temporary": True
+    "temporary": True,
+    # Cancel the run on the server when this client goes away (stall, timeout or cancel)
+    "on_disconnect": "cancel"
 }
+if args.batch_id:
+    payload["metadata"] = {"batch_id": args.batch_id}
+# Summary tokens (and node profiles, if requested) arrive as custom stream events next to the state values
+payload["stream_mode"] = ["values", "custom"]
+if args.profile:
+    payload["config"]["configurable"] = {"profile": True}
 
 start_time = time.time()
-# Send the request
-response = requests.post(url, json=payload, stream=True)
+# Send the request; the read timeout catches a server that stops sending even heartbeats
+response = requests.post(url, json=payload, stream=True, timeout=(10, STALL_TIMEOUT))
 response.raise_for_status()
 
+
+def abort_stalled():
+    """Close the stream and exit with status 3, reporting the stall on stderr for the job record."""
+    response.close()
+    print(f"No stream events for {STALL_TIMEOUT:.0f}s; aborting the run", file=sys.stderr)
+    sys.exit(3)
+
+
+def stream_lines():
+    """Yield the lines of the response, aborting the run when a read times out.
+
+    Yields:
+        bytes: The next line of the event stream
+    """
+    try:
+        yield from response.iter_lines()
+    except requests.exceptions.ConnectionError as e:
+        if e.args and isinstance(e.args[0], ReadTimeoutError):
+            abort_stalled()
+        raise
+
+
 print("Streaming run output:")
+profiles = []
+# The summary being written is rendered to this file as its tokens arrive
+partial_filename = output_filename.replace(".jsonl", "_partial.md")
+partial_key = None
+partial_text = ""
+partial_written_at = 0.0
+first_output_time = None
 with open(output_filename, "w") as f:
     prev_status = None
-    for line in response.iter_lines():
+    event = None
+    last_event_time = time.time()
+    for line in stream_lines():
+        # Heartbeats keep the read timeout from firing, so check the time since the last event too
+        if time.time() - last_event_time > STALL_TIMEOUT:
+            abort_stalled()
         if line:
             decoded = line.decode("utf-8")
             print(f"Raw line: {decoded}")  # Debug print
-            # Skip heartbeat and event lines
+            # Skip heartbeat and event lines, remembering the event type
             if decoded.startswith(":"):
                 print("Skipping heartbeat line")
                 continue
             elif decoded.startswith("event:"):
                 print("Skipping event line:", decoded)
+                event = decoded[len("event:"):].strip()
+                last_event_time = time.time()
                 continue
             # Remove "data:" prefix if present
             elif decoded.startswith("data:"):
@@ -89,9 +147,41 @@ with open(output_filename, "w") as f:
                 print("Non-JSON data:", decoded)
                 continue
 
+            # Keep node profiles and summary tokens out of the values file
+            if event == "custom":
+                if isinstance(obj, dict) and "profile" in obj:
+                    profiles.append(obj["profile"])
+                elif isinstance(obj, dict) and "summary_token" in obj:
+                    token = obj["summary_token"]
+                    if first_output_time is None:
+                        first_output_time = time.time() - start_time
+                        print(f"First summary output after {first_output_time:.1f}s")
+                    # Each loop rewrites the whole summary, so start over when a new one begins
+                    key = (token["node"], token["loop"])
+                    if key != partial_key:
+                        partial_key, partial_text = key, ""
+                    partial_text += token["text"]
+                    if time.time() - partial_written_at >= 1.0 or token["node"] == "finalize_summary":
+                        with open(partial_filename, "w", encoding="utf-8") as partial:
+                            partial.write(partial_text)
+                        partial_written_at = time.time()
+                elif isinstance(obj, dict) and "summary_timing" in obj:
+                    timing = obj["summary_timing"]
+                    if partial_text:
+                        with open(partial_filename, "w", encoding="utf-8") as partial:
+                            partial.write(partial_text)
+                    if timing["ttft_seconds"] is not None:
+                        print(f"Summary of loop {timing['loop']}: first token after {timing['ttft_seconds']:.1f}s, "
+                              f"done after {timing['total_seconds']:.1f}s")
+                continue
+
             f.write(json.dumps(obj) + "\n")
             f.flush()
             os.fsync(f.fileno())
+            if event == "error":
+                # The run failed on the server, e.g. a node exceeded its timeout
+                print(f"Run failed: {obj}", file=sys.stderr)
+                sys.exit(1)
             # Print status updates if available (only on change)
             if "status" in obj:
                 if obj["status"] != prev_status:
@@ -109,6 +199,43 @@ os.rename(output_filename, new_output_filename)
 output_filename = new_output_filename  # update filename for subsequent processing
 print(f"Streaming complete. Run time: {hours}h {minutes}m. Output saved to {output_filename}")
 
+# -------------------------------
+# Write the node profiles as a flamegraph input and a hotspot report
+# -------------------------------
+
+if profiles:
+    folded = {}
+    self_samples = {}
+    for profile in profiles:
+        for stack, count in profile["folded"].items():
+            folded[stack] = folded.get(stack, 0) + count
+            leaf = stack.rsplit(";", 1)[-1]
+            self_samples[leaf] = self_samples.get(leaf, 0) + count
+    folded_filename = output_filename.replace(".jsonl", "_profile.folded")
+    with open(folded_filename, "w", encoding="utf-8") as out:
+        for stack, count in sorted(folded.items()):
+            out.write(f"{stack} {count}\n")
+
+    report_filename = output_filename.replace(".jsonl", "_profile.txt")
+    interval = profiles[0]["sample_interval"]
+    with open(report_filename, "w", encoding="utf-8") as out:
+        out.write(f"Profile of: {args.query}\n\n")
+        out.write(f"{'node':<22}{'wall s':>9}{'cpu s':>9}{'samples':>9}{'peak KB':>10}{'update KB':>11}{'serialize ms':>14}\n")
+        for profile in profiles:
+            peak = profile["peak_traced_kb"]
+            out.write(f"{profile['node']:<22}{profile['wall_seconds']:>9.2f}{profile['cpu_seconds']:>9.2f}{profile['samples']:>9}"
+                      f"{peak if peak is not None else '-':>10}{profile['update_bytes'] / 1024:>11.1f}{profile['serialize_seconds'] * 1000:>14.2f}\n")
+        total = sum(self_samples.values()) or 1
+        out.write(f"\nTop functions by samples at the top of the stack ({interval * 1000:.0f} ms interval, all nodes):\n")
+        for name, count in sorted(self_samples.items(), key=lambda item: -item[1])[:25]:
+            out.write(f"{count:>8} {count / total:>7.1%}  {name}\n")
+        for profile in profiles:
+            if profile["allocations"]:
+                out.write(f"\nLargest allocations in {profile['node']} (KB, blocks):\n")
+                for site, size_kb, blocks in profile["allocations"]:
+                    out.write(f"{size_kb:>10} {blocks:>8}  {site}\n")
+    print(f"Profile written to {folded_filename} and {report_filename}")
+
 # -------------------------------
 # Post-process output to extract summary and sources, then write markdown file
 # -------------------------------
@@ -138,5 +265,8 @@ if running_summary:
             for source in sources_gathered:
                 out.write(source.strip() + "\n")
     print(f"Clean Markdown summary written to {md_filename}")
+    # The final summary supersedes the progressively written one
+    if os.path.exists(partial_filename):
+        os.remove(partial_filename)
 else:
     print("No running_summary found in the output file.")
@@ -0,0 +1,334 @@
+"""Record and replay of a research run's external interactions.
+
+A run depends on a live LLM server and live search providers, so its
+performance cannot be reproduced offline. In record mode every LLM request
+(including streamed chunks and their timing), every search and every page
+fetch is appended to a cassette file. In replay mode the same interactions
+are answered from the cassette instead, optionally sleeping for the recorded
+latency scaled by a speed factor, so graph overhead, state handling and I/O
+paths can be benchmarked deterministically on a machine without network.
+
+The mode is process-wide and set through the environment:
+
+- ``CASSETTE_MODE``: ``off`` (default), ``record`` or ``replay``
+- ``CASSETTE_PATH``: the cassette file (JSON lines), defaults to ``cassette.jsonl``
+- ``CASSETTE_SPEED``: replay speed; 1 replays at recorded speed, 2 twice as fast,
+  0 without any delay. Defaults to 0.
+
+Replay looks interactions up by a hash of the request. Requests that changed
+since recording (for example prompts containing the current date) fall back
+to the next unused interaction of the same kind, in recorded order.
+
+Process-wide caches and stores would answer some requests without reaching
+the cassette, differently in each run, so ``main`` turns them off for both
+recording and replay (see ``ISOLATION_SETTINGS``). Set the same variables when
+enabling the cassette on a server.
+
+Run ``python -m ollama_deep_researcher.cassette --help`` to record or
+benchmark a run from the command line.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+logger = logging.getLogger(__name__)
+
+
+# Settings that keep every search and fetch on the cassette: no shared search and
+# fetch caches, no local corpus or report index, and no skipping of failed hosts
+ISOLATION_SETTINGS = {
+    "SHARED_CACHE_TTL": "0",
+    "LOCAL_CORPUS_MODE": "off",
+    "WARM_START": "false",
+    "FETCH_FAILURE_BACKOFF": "0",
+}
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when the cassette has no interaction left for a request."""
+
+
+def request_key(kind: str, request: Any) -> str:
+    """Return the hash identifying a request of the given kind."""
+    payload = json.dumps([kind, request], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """A file of recorded interactions, opened for recording or replay.
+
+    Args:
+        path (str): The cassette file
+        mode (str): ``record`` or ``replay``
+        speed (float, optional): Replay speed factor; 0 replays without delays. Defaults to 0.
+    """
+
+    def __init__(self, path: str, mode: str, speed: float = 0.0):
+        """Open ``path`` for appending in record mode, or load its interactions in replay mode."""
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.simulated_seconds = 0.0
+        self.replayed = 0
+        self._lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, deque] = {}
+        self._by_kind: Dict[str, deque] = {}
+        self._used: set = set()
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    def close(self) -> None:
+        """Close the record file; a replay cassette keeps no file open."""
+        if self.mode == "record":
+            self._file.close()
+
+    def _load(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                index = len(self._entries)
+                self._entries.append(entry)
+                self._by_key.setdefault(entry["key"], deque()).append(index)
+                self._by_kind.setdefault(entry["kind"], deque()).append(index)
+        logger.info("Loaded %d interactions from cassette %s", len(self._entries), self.path)
+
+    def record(self, kind: str, request: Any, response: Any, elapsed: float, **extra: Any) -> None:
+        """Append one interaction to the cassette."""
+        entry = {"kind": kind, "key": request_key(kind, request), "request": request,
+                 "response": response, "elapsed": round(elapsed, 6), **extra}
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def next(self, kind: str, request: Any) -> Dict[str, Any]:
+        """Return the recorded interaction for a request and mark it used.
+
+        Raises:
+            CassetteMiss: If no unused interaction of this kind is left
+        """
+        key = request_key(kind, request)
+        with self._lock:
+            index = self._pop_unused(self._by_key.get(key))
+            if index is None:
+                index = self._pop_unused(self._by_kind.get(kind))
+                if index is not None:
+                    logger.debug("No %s interaction recorded for this exact request; using the next in order", kind)
+            if index is None:
+                raise CassetteMiss(f"Cassette {self.path} has no {kind} interaction left")
+            self._used.add(index)
+            self.replayed += 1
+            return self._entries[index]
+
+    def _pop_unused(self, indexes: Optional[deque]) -> Optional[int]:
+        while indexes:
+            index = indexes.popleft()
+            if index not in self._used:
+                return index
+        return None
+
+    def delay(self, seconds: float) -> None:
+        """Sleep for a recorded latency, scaled by the replay speed."""
+        with self._lock:
+            self.simulated_seconds += seconds
+        if self.speed > 0 and seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def call(self, kind: str, request: Any, compute: Callable[[], Any]) -> Any:
+        """Record ``compute()`` for ``request``, or answer it from the cassette when replaying.
+
+        Exceptions raised while recording are recorded too and re-raised on replay
+        as ``RuntimeError`` with the original message, so failover paths replay as well.
+        """
+        if self.mode == "replay":
+            entry = self.next(kind, request)
+            self.delay(entry["elapsed"])
+            if "error" in entry:
+                raise RuntimeError(entry["error"])
+            return entry["response"]
+
+        start = time.monotonic()
+        try:
+            response = compute()
+        except Exception as e:
+            self.record(kind, request, None, time.monotonic() - start, error=f"{type(e).__name__}: {e}")
+            raise
+        self.record(kind, request, response, time.monotonic() - start)
+        return response
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Return the process-wide cassette, or None if ``CASSETTE_MODE`` is off."""
+    global _cassette
+    mode = os.environ.get("CASSETTE_MODE", "off").lower()
+    if mode not in ("record", "replay"):
+        return None
+    with _cassette_lock:
+        path = os.environ.get("CASSETTE_PATH", "cassette.jsonl")
+        if _cassette is None or _cassette.path != path or _cassette.mode != mode:
+            if _cassette is not None:
+                _cassette.close()
+            _cassette = Cassette(path, mode, float(os.environ.get("CASSETTE_SPEED", "0")))
+        return _cassette
+
+
+def _llm_request(model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]]) -> Dict[str, Any]:
+    return {
+        "messages": [[m.type, m.content] for m in messages],
+        "format": getattr(model, "format", None),
+        "stop": stop,
+    }
+
+
+class RecordingChatModel(BaseChatModel):
+    """Chat model that passes requests to ``inner`` and records them with their timing."""
+
+    inner: BaseChatModel
+    cassette: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recording-{self.inner._llm_type}"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        request = _llm_request(self.inner, messages, stop)
+        start = time.monotonic()
+        result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.cassette.record("llm", request, result.generations[0].message.content, time.monotonic() - start)
+        return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        request = _llm_request(self.inner, messages, stop)
+        start = time.monotonic()
+        chunks = []
+        try:
+            for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                chunks.append([round(time.monotonic() - start, 6), chunk.message.content])
+                yield chunk
+        finally:
+            # Also runs when the consumer stops early, e.g. once a JSON object is complete
+            self.cassette.record("llm", request, "".join(text for _, text in chunks),
+                                 time.monotonic() - start, chunks=chunks)
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers requests from a cassette."""
+
+    cassette: Any
+    format: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        entry = self.cassette.next("llm", _llm_request(self, messages, stop))
+        self.cassette.delay(entry["elapsed"])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=entry["response"]))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        entry = self.cassette.next("llm", _llm_request(self, messages, stop))
+        chunks = entry.get("chunks") or [[entry["elapsed"], entry["response"]]]
+        previous = 0.0
+        for offset, text in chunks:
+            self.cassette.delay(offset - previous)
+            previous = offset
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+def main(argv: List[str] = None) -> int:
+    """Record a run, or replay a cassette and report the end-to-end overhead."""
+    parser = argparse.ArgumentParser(description="Record a research run to a cassette, or replay one as a benchmark.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("topic", help="Research topic")
+    parser.add_argument("--cassette", default="cassette.jsonl", help="Cassette file")
+    parser.add_argument("--speed", type=float, default=0.0, help="Replay speed; 1 is recorded speed, 0 no delays")
+    parser.add_argument("--repeat", type=int, default=1, help="Number of replays to time")
+    args = parser.parse_args(argv)
+
+    if args.mode == "record" and os.path.exists(args.cassette):
+        parser.error(f"{args.cassette} already exists; choose a new cassette file")
+    os.environ.update(CASSETTE_MODE=args.mode, CASSETTE_PATH=args.cassette, CASSETTE_SPEED=str(args.speed))
+    os.environ.update(ISOLATION_SETTINGS)
+    os.environ.setdefault("WARM_UP_MODELS", "false")
+
+    from ollama_deep_researcher.graph import graph
+    from ollama_deep_researcher.shared_cache import configure_shared_caches
+
+    configure_shared_caches(0)
+
+    runs = args.repeat if args.mode == "replay" else 1
+    try:
+        for i in range(runs):
+            if args.mode == "replay":
+                # Start every replay from the beginning of the cassette
+                global _cassette
+                _cassette = None
+            start = time.monotonic()
+            graph.invoke({"research_topic": args.topic})
+            wall = time.monotonic() - start
+            cassette = get_cassette()
+            if args.mode == "record":
+                report = f"Recorded run in {wall:.2f}s to {args.cassette}"
+            else:
+                overhead = wall - (cassette.simulated_seconds / args.speed if args.speed else 0)
+                report = (f"Replay {i + 1}: {wall:.3f}s wall, {cassette.replayed} interactions, "
+                          f"{cassette.simulated_seconds:.2f}s recorded latency, {overhead:.3f}s overhead")
+            print(report)  # noqa: T201 - command-line output
+    finally:
+        if _cassette is not None:
+            _cassette.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Long-lived, pooled clients for search providers and page fetches.
+
+Building a client per query means a new connection pool, and usually a new
+TCP and TLS handshake, for every search and every fetched page. The clients
+here are created once per process and shared by all runs:
+
+- one ``httpx.Client`` per provider, with keep-alive connections and explicit
+  connect and read timeouts; ``httpx.Client`` is safe to share across threads;
+- one ``TavilyClient`` per API key;
+- one ``DDGS`` session per thread, since DDGS sessions are not thread-safe.
+
+Provider and backend libraries are still imported on first use.
+"""
+
+import os
+import threading
+from typing import Any, Dict
+
+import httpx
+
+CONNECT_TIMEOUT = 5.0  # seconds to establish a connection to any provider
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60.0)
+
+_http_clients: Dict[tuple, httpx.Client] = {}
+_tavily_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+_ddgs_local = threading.local()
+
+
+def get_http_client(name: str, read_timeout: float, follow_redirects: bool = False) -> httpx.Client:
+    """Return the process-wide HTTP client for a provider.
+
+    Args:
+        name (str): The provider the client is used for, e.g. "perplexity" or "fetch"
+        read_timeout (float): Seconds to wait for response data; also bounds writes and pool waits
+        follow_redirects (bool, optional): Whether to follow redirects. Defaults to False.
+
+    Returns:
+        httpx.Client: A client with keep-alive connections and explicit timeouts
+    """
+    key = (name, read_timeout, follow_redirects)
+    with _clients_lock:
+        client = _http_clients.get(key)
+        if client is None:
+            timeout = httpx.Timeout(read_timeout, connect=min(CONNECT_TIMEOUT, read_timeout))
+            client = _http_clients[key] = httpx.Client(
+                timeout=timeout, limits=POOL_LIMITS, follow_redirects=follow_redirects
+            )
+        return client
+
+
+def get_tavily_client() -> Any:
+    """Return the process-wide ``TavilyClient`` for the configured ``TAVILY_API_KEY``."""
+    api_key = os.environ.get("TAVILY_API_KEY", "")
+    with _clients_lock:
+        client = _tavily_clients.get(api_key)
+        if client is None:
+            from tavily import TavilyClient
+
+            client = _tavily_clients[api_key] = TavilyClient(api_key=api_key or None)
+        return client
+
+
+def get_ddgs(timeout: float) -> Any:
+    """Return this thread's ``DDGS`` session, creating it on first use.
+
+    Args:
+        timeout (float): Request timeout in seconds
+
+    Returns:
+        DDGS: A session reused by later searches on the same thread
+    """
+    sessions = getattr(_ddgs_local, "sessions", None)
+    if sessions is None:
+        sessions = _ddgs_local.sessions = {}
+    if timeout not in sessions:
+        from duckduckgo_search import DDGS
+
+        sessions[timeout] = DDGS(timeout=timeout)
+    return sessions[timeout]
+
+
+def close_clients() -> None:
+    """Close every pooled HTTP client, e.g. before the process exits."""
+    with _clients_lock:
+        for client in _http_clients.values():
+            client.close()
+        _http_clients.clear()
+        _tavily_clients.clear()
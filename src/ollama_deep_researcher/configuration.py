@@ -29,21 +29,116 @@ class Configuration(BaseModel):
         title="LLM Provider",
         description="Provider for the LLM (Ollama or LMStudio)"
     )
-    search_api: Literal["perplexity", "tavily", "duckduckgo"] = Field(
+    search_api: Literal["perplexity", "tavily", "duckduckgo", "searxng"] = Field(
         default="duckduckgo",
         title="Search API",
         description="Web search API to use"
     )
+    search_fallback_apis: str = Field(
+        default="",
+        title="Fallback Search APIs",
+        description="Comma-separated search APIs to fail over to, in order, when the primary fails or returns nothing"
+    )
+    search_timeout: float = Field(
+        default=30.0,
+        title="Search Timeout",
+        description="Seconds to wait for a search provider before failing over"
+    )
+    search_hedge_delay: float = Field(
+        default=0.0,
+        title="Search Hedge Delay",
+        description="Seconds to wait for a provider before also querying the next fallback; 0 disables hedging"
+    )
+    search_failure_threshold: int = Field(
+        default=3,
+        title="Search Failure Threshold",
+        description="Consecutive failures after which a search provider is skipped"
+    )
+    search_circuit_reset: float = Field(
+        default=120.0,
+        title="Search Circuit Reset",
+        description="Seconds a failing search provider is skipped before it is tried again"
+    )
+    query_similarity_threshold: float = Field(
+        default=0.7,
+        title="Query Similarity Threshold",
+        description="Follow-up queries at least this similar to a query already run are rewritten, or end the research if still redundant (0 disables the check)"
+    )
     fetch_full_page: bool = Field(
         default=True,
         title="Fetch Full Page",
         description="Include the full page content in the search results"
     )
+    fetch_failure_backoff: float = Field(
+        default=300.0,
+        title="Fetch Failure Backoff",
+        description="Seconds a host is skipped after a failed page fetch (timeout, connection or TLS error, 429/503), doubling with each consecutive failure; a 403 skips only that page; 0 disables skipping"
+    )
+    fetch_failure_backoff_max: float = Field(
+        default=3600.0,
+        title="Fetch Failure Backoff Max",
+        description="Maximum seconds a failing host is skipped"
+    )
+    shared_cache_ttl: float = Field(
+        default=3600.0,
+        title="Shared Cache TTL",
+        description="Seconds that search results and fetched pages are shared between concurrent runs; 0 disables sharing"
+    )
+    near_duplicate_distance: int = Field(
+        default=10,
+        title="Near-Duplicate Distance",
+        description="Maximum SimHash bit distance at which two sources count as near-duplicates; 0 disables the check"
+    )
     ollama_base_url: str = Field(
         default="http://localhost:11434/",
         title="Ollama Base URL",
         description="Base URL for Ollama API"
     )
+    ollama_base_urls: str = Field(
+        default="",
+        title="Ollama Endpoints",
+        description="Comma-separated Ollama base URLs to load-balance across; overrides Ollama Base URL when set"
+    )
+    endpoint_health_interval: float = Field(
+        default=15.0,
+        title="Endpoint Health Check Interval",
+        description="Seconds between health checks of each Ollama endpoint"
+    )
+    residency_check_interval: float = Field(
+        default=15.0,
+        title="Residency Check Interval",
+        description="Seconds the models loaded on an Ollama server are cached before it is polled again"
+    )
+    keep_alive: str = Field(
+        default="30m",
+        title="Ollama Keep Alive",
+        description="How long Ollama keeps the model loaded after a request (e.g. '30m', '-1' for indefinitely)"
+    )
+    num_ctx: int = Field(
+        default=0,
+        title="Ollama Context Length",
+        description="Context window (num_ctx) to load the model with; 0 uses the server default"
+    )
+    llm_timeout: float = Field(
+        default=600.0,
+        title="LLM Request Timeout",
+        description="Seconds an LLM or embedding request may wait to connect, or for the next part of a streamed response, before it fails"
+    )
+    llm_parallel_slots: int = Field(
+        default=4,
+        title="LLM Parallel Slots",
+        description="Maximum concurrent requests to the LLM backend across all runs in this process (match OLLAMA_NUM_PARALLEL); 0 disables the limit"
+    )
+    warm_up_models: bool = Field(
+        default=True,
+        title="Warm Up Models",
+        description="Pre-load the research, title and (with a local corpus) embedding models when the server starts"
+    )
+    title_llm: str = Field(
+        default="gemma3:27b-it-q8_0",
+        title="Title Model Name",
+        description="Ollama model the job runner uses to name report files"
+    )
     lmstudio_base_url: str = Field(
         default="http://localhost:1234/v1",
         title="LMStudio Base URL",
@@ -54,6 +149,111 @@ class Configuration(BaseModel):
         title="Strip Thinking Tokens",
         description="Whether to strip <think> tokens from model responses"
     )
+    early_stop_json: bool = Field(
+        default=True,
+        title="Early-Stop JSON Generation",
+        description="Stream query and reflection calls and stop as soon as the JSON object is complete"
+    )
+    max_reasoning_tokens: int = Field(
+        default=0,
+        title="Reasoning Token Budget",
+        description="Maximum <think> tokens allowed in query and reflection calls before giving up; 0 means unlimited"
+    )
+    json_repair_attempts: int = Field(
+        default=1,
+        title="JSON Repair Attempts",
+        description="How many times to ask the model to fix output that does not match the expected schema"
+    )
+    summarization_mode: Literal["single", "map_reduce"] = Field(
+        default="single",
+        title="Summarization Mode",
+        description="'single' summarizes all sources in one prompt; 'map_reduce' condenses each source chunk in parallel, then merges the notes into the summary"
+    )
+    map_chunk_tokens: int = Field(
+        default=2000,
+        title="Map Chunk Size",
+        description="Maximum tokens of source text per condensing call in map-reduce mode"
+    )
+    map_max_tokens_per_source: int = Field(
+        default=12000,
+        title="Map Tokens per Source",
+        description="Maximum tokens of each source's full content used in map-reduce mode"
+    )
+    map_concurrency: int = Field(
+        default=4,
+        title="Map Concurrency",
+        description="Number of condensing calls run in parallel in map-reduce mode"
+    )
+    node_timeout: int = Field(
+        default=1800,
+        title="Node Timeout",
+        description="Seconds a graph node may run before the server fails the run with a timeout (0 disables)"
+    )
+    profile: bool = Field(
+        default=False,
+        title="Profile Nodes",
+        description="Record sampled CPU stacks and allocation statistics for every node and emit them as custom stream events"
+    )
+    content_store_dir: str = Field(
+        default="",
+        title="Content Store Directory",
+        description="Directory for fetched research content referenced from the graph state; empty keeps it in memory"
+    )
+    content_store_max_mb: int = Field(
+        default=1024,
+        title="Content Store Size Limit",
+        description="Megabytes of content kept in the content store directory before the least recently used entries are deleted; 0 for no limit"
+    )
+    local_corpus_mode: Literal["off", "augment", "prefer"] = Field(
+        default="off",
+        title="Local Corpus Mode",
+        description="Use previously fetched content: 'augment' adds local hits to web results, 'prefer' skips the web search when enough local hits are found"
+    )
+    local_corpus_dir: str = Field(
+        default="~/.cache/ollama_deep_researcher/corpus",
+        title="Local Corpus Directory",
+        description="Directory where the local corpus index is stored"
+    )
+    local_corpus_embedding_model: str = Field(
+        default="",
+        title="Local Corpus Embedding Model",
+        description="Ollama embedding model for the local corpus; leave empty for lexical matching"
+    )
+    local_corpus_min_score: float = Field(
+        default=0.6,
+        title="Local Corpus Minimum Score",
+        description="Minimum score for a local corpus hit: the share of the query's terms a document contains with lexical matching, or the cosine similarity with an embedding model"
+    )
+    local_corpus_min_hits: int = Field(
+        default=2,
+        title="Local Corpus Minimum Hits",
+        description="Number of local hits needed to skip the web search in 'prefer' mode"
+    )
+    warm_start: bool = Field(
+        default=False,
+        title="Warm Start",
+        description="Seed a run with the summary and sources of a closely related finished report, and save each finished report for later runs"
+    )
+    warm_start_dir: str = Field(
+        default="~/.cache/ollama_deep_researcher/reports",
+        title="Report Index Directory",
+        description="Directory where finished reports are indexed for warm starts"
+    )
+    warm_start_min_score: float = Field(
+        default=0.8,
+        title="Warm Start Minimum Score",
+        description="Minimum topic similarity for a past report to seed a run"
+    )
+    warm_start_max_age_days: int = Field(
+        default=30,
+        title="Warm Start Maximum Age",
+        description="Only reports finished within this many days seed a run (0 for no limit)"
+    )
+    warm_start_loops: int = Field(
+        default=1,
+        title="Warm Start Research Depth",
+        description="Number of research iterations for a run seeded from a past report"
+    )
 
     @classmethod
     def from_runnable_config(
@@ -0,0 +1,172 @@
+"""Content-addressed store for large text kept outside of the graph state.
+
+Formatted web research results can be tens of kilobytes per loop. Keeping
+them in ``SummaryState`` means they are serialized into every streamed values
+event and every checkpoint. Instead, nodes put the text here and keep only a
+small reference (its SHA-256 hash and size) in the state.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+
+def content_key(text: str) -> str:
+    """Return the key under which ``text`` is stored."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class MemoryContentStore:
+    """In-process store that evicts the least recently used entries past a size limit."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """Create an empty store holding at most ``max_bytes`` characters."""
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, str] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        """Store ``text`` and return its key."""
+        key = content_key(text)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return key
+            self._items[key] = text
+            self._size += len(text)
+            while self._size > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+        return key
+
+    def get(self, key: str) -> str:
+        """Return the text stored under ``key``.
+
+        Raises:
+            KeyError: If the content was never stored or has been evicted
+        """
+        with self._lock:
+            text = self._items[key]
+            self._items.move_to_end(key)
+            return text
+
+
+class DiskContentStore:
+    """Store that keeps each entry in its own file, sharded by key prefix.
+
+    Reading an entry updates its modification time. When the entries exceed
+    ``max_bytes``, the least recently used ones are deleted until they take
+    at most nine tenths of it, so one eviction pass makes room for many puts.
+    Several processes can share the directory; each evicts based on what is
+    on disk at the time.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024 * 1024):
+        """Create the store in ``path``, measuring the entries already there."""
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """Return ``(mtime, size, path)`` for every stored entry."""
+        entries = []
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self, keep: str) -> None:
+        """Delete the least recently used entries, except ``keep``, down to 90% of ``max_bytes``."""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry_path in entries:
+            if size <= self.max_bytes * 0.9:
+                break
+            if entry_path == keep:
+                continue
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def put(self, text: str) -> str:
+        """Store ``text`` and return its key."""
+        key = content_key(text)
+        file_path = self._file(key)
+        try:
+            os.utime(file_path)
+            return key
+        except FileNotFoundError:
+            pass
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # Write to a temporary file first so readers never see partial content
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, file_path)
+        with self._lock:
+            self._size += os.path.getsize(file_path)
+            if self.max_bytes and self._size > self.max_bytes:
+                self._evict(keep=file_path)
+        return key
+
+    def get(self, key: str) -> str:
+        """Return the text stored under ``key``.
+
+        Raises:
+            KeyError: If the content was never stored or has been evicted
+        """
+        file_path = self._file(key)
+        try:
+            with open(file_path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            raise KeyError(key) from None
+        try:
+            os.utime(file_path)
+        except FileNotFoundError:
+            pass
+        return text
+
+
+_stores: Dict[str, Any] = {}
+_stores_lock = threading.Lock()
+
+
+def get_content_store(configurable: Any) -> Any:
+    """Return the process-wide content store for the configured directory.
+
+    An empty ``content_store_dir`` selects the in-memory store, which only
+    works while the graph runs in a single process.
+    """
+    path = os.path.expanduser(configurable.content_store_dir)
+    with _stores_lock:
+        if path not in _stores:
+            if path:
+                _stores[path] = DiskContentStore(path, configurable.content_store_max_mb * 1024 * 1024)
+            else:
+                _stores[path] = MemoryContentStore()
+        return _stores[path]
+
+
+def make_ref(store: Any, text: str, **metadata: Any) -> Dict[str, Any]:
+    """Put ``text`` into ``store`` and return a small reference to keep in the graph state."""
+    return {"ref": store.put(text), "chars": len(text), **metadata}
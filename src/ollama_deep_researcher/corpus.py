@@ -0,0 +1,422 @@
+"""Persistent local corpus of previously fetched web content.
+
+Every page and snippet gathered by ``web_research`` can be written to a local
+index so that later loops and later jobs can answer part of a query without
+going back to the web. Each document is stored as one JSON line; with an
+embedding model, its embedding is stored as a row of a flat float32 matrix
+next to it, so the index stays compact and is loaded in a single read.
+Without one, documents are matched by the share of the query's terms they
+contain.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only ordered within one process
+    fcntl = None
+
+from ollama_deep_researcher.utils import _QUERY_STOPWORDS, canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Maximum number of characters kept per stored document
+MAX_DOCUMENT_CHARS = 12000
+
+
+class LexicalEmbedder:
+    """Term-overlap scorer used when no embedding model is configured.
+
+    A short query shares few of the many terms of a fetched page, so cosine
+    similarity of bag-of-words vectors stays far below any useful threshold
+    even for relevant pages. Instead, a document scores the IDF-weighted share
+    of the query's terms that it contains: 1.0 when it contains all of them,
+    0.6 when it contains most of the distinctive ones. Documents are kept as
+    term sets and no vectors are stored.
+    """
+
+    key = "lexical"
+    stores_vectors = False
+
+    def terms(self, text: str) -> frozenset:
+        """Return the set of terms of a text, without stopwords and plural endings."""
+        terms = set()
+        for token in _TOKEN_RE.findall(text.lower()):
+            if token in _QUERY_STOPWORDS:
+                continue
+            if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+                token = token[:-1]
+            terms.add(token)
+        return frozenset(terms)
+
+    def scores(self, query: str, documents: List[frozenset]) -> np.ndarray:
+        """Score each document's term set against a query.
+
+        Args:
+            query (str): The search query
+            documents (List[frozenset]): Term sets of the indexed documents
+
+        Returns:
+            np.ndarray: One score between 0 and 1 per document
+        """
+        query_terms = self.terms(query)
+        scores = np.zeros(len(documents), dtype=np.float32)
+        if not query_terms or not documents:
+            return scores
+        # Terms found in many documents say little about relevance
+        weights = {
+            term: math.log(1.0 + len(documents) / (1.0 + sum(term in doc for doc in documents)))
+            for term in query_terms
+        }
+        total = sum(weights.values())
+        for i, doc in enumerate(documents):
+            scores[i] = sum(weight for term, weight in weights.items() if term in doc) / total
+        return scores
+
+
+class OllamaEmbedder:
+    """Embedder backed by the ``/api/embed`` endpoint of an Ollama server."""
+
+    stores_vectors = True
+
+    def __init__(self, base_url: str, model: str, timeout: float = 60.0):
+        """Embed with ``model`` on the server at ``base_url``, waiting up to ``timeout`` seconds per request."""
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.key = "ollama-" + re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts into a ``(len(texts), dim)`` float32 matrix."""
+        response = httpx.post(
+            f"{self.base_url}/api/embed",
+            json={"model": self.model, "input": texts},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        embeddings = response.json()["embeddings"]
+        return _normalize(np.asarray(embeddings, dtype=np.float32))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class CorpusIndex:
+    """Append-only on-disk index of documents and their embeddings.
+
+    The index lives in a directory containing ``documents.jsonl`` (one JSON
+    object per document) and, for embedders that store vectors, ``vectors.f32``
+    (a row-major float32 matrix with one row per document). Rows and lines are
+    kept aligned. Several processes (such as server workers) can share an
+    index: appends hold an exclusive ``fcntl`` lock on ``index.lock``, and each
+    process reads the documents others appended when it sees the files grow.
+    Anything past the last complete document when a writer takes the lock is
+    left over from an interrupted write and is cut off. In memory, vectors are
+    kept in a buffer that grows by doubling, so adding documents does not copy
+    the whole matrix each time.
+    """
+
+    def __init__(self, path: str, embedder: Any):
+        """Open (creating if needed) the index in ``path`` and load its documents."""
+        self.path = path
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._documents_path = os.path.join(path, "documents.jsonl")
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._lock_path = os.path.join(path, "index.lock")
+        self._documents: List[Dict[str, Any]] = []
+        # Bytes of documents.jsonl already read into memory
+        self._offset = 0
+        self._keys: set = set()
+        # Keys being embedded by an add() in this process
+        self._pending: set = set()
+        self._vectors: Optional[np.ndarray] = None
+        self._rows = 0
+        self._terms: List[frozenset] = []
+        os.makedirs(path, exist_ok=True)
+        with self._lock, self._file_lock(shared=True):
+            self._read_appended()
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        return len(self._documents)
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False) -> Iterator[None]:
+        """Hold the lock that orders appends to the index files across processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_appended(self) -> None:
+        """Read the documents appended to the files since the last read.
+
+        The caller holds ``self._lock`` and the file lock. A trailing line
+        without a newline, or a document without its vector row, is not read.
+        """
+        try:
+            size = os.path.getsize(self._documents_path)
+        except FileNotFoundError:
+            return
+        if size <= self._offset:
+            return
+        with open(self._documents_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        new_docs, lengths = [], []
+        for line in data.split(b"\n")[:-1]:
+            try:
+                new_docs.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            lengths.append(len(line) + 1)
+        if self.embedder.stores_vectors and new_docs:
+            dim = int(new_docs[0]["dim"])
+            start = self._rows * dim * 4
+            try:
+                available = (os.path.getsize(self._vectors_path) - start) // (dim * 4)
+            except FileNotFoundError:
+                available = 0
+            new_docs = new_docs[: max(available, 0)]
+            if new_docs:
+                vectors = np.fromfile(self._vectors_path, dtype=np.float32, count=len(new_docs) * dim, offset=start)
+                self._append_vectors(vectors.reshape(len(new_docs), dim))
+        elif new_docs:
+            self._terms.extend(self._document_terms(doc) for doc in new_docs)
+        self._documents.extend(new_docs)
+        self._keys.update(doc["key"] for doc in new_docs)
+        self._offset += sum(lengths[: len(new_docs)])
+
+    def _refresh(self) -> None:
+        """Read documents other processes appended, if the documents file has grown."""
+        try:
+            grown = os.path.getsize(self._documents_path) > self._offset
+        except FileNotFoundError:
+            return
+        if grown:
+            with self._lock, self._file_lock(shared=True):
+                self._read_appended()
+
+    def _document_terms(self, doc: Dict[str, Any]) -> frozenset:
+        return self.embedder.terms(f"{doc['title']}\n{doc['content']}\n{doc['raw_content'] or ''}")
+
+    def _append_vectors(self, vectors: np.ndarray) -> None:
+        """Append rows to the in-memory matrix, doubling its capacity when full."""
+        needed = self._rows + len(vectors)
+        if self._vectors is None or needed > len(self._vectors):
+            capacity = max(needed, 2 * (0 if self._vectors is None else len(self._vectors)), 64)
+            grown = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            if self._rows:
+                grown[: self._rows] = self._vectors[: self._rows]
+            self._vectors = grown
+        self._vectors[self._rows : needed] = vectors
+        self._rows = needed
+
+    def _write(self, docs: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Append documents (and their vectors) to the files and to memory.
+
+        The caller holds ``self._lock``. Documents another process stored in
+        the meantime are skipped.
+
+        Returns:
+            List[Dict[str, Any]]: The documents actually written
+        """
+        with self._file_lock():
+            self._read_appended()
+            keep = [i for i, doc in enumerate(docs) if doc["key"] not in self._keys]
+            docs = [docs[i] for i in keep]
+            # Drop the remains of an interrupted write so lines and rows stay aligned
+            if os.path.exists(self._documents_path):
+                os.truncate(self._documents_path, self._offset)
+            if vectors is not None and os.path.exists(self._vectors_path):
+                os.truncate(self._vectors_path, self._rows * vectors.shape[1] * 4)
+            if not docs:
+                return []
+            lines = "".join(json.dumps(doc) + "\n" for doc in docs).encode("utf-8")
+            if vectors is not None:
+                vectors = vectors[keep]
+                with open(self._vectors_path, "ab") as f:
+                    vectors.tofile(f)
+            with open(self._documents_path, "ab") as f:
+                f.write(lines)
+        self._offset += len(lines)
+        self._documents.extend(docs)
+        self._keys.update(doc["key"] for doc in docs)
+        if vectors is not None:
+            self._append_vectors(vectors)
+        else:
+            self._terms.extend(self._document_terms(doc) for doc in docs)
+        return docs
+
+    @staticmethod
+    def document_key(url: str) -> str:
+        """Return the key under which a document for ``url`` is stored."""
+        return hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+
+    def add(self, sources: List[Dict[str, Any]]) -> int:
+        """Add search results to the index, skipping URLs already stored.
+
+        Args:
+            sources (List[Dict[str, Any]]): Search results with ``title``, ``url``,
+                ``content`` and optionally ``raw_content`` keys, and an optional
+                ``metadata`` dict that is stored and returned with the document
+
+        Returns:
+            int: Number of documents actually added
+        """
+        self._refresh()
+        new_docs = []
+        with self._lock:
+            for source in sources:
+                url = source.get("url")
+                if not url:
+                    continue
+                key = self.document_key(url)
+                if key in self._keys or key in self._pending:
+                    continue
+                self._pending.add(key)
+                raw_content = source.get("raw_content") or ""
+                doc = {
+                    "key": key,
+                    "title": source.get("title") or url,
+                    "url": url,
+                    "content": (source.get("content") or "")[:MAX_DOCUMENT_CHARS],
+                    "raw_content": raw_content[:MAX_DOCUMENT_CHARS] or None,
+                }
+                if source.get("metadata"):
+                    doc["metadata"] = source["metadata"]
+                new_docs.append(doc)
+        if not new_docs:
+            return 0
+
+        vectors = None
+        if self.embedder.stores_vectors:
+            texts = [f"{doc['title']}\n{doc['content']}\n{doc['raw_content'] or ''}" for doc in new_docs]
+            try:
+                vectors = self.embedder.embed(texts).astype(np.float32)
+            except Exception as e:
+                logger.warning("Failed to embed %d documents for the local corpus: %s", len(new_docs), e)
+                with self._lock:
+                    self._pending.difference_update(doc["key"] for doc in new_docs)
+                return 0
+            for doc in new_docs:
+                doc["dim"] = vectors.shape[1]
+
+        with self._lock:
+            try:
+                return len(self._write(new_docs, vectors))
+            finally:
+                self._pending.difference_update(doc["key"] for doc in new_docs)
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0,
+               exclude_urls: Iterable[str] = ()) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return the ``k`` documents most similar to ``query``.
+
+        Args:
+            query (str): The search query
+            k (int, optional): Maximum number of documents to return. Defaults to 3.
+            min_score (float, optional): Minimum score for a hit: the cosine similarity with an
+                embedding model, or the share of query terms matched without one. Defaults to 0.0.
+            exclude_urls (Iterable[str], optional): URLs that must not be returned, compared
+                in canonical form. Defaults to none.
+
+        Returns:
+            List[Tuple[float, Dict[str, Any]]]: ``(score, result)`` pairs, best first, where each
+                result has the same shape as a search API result
+        """
+        self._refresh()
+        excluded = {self.document_key(url) for url in exclude_urls}
+        with self._lock:
+            # Rows past this view may be filled by a concurrent add, but never these
+            vectors = self._vectors[: self._rows] if self._vectors is not None else None
+            documents = list(self._documents)
+            terms = list(self._terms)
+        if not documents:
+            return []
+        if not self.embedder.stores_vectors:
+            scores = self.embedder.scores(query, terms)
+        else:
+            if vectors is None:
+                return []
+            try:
+                query_vector = self.embedder.embed([query])[0]
+            except Exception as e:
+                logger.warning("Failed to embed query for the local corpus: %s", e)
+                return []
+            if query_vector.shape[0] != vectors.shape[1]:
+                return []
+            scores = vectors @ query_vector
+        hits = []
+        for i in np.argsort(-scores):
+            score = float(scores[i])
+            if score < min_score or len(hits) == k:
+                break
+            doc = documents[i]
+            if doc["key"] in excluded:
+                continue
+            result = {
+                "title": doc["title"],
+                "url": doc["url"],
+                "content": doc["content"],
+                "raw_content": doc["raw_content"],
+            }
+            if "metadata" in doc:
+                result["metadata"] = doc["metadata"]
+            hits.append((score, result))
+        return hits
+
+
+_indexes: Dict[Tuple[str, str], CorpusIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_embedder(configurable: Any) -> Any:
+    """Return the embedder selected by ``local_corpus_embedding_model``."""
+    if configurable.local_corpus_embedding_model:
+        return OllamaEmbedder(configurable.ollama_base_url, configurable.local_corpus_embedding_model,
+                              timeout=configurable.llm_timeout)
+    return LexicalEmbedder()
+
+
+def get_corpus_index(configurable: Any, directory: Optional[str] = None) -> CorpusIndex:
+    """Return the process-wide corpus index for the given configuration.
+
+    Indexes are keyed by directory and embedder, so switching the embedding
+    model starts a separate index rather than mixing incompatible vectors.
+
+    Args:
+        configurable: The ``Configuration`` of the current run
+        directory (str, optional): Root directory of the index. Defaults to ``local_corpus_dir``.
+
+    Returns:
+        CorpusIndex: The shared index instance
+    """
+    embedder = get_embedder(configurable)
+    root = os.path.expanduser(directory or configurable.local_corpus_dir)
+    cache_key = (root, embedder.key)
+    with _indexes_lock:
+        if cache_key not in _indexes:
+            _indexes[cache_key] = CorpusIndex(os.path.join(root, embedder.key), embedder)
+        return _indexes[cache_key]
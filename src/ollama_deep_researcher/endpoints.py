@@ -0,0 +1,195 @@
+"""Routing of LLM requests across several Ollama endpoints.
+
+With more than one GPU host, every request picks an endpoint from a pool:
+
+- endpoints are health-checked periodically through ``/api/ps``, which also
+  reports which models each host currently has loaded; the checks run in a
+  background thread, so a request never waits for one;
+- hosts that already have the model loaded are preferred, so requests do not
+  trigger a model load elsewhere;
+- among those, the host with the fewest outstanding requests wins;
+- requests of the same run stick to the host they used before, as long as it
+  is healthy and not clearly busier than the others, so the server can reuse
+  its prompt cache for the run's shared prefix.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """State of one Ollama endpoint as seen by this process."""
+
+    def __init__(self, url: str):
+        """Track the endpoint at ``url``, assumed healthy and idle until checked."""
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.loaded_models: set = set()
+        self.checked_at = 0.0
+
+    def __repr__(self) -> str:
+        """Return the URL and load of the endpoint, for logs."""
+        return f"Endpoint({self.url!r}, outstanding={self.outstanding}, healthy={self.healthy})"
+
+
+class EndpointPool:
+    """Pick an endpoint for each request and track requests in flight.
+
+    Args:
+        urls (List[str]): Base URLs of the Ollama servers
+        health_interval (float, optional): Seconds between health checks of an endpoint.
+            Defaults to 15.
+        sticky_slack (int, optional): How many more outstanding requests than the least
+            loaded endpoint a run's sticky endpoint may have before the run moves.
+            Defaults to 2.
+    """
+
+    def __init__(self, urls: List[str], health_interval: float = 15.0, sticky_slack: int = 2):
+        """Create a pool of the endpoints at ``urls``, all assumed healthy until checked."""
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.health_interval = health_interval
+        self.sticky_slack = sticky_slack
+        self._sticky: OrderedDict[str, Endpoint] = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def check(self, endpoint: Endpoint) -> None:
+        """Refresh the health and loaded models of one endpoint."""
+        try:
+            response = httpx.get(f"{endpoint.url}/api/ps", timeout=2.0)
+            response.raise_for_status()
+            loaded = {m["name"] for m in response.json().get("models", [])}
+            healthy = True
+        except Exception as e:
+            if endpoint.healthy:
+                logger.warning("Endpoint %s failed its health check: %s", endpoint.url, e)
+            loaded, healthy = set(), False
+        with self._lock:
+            if healthy and not endpoint.healthy:
+                logger.info("Endpoint %s is healthy again", endpoint.url)
+            endpoint.healthy = healthy
+            endpoint.loaded_models = loaded
+            endpoint.checked_at = time.monotonic()
+
+    def refresh(self) -> Optional[threading.Thread]:
+        """Start health checks of the endpoints whose last check is older than the interval.
+
+        The checks run in a daemon thread, at most one at a time, and the
+        method returns without waiting for them.
+
+        Returns:
+            Optional[threading.Thread]: The thread running the checks, or None if none was started
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [e for e in self.endpoints if now - e.checked_at >= self.health_interval]
+            if not due or self._refreshing:
+                return None
+            self._refreshing = True
+        thread = threading.Thread(target=self._check_all, args=(due,), name="endpoint-health", daemon=True)
+        thread.start()
+        return thread
+
+    def _check_all(self, endpoints: List[Endpoint]) -> None:
+        try:
+            for endpoint in endpoints:
+                self.check(endpoint)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def choose(self, model: str, run_key: Optional[str] = None, exclude: Iterable[str] = ()) -> Endpoint:
+        """Select the endpoint for a request.
+
+        Args:
+            model (str): The model the request will use
+            run_key (str, optional): Identifier of the run, for sticky routing
+            exclude (Iterable[str], optional): URLs of endpoints to avoid while others
+                remain, e.g. those a retried request already failed on. Defaults to none.
+
+        Returns:
+            Endpoint: The chosen endpoint
+        """
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+        self.refresh()
+        excluded = set(exclude)
+        with self._lock:
+            remaining = [e for e in self.endpoints if e.url not in excluded] or list(self.endpoints)
+            candidates = [e for e in remaining if e.healthy] or remaining
+            least = min(e.outstanding for e in candidates)
+            sticky = self._sticky.get(run_key) if run_key else None
+            if sticky in candidates and sticky.outstanding <= least + self.sticky_slack:
+                chosen = sticky
+            else:
+                with_model = [e for e in candidates if model in e.loaded_models]
+                chosen = min(with_model or candidates, key=lambda e: e.outstanding)
+            if run_key:
+                self._sticky[run_key] = chosen
+                self._sticky.move_to_end(run_key)
+                while len(self._sticky) > 10000:
+                    self._sticky.popitem(last=False)
+            return chosen
+
+    @contextmanager
+    def acquire(self, model: str, run_key: Optional[str] = None, exclude: Iterable[str] = ()) -> Iterator[Endpoint]:
+        """Choose an endpoint and count the request as outstanding while the block runs.
+
+        A connection failure inside the block marks the endpoint unhealthy until
+        its next successful health check. See :meth:`choose` for the arguments.
+        """
+        endpoint = self.choose(model, run_key, exclude)
+        with self._lock:
+            endpoint.outstanding += 1
+        try:
+            yield endpoint
+            with self._lock:
+                # The request loaded the model there if it was not already
+                endpoint.loaded_models.add(model)
+        except (httpx.TransportError, ConnectionError):
+            with self._lock:
+                endpoint.healthy = False
+                endpoint.checked_at = time.monotonic()
+            logger.warning("Marking endpoint %s unhealthy after a connection error", endpoint.url)
+            raise
+        finally:
+            with self._lock:
+                endpoint.outstanding -= 1
+
+
+def endpoint_urls(configurable: Any) -> List[str]:
+    """Return the configured Ollama endpoint URLs, in order."""
+    urls = [u.strip() for u in configurable.ollama_base_urls.split(",") if u.strip()]
+    return urls or [configurable.ollama_base_url]
+
+
+_pools: Dict[tuple, EndpointPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_endpoint_pool(configurable: Any) -> EndpointPool:
+    """Return the process-wide pool for the configured Ollama endpoints."""
+    key = tuple(u.rstrip("/") for u in endpoint_urls(configurable))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = EndpointPool(list(key), health_interval=configurable.endpoint_health_interval)
+        return _pools[key]
+
+
+def get_run_key(config: Optional[dict]) -> Optional[str]:
+    """Return an identifier of the current run from a RunnableConfig, if there is one."""
+    if not config:
+        return None
+    configurable = config.get("configurable") or {}
+    metadata = config.get("metadata") or {}
+    key = configurable.get("thread_id") or configurable.get("run_id") or metadata.get("run_id")
+    return str(key) if key else None
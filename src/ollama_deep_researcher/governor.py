@@ -0,0 +1,188 @@
+"""Process-wide governor for requests to the LLM backend.
+
+Every run served from this process shares the backend's parallel slots. Left
+unmanaged, a short JSON control call (query generation, reflection) from one
+run waits behind long summarization calls from others. The governor limits
+in-flight requests per backend to the number of slots the server actually
+has, hands free slots to the highest priority waiter first, and records how
+long each priority class waited.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Priority classes; lower values are served first
+PRIORITY_CONTROL = 0  # short structured calls that gate the next step of a run
+PRIORITY_BULK = 1  # long generations such as summarization
+
+PRIORITY_NAMES = {PRIORITY_CONTROL: "control", PRIORITY_BULK: "bulk"}
+
+
+class PrioritySemaphore:
+    """Counting semaphore that wakes waiters by priority, then arrival order."""
+
+    def __init__(self, slots: int):
+        """Create a semaphore with ``slots`` free slots."""
+        self.slots = slots
+        self._in_use = 0
+        self._waiters: list = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority: int) -> None:
+        """Block until a slot is granted to the caller."""
+        with self._lock:
+            if self._in_use < self.slots and not self._waiters:
+                self._in_use += 1
+                return
+            granted = threading.Event()
+            heapq.heappush(self._waiters, (priority, next(self._counter), granted))
+        granted.wait()
+
+    def release(self) -> None:
+        """Release a slot, handing it directly to the best waiter if there is one."""
+        with self._lock:
+            if self._waiters:
+                _, _, granted = heapq.heappop(self._waiters)
+                granted.set()
+            else:
+                self._in_use -= 1
+
+    @property
+    def queued(self) -> int:
+        """Number of callers waiting for a slot."""
+        return len(self._waiters)
+
+    @property
+    def in_use(self) -> int:
+        """Number of slots currently held."""
+        return self._in_use
+
+    def queued_by_priority(self) -> Dict[int, int]:
+        """Return the number of callers waiting for a slot, per priority."""
+        with self._lock:
+            counts: Dict[int, int] = {}
+            for priority, _, _ in self._waiters:
+                counts[priority] = counts.get(priority, 0) + 1
+            return counts
+
+
+class LLMRequestGovernor:
+    """Limit and prioritize concurrent requests to one LLM backend.
+
+    Args:
+        name (str): Name of the backend, used in log messages
+        slots (int): Maximum number of requests in flight at once
+    """
+
+    def __init__(self, name: str, slots: int):
+        """Create the governor with its own semaphore and empty wait statistics."""
+        self.name = name
+        self.semaphore = PrioritySemaphore(slots)
+        self._waits: Dict[int, deque] = {p: deque(maxlen=1000) for p in PRIORITY_NAMES}
+        self._counts: Dict[int, int] = {p: 0 for p in PRIORITY_NAMES}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_BULK) -> Iterator[float]:
+        """Hold one backend slot for the duration of the block.
+
+        Args:
+            priority (int, optional): ``PRIORITY_CONTROL`` or ``PRIORITY_BULK``. Defaults to bulk.
+
+        Yields:
+            float: Seconds spent waiting for the slot
+        """
+        start = time.monotonic()
+        self.semaphore.acquire(priority)
+        waited = time.monotonic() - start
+        with self._lock:
+            self._waits[priority].append(waited)
+            self._counts[priority] += 1
+        if waited >= 1.0:
+            logger.info("%s request to %s waited %.1fs for a slot (%d still queued)",
+                        PRIORITY_NAMES[priority], self.name, waited, self.semaphore.queued)
+        try:
+            yield waited
+        finally:
+            self.semaphore.release()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Return queue-wait statistics per priority class over the recent requests."""
+        with self._lock:
+            snapshot = {p: sorted(w) for p, w in self._waits.items()}
+            counts = dict(self._counts)
+        queued = self.semaphore.queued_by_priority()
+        result = {}
+        for priority, waits in snapshot.items():
+            if waits:
+                stats = {
+                    "mean": sum(waits) / len(waits),
+                    "p50": waits[len(waits) // 2],
+                    "p95": waits[min(int(len(waits) * 0.95), len(waits) - 1)],
+                    "max": waits[-1],
+                }
+            else:
+                stats = {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+            result[PRIORITY_NAMES[priority]] = {"requests": counts[priority], "queued": queued.get(priority, 0), **stats}
+        return result
+
+
+class _UnlimitedGovernor:
+    """Stand-in used when the governor is disabled."""
+
+    @contextmanager
+    def slot(self, priority: int = PRIORITY_BULK) -> Iterator[float]:
+        yield 0.0
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+
+
+_governors: Dict[tuple, Any] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(configurable: Any, base_url: Optional[str] = None) -> Any:
+    """Return the process-wide governor for a backend endpoint.
+
+    Args:
+        configurable: The ``Configuration`` of the current run
+        base_url (str, optional): The endpoint the request goes to. Defaults to the
+            configured LMStudio or Ollama base URL.
+
+    Returns:
+        The governor for the backend, or a no-op governor if ``llm_parallel_slots`` is 0
+    """
+    if not configurable.llm_parallel_slots:
+        return _UnlimitedGovernor()
+    if base_url is None:
+        base_url = configurable.lmstudio_base_url if configurable.llm_provider == "lmstudio" else configurable.ollama_base_url
+    key = (base_url.rstrip("/"), configurable.llm_parallel_slots)
+    with _governors_lock:
+        if key not in _governors:
+            _governors[key] = LLMRequestGovernor(key[0], key[1])
+        return _governors[key]
+
+
+def governor_metrics() -> Dict[str, Dict[str, Any]]:
+    """Return the slots, requests in flight and queue-wait statistics of every backend governor.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Per backend URL, its ``slots``, ``in_flight``
+            and, per priority class, the ``LLMRequestGovernor.metrics`` figures
+    """
+    with _governors_lock:
+        governors = list(_governors.values())
+    return {
+        governor.name: {"slots": governor.semaphore.slots, "in_flight": governor.semaphore.in_use, **governor.metrics()}
+        for governor in governors
+    }
@@ -1,19 +1,63 @@
-import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 from typing_extensions import Literal
 
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
-from langchain_ollama import ChatOllama
+from langgraph.config import get_stream_writer
 from langgraph.graph import START, END, StateGraph
 
-from ollama_deep_researcher.configuration import Configuration, SearchAPI
-from ollama_deep_researcher.utils import deduplicate_and_format_sources, tavily_search, format_sources, perplexity_search, duckduckgo_search, searxng_search, strip_thinking_tokens, get_config_value
+from ollama_deep_researcher.configuration import Configuration
+from ollama_deep_researcher.content_store import get_content_store, make_ref
+from ollama_deep_researcher.search import get_search_orchestrator
+from ollama_deep_researcher.host_health import configure_host_health
+from ollama_deep_researcher.shared_cache import configure_shared_caches
+from ollama_deep_researcher.utils import canonicalize_url, deduplicate_and_format_sources, drop_near_duplicates, format_source_header, format_sources, most_similar_query, split_into_chunks, stream_text_completion, strip_thinking_tokens
 from ollama_deep_researcher.state import SummaryState, SummaryStateInput, SummaryStateOutput
-from ollama_deep_researcher.prompts import query_writer_instructions, summarizer_instructions, reflection_instructions, get_current_date
-from ollama_deep_researcher.lmstudio import ChatLMStudio
+from ollama_deep_researcher.prompts import NO_RELEVANT_INFORMATION, query_writer_instructions, summarizer_instructions, map_summarizer_instructions, reflection_instructions, get_current_date
+from ollama_deep_researcher.endpoints import get_run_key
+from ollama_deep_researcher.governor import PRIORITY_BULK
+from ollama_deep_researcher.llm import call_llm, generate_structured
+from ollama_deep_researcher.schemas import Reflection, SearchQuery
+from ollama_deep_researcher.profiling import in_profiled_thread, profiled
+
+logger = logging.getLogger(__name__)
 
 # Nodes
+def warm_start(state: SummaryState, config: RunnableConfig):
+    """LangGraph node that seeds the run from a related past report.
+    
+    When warm starts are enabled and a recent finished report's topic is close
+    enough to this one, the run starts from that report's summary, sources and
+    search queries, so its loops only go to gaps and fresher information.
+    
+    Args:
+        state: Current graph state containing the research topic
+        config: Configuration for the runnable, including warm start settings
+        
+    Returns:
+        Dictionary with state update seeding running_summary, sources_gathered,
+        queries_run and prior_report, or an empty update if there is no related report
+    """
+    configurable = Configuration.from_runnable_config(config)
+    if not configurable.warm_start:
+        return {}
+
+    from ollama_deep_researcher.reports import find_related_report
+
+    report = find_related_report(configurable, state.research_topic)
+    if report is None:
+        return {}
+    return {
+        "running_summary": report["summary"],
+        "sources_gathered": ["\n".join(report["sources"])],
+        "queries_run": report["queries"],
+        "prior_report": {"topic": report["topic"], "created_at": report["created_at"], "score": report["score"]},
+    }
+
 def generate_query(state: SummaryState, config: RunnableConfig):
     """LangGraph node that generates a search query based on the research topic.
     
@@ -39,46 +83,27 @@ def generate_query(state: SummaryState, config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
     print(f" Using config: {configurable.model_dump()}")
     
-    # Choose the appropriate LLM based on the provider
-    if configurable.llm_provider == "lmstudio":
-        llm_json_mode = ChatLMStudio(
-            base_url=configurable.lmstudio_base_url, 
-            model=configurable.local_llm, 
-            temperature=0, 
-            format="json"
-        )
-    else: # Default to Ollama
-        llm_json_mode = ChatOllama(
-            base_url=configurable.ollama_base_url, 
-            model=configurable.local_llm, 
-            temperature=0, 
-            format="json"
-        )
-    
-    result = llm_json_mode.invoke(
-        [SystemMessage(content=formatted_prompt),
-        HumanMessage(content=f"Generate a query for web search:")]
-    )
-    
-    # Get the content
-    content = result.content
-
-    # Parse the JSON response and get the query
-    try:
-        query = json.loads(content)
-        search_query = query['query']
-    except (json.JSONDecodeError, KeyError):
-        # If parsing fails or the key is not found, use a fallback query
-        if configurable.strip_thinking_tokens:
-            content = strip_thinking_tokens(content)
-        search_query = content
+    messages = [SystemMessage(content=formatted_prompt),
+                HumanMessage(content=f"Generate a query for web search:")]
+    query = generate_structured(configurable, messages, SearchQuery, run_key=get_run_key(config))
+
+    # If no valid query could be produced, search for the topic itself
+    search_query = query.query.strip() if query and query.query.strip() else state.research_topic
     return {"search_query": search_query}
 
 def web_research(state: SummaryState, config: RunnableConfig):
     """LangGraph node that performs web research using the generated search query.
     
     Executes a web search using the configured search API (tavily, perplexity, 
-    duckduckgo, or searxng) and formats the results for further processing.
+    duckduckgo, or searxng), failing over to the configured fallback APIs on
+    timeouts, errors or empty results, and formats the results for further processing.
+    When the local corpus is enabled, previously fetched content matching the
+    query and not yet used in this run is included and, in 'prefer' mode, can
+    replace the web search entirely.
+    New web results are added to the local corpus. Sources whose content nearly
+    duplicates one already used in this run are dropped before formatting.
+    The formatted results are kept in the content store; the state only gets a
+    reference to them.
     
     Args:
         state: Current graph state containing the search query and research loop count
@@ -91,32 +116,120 @@ def web_research(state: SummaryState, config: RunnableConfig):
     # Configure
     configurable = Configuration.from_runnable_config(config)
 
-    # Get the search API
-    search_api = get_config_value(configurable.search_api)
+    # Look up previously fetched content first
+    corpus = None
+    corpus_results = []
+    if configurable.local_corpus_mode != "off":
+        from ollama_deep_researcher.corpus import get_corpus_index
 
-    # Search the web
-    if search_api == "tavily":
-        search_results = tavily_search(state.search_query, fetch_full_page=configurable.fetch_full_page, max_results=1)
-        search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=3000, fetch_full_page=configurable.fetch_full_page)
-    elif search_api == "perplexity":
-        search_results = perplexity_search(state.search_query, state.research_loop_count)
-        search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=3000, fetch_full_page=configurable.fetch_full_page)
-    elif search_api == "duckduckgo":
-        search_results = duckduckgo_search(state.search_query, max_results=3, fetch_full_page=configurable.fetch_full_page)
-        search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=3000, fetch_full_page=configurable.fetch_full_page)
-    elif search_api == "searxng":
-        search_results = searxng_search(state.search_query, max_results=3, fetch_full_page=configurable.fetch_full_page)
-        search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=3000, fetch_full_page=configurable.fetch_full_page)
+        corpus = get_corpus_index(configurable)
+        # Sources already used in this run are not new material; lines have the form "* title : url"
+        seen_urls = [line.rsplit(" : ", 1)[-1] for text in state.sources_gathered for line in text.split("\n") if " : " in line]
+        hits = corpus.search(state.search_query, k=3, min_score=configurable.local_corpus_min_score, exclude_urls=seen_urls)
+        corpus_results = [result for _, result in hits]
+
+    # Search the web unless the local corpus already covers the query
+    if configurable.local_corpus_mode == "prefer" and len(corpus_results) >= configurable.local_corpus_min_hits:
+        web_results = []
+    else:
+        configure_shared_caches(configurable.shared_cache_ttl)
+        configure_host_health(configurable.fetch_failure_backoff, configurable.fetch_failure_backoff_max)
+        orchestrator = get_search_orchestrator(configurable)
+        search_results = orchestrator.search(state.search_query, configurable.fetch_full_page, state.research_loop_count)
+        web_results = search_results["results"]
+        if corpus is not None:
+            corpus.add(web_results)
+
+    # Drop sources that nearly duplicate one already used in this or an earlier loop
+    sources = corpus_results + web_results
+    new_fingerprints = []
+    if configurable.near_duplicate_distance:
+        sources, new_fingerprints = drop_near_duplicates(sources, state.content_fingerprints, configurable.near_duplicate_distance)
+
+    search_results = {"results": sources}
+
+    # Keep the formatted text in the content store and only a reference in the state
+    store = get_content_store(configurable)
+    if configurable.summarization_mode == "map_reduce" and sources:
+        # Keep each source separately, with more of its content and without its header, for the map step
+        unique_sources = {}
+        for source in sources:
+            unique_sources.setdefault(canonicalize_url(source["url"]), source)
+        char_limit = configurable.map_max_tokens_per_source * 4
+        source_refs = []
+        for source in unique_sources.values():
+            body = source["content"] or ""
+            raw_content = source.get("raw_content") if configurable.fetch_full_page else None
+            if raw_content:
+                truncated = len(raw_content) > char_limit
+                body += "\n\n" + raw_content[:char_limit] + ("... [truncated]" if truncated else "")
+            source_refs.append({"ref": store.put(body), "header": format_source_header(source)})
+        research_ref = {"source_refs": source_refs, "loop": state.research_loop_count + 1, "sources": len(sources)}
     else:
-        raise ValueError(f"Unsupported search API: {configurable.search_api}")
+        search_str = deduplicate_and_format_sources(search_results, max_tokens_per_source=3000, fetch_full_page=configurable.fetch_full_page)
+        research_ref = make_ref(store, search_str, loop=state.research_loop_count + 1, sources=len(sources))
+
+    return {"sources_gathered": [format_sources(search_results)], "research_loop_count": state.research_loop_count + 1, "web_research_results": [research_ref], "content_fingerprints": new_fingerprints, "queries_run": [state.search_query]}
+
+def condense_sources(research_topic: str, sources: list, configurable: Configuration) -> str:
+    """Condense source texts into notes relevant to the research topic (map step).
+    
+    Each source is split into chunks of at most ``map_chunk_tokens`` tokens and
+    every chunk is condensed by its own LLM call. Every chunk starts with the
+    source's title and URL, so notes from any chunk can be attributed. The
+    calls run in parallel, without a run key, so that they spread over all
+    configured endpoints.
+    
+    Args:
+        research_topic: The user's research topic
+        sources: ``(header, text)`` pairs of each source's title and URL lines and its content
+        configurable: Configuration of the current run
+        
+    Returns:
+        The notes of all chunks that contained relevant information, in source order
+    """
+    chunks = [
+        chunk
+        for header, text in sources
+        for chunk in split_into_chunks(text, configurable.map_chunk_tokens * 4, header=header)
+    ]
+    instructions = map_summarizer_instructions.format(research_topic=research_topic, no_relevant_information=NO_RELEVANT_INFORMATION)
 
-    return {"sources_gathered": [format_sources(search_results)], "research_loop_count": state.research_loop_count + 1, "web_research_results": [search_str]}
+    def condense(chunk: str) -> str:
+        result = call_llm(configurable, PRIORITY_BULK,
+                          lambda llm: llm.invoke([SystemMessage(content=instructions), HumanMessage(content=chunk)]))
+        notes = result.content
+        if configurable.strip_thinking_tokens:
+            notes = strip_thinking_tokens(notes)
+        return notes.strip()
+
+    with ThreadPoolExecutor(max_workers=max(1, configurable.map_concurrency)) as executor:
+        notes = list(executor.map(in_profiled_thread(condense), chunks))
+    return "\n\n".join(n for n in notes if _has_relevant_notes(n))
+
+def _has_relevant_notes(notes: str) -> bool:
+    """Return whether a map reply has notes, rather than the no-relevant-information reply.
+
+    The reply is expected to be the sentinel alone, but a model may still put
+    the source's title line before it; a reply without bullet points that
+    contains the sentinel counts as empty either way.
+    """
+    if not notes:
+        return False
+    if NO_RELEVANT_INFORMATION.lower() not in notes.lower():
+        return True
+    return any(line.lstrip().startswith(("- ", "* ")) for line in notes.splitlines())
 
 def summarize_sources(state: SummaryState, config: RunnableConfig):
     """LangGraph node that summarizes web research results.
     
     Uses an LLM to create or update a running summary based on the newest web research 
-    results, integrating them with any existing summary.
+    results, integrating them with any existing summary. The results are loaded
+    from the content store using the reference kept in the state. In map-reduce
+    mode each source is first condensed into notes in parallel, and the notes
+    take the place of the raw results. The summary is streamed to clients as
+    ``summary_token`` custom events while it is generated, followed by a
+    ``summary_timing`` event with the time to first token.
     
     Args:
         state: Current graph state containing research topic, running summary,
@@ -130,8 +243,16 @@ def summarize_sources(state: SummaryState, config: RunnableConfig):
     # Existing summary
     existing_summary = state.running_summary
 
-    # Most recent web research
-    most_recent_web_research = state.web_research_results[-1]
+    # Most recent web research, loaded from the content store
+    configurable = Configuration.from_runnable_config(config)
+    store = get_content_store(configurable)
+    research_ref = state.web_research_results[-1]
+    if research_ref.get("source_refs"):
+        # Map: condense each source in parallel; reduce: summarize the notes below
+        sources = [(source_ref["header"], store.get(source_ref["ref"])) for source_ref in research_ref["source_refs"]]
+        most_recent_web_research = condense_sources(state.research_topic, sources, configurable) or "No relevant information was found."
+    else:
+        most_recent_web_research = store.get(research_ref["ref"])
 
     # Build the human message
     if existing_summary:
@@ -146,30 +267,36 @@ def summarize_sources(state: SummaryState, config: RunnableConfig):
             f"<Search Results> \n {most_recent_web_research} \n <Search Results>"
         )
 
-    # Run the LLM
-    configurable = Configuration.from_runnable_config(config)
-    
-    # Choose the appropriate LLM based on the provider
-    if configurable.llm_provider == "lmstudio":
-        llm = ChatLMStudio(
-            base_url=configurable.lmstudio_base_url, 
-            model=configurable.local_llm, 
-            temperature=0
-        )
-    else:  # Default to Ollama
-        llm = ChatOllama(
-            base_url=configurable.ollama_base_url, 
-            model=configurable.local_llm, 
-            temperature=0
-        )
-    
-    result = llm.invoke(
-        [SystemMessage(content=summarizer_instructions),
-        HumanMessage(content=human_message_content)]
+    # Run the LLM on the endpoint chosen for this run, streaming the summary to clients as it is written
+    writer = get_stream_writer()
+    loop = state.research_loop_count
+    start = time.monotonic()
+    first_token = None
+
+    def emit(text: str) -> None:
+        nonlocal first_token
+        if first_token is None:
+            first_token = time.monotonic() - start
+        writer({"summary_token": {"node": "summarize_sources", "loop": loop, "text": text}})
+
+    running_summary = call_llm(
+        configurable,
+        PRIORITY_BULK,
+        lambda llm: stream_text_completion(
+            llm,
+            [SystemMessage(content=summarizer_instructions),
+            HumanMessage(content=human_message_content)],
+            emit,
+            strip_thinking=configurable.strip_thinking_tokens,
+        ),
+        run_key=get_run_key(config),
     )
+    total = time.monotonic() - start
+    writer({"summary_timing": {"node": "summarize_sources", "loop": loop, "ttft_seconds": first_token, "total_seconds": total}})
+    logger.info("Summary of loop %d: first token after %s, done after %.1fs", loop,
+                f"{first_token:.1f}s" if first_token is not None else "never", total)
 
     # Strip thinking tokens if configured
-    running_summary = result.content
     if configurable.strip_thinking_tokens:
         running_summary = strip_thinking_tokens(running_summary)
 
@@ -179,8 +306,11 @@ def reflect_on_summary(state: SummaryState, config: RunnableConfig):
     """LangGraph node that identifies knowledge gaps and generates follow-up queries.
     
     Analyzes the current summary to identify areas for further research and generates
-    a new search query to address those gaps. Uses structured output to extract
-    the follow-up query in JSON format.
+    a new search query to address those gaps. Uses schema-constrained structured
+    output to extract the follow-up query, retrying with a repair prompt if the
+    model's output does not validate. A query too similar to one already run is
+    sent back once for a rewrite; if it is still redundant, the search query is
+    cleared so the research ends instead of repeating a search.
     
     Args:
         state: Current graph state containing the running summary and research topic
@@ -190,60 +320,65 @@ def reflect_on_summary(state: SummaryState, config: RunnableConfig):
         Dictionary with state update, including search_query key containing the generated follow-up query
     """
 
-    # Generate a query
+    # Generate a query, telling the model which queries were already run
     configurable = Configuration.from_runnable_config(config)
-    
-    # Choose the appropriate LLM based on the provider
-    if configurable.llm_provider == "lmstudio":
-        llm_json_mode = ChatLMStudio(
-            base_url=configurable.lmstudio_base_url, 
-            model=configurable.local_llm, 
-            temperature=0, 
-            format="json"
-        )
-    else: # Default to Ollama
-        llm_json_mode = ChatOllama(
-            base_url=configurable.ollama_base_url, 
-            model=configurable.local_llm, 
-            temperature=0, 
-            format="json"
-        )
-    
-    result = llm_json_mode.invoke(
-        [SystemMessage(content=reflection_instructions.format(research_topic=state.research_topic)),
-        HumanMessage(content=f"Reflect on our existing knowledge: \n === \n {state.running_summary}, \n === \n And now identify a knowledge gap and generate a follow-up web search query:")]
-    )
-    
-    # Strip thinking tokens if configured
-    try:
-        # Try to parse as JSON first
-        reflection_content = json.loads(result.content)
-        # Get the follow-up query
-        query = reflection_content.get('follow_up_query')
-        # Check if query is None or empty
-        if not query:
-            # Use a fallback query
-            return {"search_query": f"Tell me more about {state.research_topic}"}
+    history = "\n".join(f"- {query}" for query in state.queries_run)
+    prior = ""
+    if state.prior_report and state.research_loop_count == 0:
+        # The summary is a past report seeded by warm_start; steer towards gaps and updates
+        written = datetime.fromtimestamp(state.prior_report["created_at"]).strftime("%B %d, %Y")
+        prior = (f"This summary comes from an earlier report on the related topic \"{state.prior_report['topic']}\", "
+                 f"written on {written}. Focus on what it does not cover for our topic and on what may have changed since then.\n")
+    messages = [SystemMessage(content=reflection_instructions.format(research_topic=state.research_topic)),
+                HumanMessage(content=f"{prior}Reflect on our existing knowledge: \n === \n {state.running_summary}, \n === \n"
+                                     f"These web searches have already been run: \n{history}\n === \n"
+                                     "And now identify a knowledge gap and generate a follow-up web search query that is clearly different from them:")]
+    reflection = generate_structured(configurable, messages, Reflection, run_key=get_run_key(config))
+
+    if reflection is None or not reflection.follow_up_query.strip():
+        # Use a fallback query
+        query = f"Tell me more about {state.research_topic}"
+    else:
+        query = reflection.follow_up_query
+
+    threshold = configurable.query_similarity_threshold
+    if not threshold:
         return {"search_query": query}
-    except (json.JSONDecodeError, KeyError, AttributeError):
-        # If parsing fails or the key is not found, use a fallback query
-        return {"search_query": f"Tell me more about {state.research_topic}"}
+
+    # Ask once for a different query if this one repeats an earlier search
+    previous, similarity = most_similar_query(query, state.queries_run)
+    if similarity >= threshold and reflection is not None:
+        messages += [AIMessage(content=reflection.model_dump_json()),
+                     HumanMessage(content=f"The follow-up query is too similar to \"{previous}\", which has already been searched. "
+                                          "Identify a different knowledge gap and generate a follow-up query that covers new ground:")]
+        rewritten = generate_structured(configurable, messages, Reflection, run_key=get_run_key(config))
+        if rewritten is not None and rewritten.follow_up_query.strip():
+            query = rewritten.follow_up_query
+            previous, similarity = most_similar_query(query, state.queries_run)
+
+    if similarity >= threshold:
+        # Another loop would only fetch results we already have
+        logger.info("Ending research: follow-up query %r repeats %r (similarity %.2f)", query, previous, similarity)
+        return {"search_query": None}
+    return {"search_query": query}
         
-def finalize_summary(state: SummaryState):
+def finalize_summary(state: SummaryState, config: RunnableConfig):
     """LangGraph node that finalizes the research summary.
     
     Prepares the final output by deduplicating and formatting sources, then
     combining them with the running summary to create a well-structured
-    research report with proper citations.
+    research report with proper citations. With warm starts enabled, the
+    report is also added to the report index for later related runs.
     
     Args:
         state: Current graph state containing the running summary and sources gathered
+        config: Configuration for the runnable, including warm start settings
         
     Returns:
         Dictionary with state update, including running_summary key containing the formatted final summary with sources
     """
 
-    # Deduplicate sources before joining
+    # Deduplicate sources by canonical URL before joining
     seen_sources = set()
     unique_sources = []
     
@@ -251,20 +386,34 @@ def finalize_summary(state: SummaryState):
         # Split the source into lines and process each individually
         for line in source.split('\n'):
             # Only process non-empty lines
-            if line.strip() and line not in seen_sources:
-                seen_sources.add(line)
+            if not line.strip():
+                continue
+            # Lines have the form "* title : url"
+            key = canonicalize_url(line.rsplit(" : ", 1)[-1]) if " : " in line else line
+            if key not in seen_sources:
+                seen_sources.add(key)
                 unique_sources.append(line)
     
+    configurable = Configuration.from_runnable_config(config)
+    if configurable.warm_start and state.running_summary:
+        from ollama_deep_researcher.reports import save_report
+
+        save_report(configurable, state.research_topic, state.running_summary, unique_sources, state.queries_run)
+
     # Join the deduplicated sources
     all_sources = "\n".join(unique_sources)
     state.running_summary = f"## Summary\n\n{state.running_summary}\n\n ### Sources:\n{all_sources}"
+    # Stream the finished report too, so clients need not wait for the final state
+    get_stream_writer()({"summary_token": {"node": "finalize_summary", "loop": state.research_loop_count, "text": state.running_summary}})
     return {"running_summary": state.running_summary}
 
 def route_research(state: SummaryState, config: RunnableConfig) -> Literal["finalize_summary", "web_research"]:
     """LangGraph routing function that determines the next step in the research flow.
     
     Controls the research loop by deciding whether to continue gathering information
-    or to finalize the summary based on the configured maximum number of research loops.
+    or to finalize the summary based on the configured maximum number of research loops,
+    or on ``warm_start_loops`` for runs seeded from a past report. Research also ends
+    when reflection found no follow-up query worth running.
     
     Args:
         state: Current graph state containing the research loop count
@@ -275,21 +424,39 @@ def route_research(state: SummaryState, config: RunnableConfig) -> Literal["fina
     """
 
     configurable = Configuration.from_runnable_config(config)
-    if state.research_loop_count <= configurable.max_web_research_loops:
+    if state.prior_report:
+        # Seeded runs skip generate_query and only do a few follow-up loops
+        more_loops = state.research_loop_count < configurable.warm_start_loops
+    else:
+        more_loops = state.research_loop_count <= configurable.max_web_research_loops
+    if state.search_query and more_loops:
         return "web_research"
     else:
         return "finalize_summary"
 
+def route_start(state: SummaryState) -> Literal["generate_query", "reflect_on_summary"]:
+    """LangGraph routing function that skips the initial query for warm-started runs.
+    
+    Args:
+        state: Current graph state, with prior_report set if the run was seeded
+        
+    Returns:
+        String literal indicating the next node to visit ("generate_query" or "reflect_on_summary")
+    """
+    return "reflect_on_summary" if state.prior_report else "generate_query"
+
 # Add nodes and edges
 builder = StateGraph(SummaryState, input=SummaryStateInput, output=SummaryStateOutput, config_schema=Configuration)
-builder.add_node("generate_query", generate_query)
-builder.add_node("web_research", web_research)
-builder.add_node("summarize_sources", summarize_sources)
-builder.add_node("reflect_on_summary", reflect_on_summary)
-builder.add_node("finalize_summary", finalize_summary)
+builder.add_node("warm_start", profiled("warm_start", warm_start))
+builder.add_node("generate_query", profiled("generate_query", generate_query))
+builder.add_node("web_research", profiled("web_research", web_research))
+builder.add_node("summarize_sources", profiled("summarize_sources", summarize_sources))
+builder.add_node("reflect_on_summary", profiled("reflect_on_summary", reflect_on_summary))
+builder.add_node("finalize_summary", profiled("finalize_summary", finalize_summary))
 
 # Add edges
-builder.add_edge(START, "generate_query")
+builder.add_edge(START, "warm_start")
+builder.add_conditional_edges("warm_start", route_start)
 builder.add_edge("generate_query", "web_research")
 builder.add_edge("web_research", "summarize_sources")
 builder.add_edge("summarize_sources", "reflect_on_summary")
@@ -0,0 +1,192 @@
+"""Process-wide health registry of the hosts pages are fetched from.
+
+Without it, every run that meets a dead or blocking host waits out the full
+fetch timeout again. The registry keeps, per host:
+
+- a negative cache of recent failures (timeouts, connection and TLS errors,
+  429/503 responses): after a failure the host is skipped for a backoff
+  period that doubles with each consecutive failure, or for as long as a 429
+  response's ``Retry-After`` asks. When the backoff expires one trial fetch
+  is let through, as with the search providers' circuit breakers;
+- a smoothed time to response headers and its variation, from which a
+  tighter fetch timeout is derived for hosts known to answer quickly.
+
+A 403 usually refuses one page (a paywall, a members-only path) rather than
+the whole site, so it only skips that page for the backoff period.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlsplit
+
+MIN_FETCH_TIMEOUT = 4.0  # seconds; adaptive timeouts never go below this
+MIN_LATENCY_SAMPLES = 3  # responses seen before a host's timeout adapts
+BLOCKING_STATUSES = {429, 503}  # the host refuses all requests for now
+REFUSED_PAGE_STATUSES = {403}  # the host refuses this page
+
+
+class HostHealth:
+    """Failure and latency record of one host."""
+
+    def __init__(self):
+        """Start with no failures and no latency samples."""
+        self.failures = 0
+        self.blocked_until = 0.0
+        self.last_error: Optional[str] = None
+        self.samples = 0
+        self.latency = 0.0
+        self.latency_var = 0.0
+
+    def observe_latency(self, seconds: float) -> None:
+        """Update the smoothed latency and its variation (as for TCP round-trip times)."""
+        if self.samples == 0:
+            self.latency, self.latency_var = seconds, seconds / 2
+        else:
+            self.latency_var = 0.75 * self.latency_var + 0.25 * abs(self.latency - seconds)
+            self.latency = 0.875 * self.latency + 0.125 * seconds
+        self.samples += 1
+
+
+def host_of(url: str) -> str:
+    """Return the lowercased host name of a URL, or '' if it has none."""
+    return (urlsplit(url).hostname or "").lower()
+
+
+def page_of(url: str) -> str:
+    """Return the lowercased host name and the path of a URL, ignoring the query."""
+    parts = urlsplit(url)
+    return (parts.hostname or "").lower() + parts.path
+
+
+class HostHealthRegistry:
+    """Negative cache and latency statistics for fetched hosts, shared by all runs.
+
+    Args:
+        backoff (float, optional): Seconds a host is skipped after its first failure;
+            0 disables skipping. Defaults to 300.
+        max_backoff (float, optional): Upper bound of the doubling backoff. Defaults to 3600.
+        max_hosts (int, optional): Maximum number of hosts, and of refused pages, tracked.
+            Defaults to 4096.
+    """
+
+    def __init__(self, backoff: float = 300.0, max_backoff: float = 3600.0, max_hosts: int = 4096):
+        """Create an empty registry."""
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_hosts = max_hosts
+        self.skipped = 0
+        self._hosts: OrderedDict[str, HostHealth] = OrderedDict()
+        self._refused_pages: OrderedDict[str, float] = OrderedDict()  # page -> skipped until
+        self._lock = threading.Lock()
+
+    def _get(self, host: str) -> HostHealth:
+        health = self._hosts.get(host)
+        if health is None:
+            health = self._hosts[host] = HostHealth()
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        self._hosts.move_to_end(host)
+        return health
+
+    def allow(self, url: str, trial_timeout: float) -> bool:
+        """Return whether a URL may be fetched now.
+
+        Args:
+            url (str): The URL about to be fetched
+            trial_timeout (float): Seconds the trial fetch after a backoff may take;
+                other fetches from the host are skipped meanwhile
+
+        Returns:
+            bool: False while the URL's host is backing off after failures, or
+                the page itself was refused recently
+        """
+        host = host_of(url)
+        with self._lock:
+            if not self.backoff:
+                return True
+            now = time.monotonic()
+            if now < self._refused_pages.get(page_of(url), 0.0):
+                self.skipped += 1
+                return False
+            health = self._hosts.get(host)
+            if health is None or health.failures == 0:
+                return True
+            if now < health.blocked_until:
+                self.skipped += 1
+                return False
+            # Half-open: let one trial fetch through
+            health.blocked_until = now + trial_timeout
+            return True
+
+    def timeout_for(self, url: str, default: float) -> float:
+        """Return the fetch timeout for a URL, adapted to its host's observed latency.
+
+        Args:
+            url (str): The URL about to be fetched
+            default (float): The timeout for hosts without enough history, and the upper bound
+
+        Returns:
+            float: Seconds to wait for the host
+        """
+        with self._lock:
+            health = self._hosts.get(host_of(url))
+            if health is None or health.samples < MIN_LATENCY_SAMPLES:
+                return default
+            adaptive = health.latency + 4 * health.latency_var
+        return min(default, max(MIN_FETCH_TIMEOUT, 2 * adaptive))
+
+    def record_response(self, url: str, status_code: int, latency: float, retry_after: Optional[str] = None) -> None:
+        """Record the response headers of a fetch, and whether the host refused it or the page."""
+        if status_code in BLOCKING_STATUSES:
+            self.record_failure(url, f"HTTP {status_code}", retry_after)
+            return
+        with self._lock:
+            if status_code in REFUSED_PAGE_STATUSES:
+                page = page_of(url)
+                self._refused_pages[page] = time.monotonic() + self.backoff
+                self._refused_pages.move_to_end(page)
+                while len(self._refused_pages) > self.max_hosts:
+                    self._refused_pages.popitem(last=False)
+            health = self._get(host_of(url))
+            health.observe_latency(latency)
+            health.failures = 0
+            health.blocked_until = 0.0
+            health.last_error = None
+
+    def record_failure(self, url: str, error: str, retry_after: Optional[str] = None) -> None:
+        """Record a failed fetch and start or extend the host's backoff.
+
+        Args:
+            url (str): The URL that failed
+            error (str): A short description of the failure
+            retry_after (str, optional): The ``Retry-After`` header of the response, if any
+        """
+        with self._lock:
+            health = self._get(host_of(url))
+            health.failures += 1
+            health.last_error = error
+            delay = min(self.max_backoff, self.backoff * 2 ** (health.failures - 1))
+            if retry_after and retry_after.strip().isdigit():
+                delay = min(self.max_backoff, max(delay, float(retry_after)))
+            health.blocked_until = time.monotonic() + delay
+
+    def status(self, url: str) -> Optional[str]:
+        """Return the last error of a URL's host while it is backing off, else None."""
+        with self._lock:
+            if time.monotonic() < self._refused_pages.get(page_of(url), 0.0):
+                return "HTTP 403"
+            health = self._hosts.get(host_of(url))
+            if health is None or time.monotonic() >= health.blocked_until:
+                return None
+            return health.last_error
+
+
+host_health = HostHealthRegistry()
+
+
+def configure_host_health(backoff: float, max_backoff: float) -> None:
+    """Set the backoff of the host health registry; a backoff of 0 disables skipping."""
+    host_health.backoff = backoff
+    host_health.max_backoff = max_backoff
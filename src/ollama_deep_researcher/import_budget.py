@@ -0,0 +1,81 @@
+"""Report the import-time cost of the package and check it against a budget.
+
+Worker cold start and per-job processes pay the import cost of everything the
+graph pulls in. This runs a fresh interpreter with ``python -X importtime``,
+attributes the cumulative time to top-level packages and prints the most
+expensive ones. It exits with status 1 when the total exceeds the budget, so
+it can run in CI::
+
+    python -m ollama_deep_researcher.import_budget --budget-ms 2000
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+_LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_imports(module: str, env: Dict[str, str] = None) -> List[Tuple[str, int, int, int]]:
+    """Import ``module`` in a fresh interpreter and return its import timings.
+
+    Args:
+        module (str): The module to import
+        env (Dict[str, str], optional): Environment for the child interpreter. Defaults
+            to the current environment.
+
+    Returns:
+        List[Tuple[str, int, int, int]]: ``(module, self_us, cumulative_us, depth)`` per imported module
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    timings = []
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return timings
+
+
+def summarize(timings: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """Sum the self time of every imported module by top-level package, in microseconds."""
+    totals: Dict[str, int] = {}
+    for name, self_us, _, _ in timings:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def main(argv: List[str] = None) -> int:
+    """Measure, print a report and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="ollama_deep_researcher.graph", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=3000.0, help="Maximum total import time in milliseconds")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list")
+    args = parser.parse_args(argv)
+
+    timings = measure_imports(args.module)
+    totals = summarize(timings)
+    total_ms = sum(totals.values()) / 1000
+
+    lines = [
+        f"Import of {args.module}: {total_ms:.0f} ms across {len(timings)} modules (budget {args.budget_ms:.0f} ms)",
+        f"{'package':<32} {'ms':>8} {'share':>7}",
+    ]
+    for package, us in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        lines.append(f"{package:<32} {us / 1000:>8.1f} {us / 1000 / total_ms:>7.1%}")
+    over_budget = total_ms > args.budget_ms
+    if over_budget:
+        lines.append(f"FAIL: import time {total_ms:.0f} ms exceeds budget of {args.budget_ms:.0f} ms")
+    print("\n".join(lines))  # noqa: T201 - command-line output
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
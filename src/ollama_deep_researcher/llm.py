@@ -0,0 +1,227 @@
+"""Chat model construction for the configured LLM provider."""
+
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional, Type, TypeVar
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from pydantic import BaseModel, ValidationError
+
+from ollama_deep_researcher.cassette import (
+    RecordingChatModel,
+    ReplayChatModel,
+    get_cassette,
+)
+from ollama_deep_researcher.configuration import Configuration
+from ollama_deep_researcher.endpoints import endpoint_urls, get_endpoint_pool
+from ollama_deep_researcher.governor import PRIORITY_CONTROL, get_governor
+from ollama_deep_researcher.residency import get_residency_manager
+from ollama_deep_researcher.utils import (
+    JsonObjectScanner,
+    stream_json_completion,
+    strip_thinking_tokens,
+)
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+T = TypeVar("T")
+
+
+def get_llm(
+    configurable: Configuration,
+    format: Optional[Any] = None,
+    temperature: float = 0,
+    base_url: Optional[str] = None,
+) -> BaseChatModel:
+    """Create a chat model for the configured provider.
+
+    For Ollama, the model is created with the configured ``keep_alive`` and
+    ``num_ctx`` so that it stays resident between nodes and runs, and a model
+    swap is logged if the model is not already loaded.
+
+    Args:
+        configurable (Configuration): The configuration of the current run
+        format (Any, optional): Output format, either "json" or a JSON schema dict. Defaults to None.
+        temperature (float, optional): Sampling temperature. Defaults to 0.
+        base_url (str, optional): Ollama endpoint to use instead of ``ollama_base_url``.
+            Defaults to None.
+
+    Returns:
+        BaseChatModel: The chat model to invoke
+    """
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        # Answer from the cassette without contacting the server
+        return ReplayChatModel(cassette=cassette, format=format)
+    llm = _build_llm(configurable, format, temperature, base_url)
+    if cassette is not None:
+        return RecordingChatModel(inner=llm, cassette=cassette)
+    return llm
+
+
+def _build_llm(
+    configurable: Configuration,
+    format: Optional[Any],
+    temperature: float,
+    base_url: Optional[str],
+) -> BaseChatModel:
+    """Create the provider's chat model; see :func:`get_llm`."""
+    # Provider integrations are imported on first use so a deployment only loads the one it uses
+    if configurable.llm_provider == "lmstudio":
+        from ollama_deep_researcher.lmstudio import ChatLMStudio
+
+        return ChatLMStudio(
+            base_url=configurable.lmstudio_base_url,
+            model=configurable.local_llm,
+            temperature=temperature,
+            format=format,
+            timeout=configurable.llm_timeout,
+        )
+
+    # Default to Ollama
+    from langchain_ollama import ChatOllama
+
+    base_url = base_url or configurable.ollama_base_url
+    residency = get_residency_manager(configurable, base_url)
+    residency.check_residency(configurable.local_llm)
+    kwargs: dict = {"keep_alive": configurable.keep_alive}
+    if configurable.num_ctx:
+        kwargs["num_ctx"] = configurable.num_ctx
+    return ChatOllama(
+        base_url=base_url,
+        model=configurable.local_llm,
+        temperature=temperature,
+        format=format,
+        # A stuck model would otherwise block the node (and its run) forever
+        client_kwargs={"timeout": configurable.llm_timeout},
+        **kwargs,
+    )
+
+
+@contextmanager
+def llm_call(
+    configurable: Configuration,
+    priority: int,
+    format: Optional[Any] = None,
+    run_key: Optional[str] = None,
+    tried: Optional[List[str]] = None,
+) -> Iterator[BaseChatModel]:
+    """Provide a chat model for one request, routed and governed.
+
+    For Ollama the request is routed to one of the configured endpoints
+    (health, loaded models, outstanding requests and run stickiness are taken
+    into account) and then waits for a slot on that endpoint's governor. For
+    LMStudio only the governor applies. The model must be used inside the block.
+
+    Args:
+        configurable (Configuration): The configuration of the current run
+        priority (int): Governor priority class of the request
+        format (Any, optional): Output format, either "json" or a JSON schema dict. Defaults to None.
+        run_key (str, optional): Identifier of the run, used for sticky routing. Defaults to None.
+        tried (List[str], optional): URLs of the endpoints this request already failed on,
+            which are avoided; the chosen endpoint's URL is appended. Defaults to None.
+
+    Yields:
+        BaseChatModel: The chat model to invoke
+    """
+    if configurable.llm_provider == "lmstudio":
+        with get_governor(configurable).slot(priority):
+            yield get_llm(configurable, format=format)
+        return
+
+    pool = get_endpoint_pool(configurable)
+    with pool.acquire(configurable.local_llm, run_key, exclude=tried or ()) as endpoint:
+        if tried is not None:
+            tried.append(endpoint.url)
+        with get_governor(configurable, endpoint.url).slot(priority):
+            yield get_llm(configurable, format=format, base_url=endpoint.url)
+
+
+def _is_connect_failure(error: Exception) -> bool:
+    """Return whether ``error`` means the request never reached the server, so it is safe to resend."""
+    # The ollama client turns httpx.ConnectError into a plain ConnectionError
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)) or type(error) is ConnectionError
+
+
+def call_llm(
+    configurable: Configuration,
+    priority: int,
+    call: Callable[[BaseChatModel], T],
+    format: Optional[Any] = None,
+    run_key: Optional[str] = None,
+) -> T:
+    """Make one LLM request through :func:`llm_call`, failing over once to another endpoint.
+
+    If the endpoint cannot be reached, it is marked unhealthy and the request
+    is sent once more to a different endpoint, when more than one is configured.
+
+    Args:
+        configurable (Configuration): The configuration of the current run
+        priority (int): Governor priority class of the request
+        call (Callable[[BaseChatModel], T]): Makes the request with the given chat model
+        format (Any, optional): Output format, either "json" or a JSON schema dict. Defaults to None.
+        run_key (str, optional): Identifier of the run, used for sticky routing. Defaults to None.
+
+    Returns:
+        T: What ``call`` returned
+    """
+    tried: List[str] = []
+    while True:
+        try:
+            with llm_call(configurable, priority, format=format, run_key=run_key, tried=tried) as llm:
+                return call(llm)
+        except Exception as e:
+            if len(tried) != 1 or len(endpoint_urls(configurable)) < 2 or not _is_connect_failure(e):
+                raise
+            logger.warning("Could not reach %s, retrying on another endpoint: %s", tried[0], e)
+
+
+def generate_structured(
+    configurable: Configuration,
+    messages: List[BaseMessage],
+    schema: Type[ModelT],
+    run_key: Optional[str] = None,
+) -> Optional[ModelT]:
+    """Generate a response constrained to ``schema`` and validate it.
+
+    The schema is passed to the backend for constrained decoding (Ollama
+    ``format`` schema, LMStudio ``json_schema`` response format). If the output
+    still fails validation, the model is shown its output and the error and
+    asked to correct it, up to ``configurable.json_repair_attempts`` times.
+
+    Args:
+        configurable (Configuration): The configuration of the current run
+        messages (List[BaseMessage]): The prompt messages
+        schema (Type[ModelT]): The pydantic model the output must match
+        run_key (str, optional): Identifier of the run, used for sticky routing. Defaults to None.
+
+    Returns:
+        Optional[ModelT]: The validated output, or None if every attempt failed
+    """
+    json_schema = schema.model_json_schema()
+    messages = list(messages)
+    for attempt in range(configurable.json_repair_attempts + 1):
+        # Short control calls jump ahead of long generations from other runs
+        def complete(llm: BaseChatModel) -> str:
+            if configurable.early_stop_json:
+                return stream_json_completion(llm, messages, configurable.max_reasoning_tokens)
+            return llm.invoke(messages).content
+
+        content = call_llm(configurable, PRIORITY_CONTROL, complete, format=json_schema, run_key=run_key)
+        json_text = JsonObjectScanner().feed(strip_thinking_tokens(content)) or content
+        try:
+            return schema.model_validate_json(json_text)
+        except ValidationError as e:
+            logger.warning("Invalid %s output (attempt %d): %s", schema.__name__, attempt + 1, e)
+            messages += [
+                AIMessage(content=content),
+                HumanMessage(content=(
+                    f"Your response did not match the required format: {e}\n"
+                    f"Respond again with only a JSON object matching this schema:\n{json.dumps(json_schema)}"
+                )),
+            ]
+    return None
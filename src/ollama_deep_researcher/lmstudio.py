@@ -1,31 +1,82 @@
 """LMStudio integration for the research assistant."""
 
-import json
 import logging
-from typing import Any, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 from langchain_core.callbacks.manager import CallbackManagerForLLMRun
 from langchain_core.messages import (
     BaseMessage,
 )
-from langchain_core.outputs import ChatResult
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
 from langchain_openai import ChatOpenAI
 from pydantic import Field
 
+from ollama_deep_researcher.utils import JsonObjectScanner, strip_thinking_tokens
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+def strict_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of a JSON schema that OpenAI-compatible strict mode accepts.
+    
+    Strict mode requires every property of an object to be listed in
+    ``required``, ``additionalProperties`` to be false, and no defaults. Fields
+    with defaults in the pydantic models are plain strings, so the model simply
+    fills them in.
+    
+    Args:
+        schema: A JSON schema, e.g. from ``model_json_schema()``
+    
+    Returns:
+        The adjusted copy of the schema
+    """
+    if isinstance(schema, list):
+        return [strict_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    strict = {key: strict_schema(value) for key, value in schema.items() if key != "default"}
+    if isinstance(schema.get("properties"), dict):
+        strict["properties"] = {name: strict_schema(prop) for name, prop in schema["properties"].items()}
+        strict["required"] = list(schema["properties"])
+        strict["additionalProperties"] = False
+    return strict
+
+def response_format_for(format: Optional[Union[str, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """Translate a ``format`` value into an OpenAI-style ``response_format``.
+    
+    Schemas are sent in strict mode, adjusted by :func:`strict_schema`.
+    
+    Args:
+        format: Either "json" for free-form JSON mode, or a JSON schema dict for
+            schema-constrained decoding
+    
+    Returns:
+        The ``response_format`` to send, or None for plain text
+    """
+    if format == "json":
+        return {"type": "json_object"}
+    if isinstance(format, dict):
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": format.get("title", "response"),
+                "strict": True,
+                "schema": strict_schema(format),
+            },
+        }
+    return None
+
 class ChatLMStudio(ChatOpenAI):
     """Chat model that uses LMStudio's OpenAI-compatible API."""
     
-    format: Optional[str] = Field(default=None, description="Format for the response (e.g., 'json')")
+    format: Optional[Union[str, Dict[str, Any]]] = Field(default=None, description="Format for the response ('json' or a JSON schema)")
     
     def __init__(
         self,
         base_url: str = "http://localhost:1234/v1",
         model: str = "qwen_qwq-32b",
         temperature: float = 0.7,
-        format: Optional[str] = None,
+        format: Optional[Union[str, Dict[str, Any]]] = None,
         api_key: str = "not-needed-for-local-models",
         **kwargs: Any,
     ):
@@ -35,7 +86,7 @@ class ChatLMStudio(ChatOpenAI):
             base_url: Base URL for LMStudio's OpenAI-compatible API
             model: Model name to use
             temperature: Temperature for sampling
-            format: Format for the response (e.g., "json")
+            format: Format for the response ("json" or a JSON schema dict)
             api_key: API key (not actually used, but required by OpenAI client)
             **kwargs: Additional arguments to pass to the OpenAI client
         """
@@ -59,38 +110,37 @@ class ChatLMStudio(ChatOpenAI):
         
         """Generate a chat response using LMStudio's OpenAI-compatible API."""
         
-        if self.format == "json":
-            # Set response_format for JSON mode
-            kwargs["response_format"] = {"type": "json_object"}
-            logger.info(f"Using response_format={kwargs['response_format']}")
+        response_format = response_format_for(self.format)
+        if response_format:
+            kwargs["response_format"] = response_format
+            logger.debug(f"Using response_format={response_format}")
         
         # Call the parent class's _generate method
         result = super()._generate(messages, stop, run_manager, **kwargs)
         
-        # If JSON format is requested, try to clean up the response
-        if self.format == "json" and result.generations:
-            try:
-                # Get the raw text
-                raw_text = result.generations[0][0].text
-                logger.info(f"Raw model response: {raw_text}")
+        # If JSON format is requested, strip anything around the JSON object
+        if response_format and result.generations:
+            raw_text = result.generations[0][0].text
+            logger.debug(f"Raw model response: {raw_text}")
+            json_text = JsonObjectScanner().feed(strip_thinking_tokens(raw_text))
+            if json_text is not None:
+                result.generations[0][0].text = json_text
+                result.generations[0][0].message.content = json_text
+            else:
+                logger.warning("Could not find a complete JSON object in response")
                 
-                # Try to find JSON in the response
-                json_start = raw_text.find('{')
-                json_end = raw_text.rfind('}') + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    # Extract just the JSON part
-                    json_text = raw_text[json_start:json_end]
-                    # Validate it's proper JSON
-                    json.loads(json_text)
-                    logger.info(f"Cleaned JSON: {json_text}")
-                    # Update the generation with the cleaned JSON
-                    result.generations[0][0].text = json_text
-                else:
-                    logger.warning("Could not find JSON in response")
-            except Exception as e:
-                logger.error(f"Error processing JSON response: {str(e)}")
-                # If any error occurs during cleanup, just use the original response
-                pass
-                
-        return result 
\ No newline at end of file
+        return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Stream a chat response using LMStudio's OpenAI-compatible API."""
+        response_format = response_format_for(self.format)
+        if response_format:
+            kwargs["response_format"] = response_format
+        
+        yield from super()._stream(messages, stop, run_manager, **kwargs)
@@ -0,0 +1,238 @@
+"""Opt-in per-node profiling of graph runs.
+
+With ``profile`` enabled for a run, every node is executed under a sampling
+profiler that records the node thread's stack every few milliseconds, and
+under ``tracemalloc`` to attribute the memory allocated while the node ran.
+The size and serialization time of the node's state update are measured too,
+since the server serializes every update into the stream and checkpoints.
+
+The result of each node is emitted as a ``custom`` stream event of the form
+``{"profile": {...}}``. Stacks are in the folded format (``frame;frame count``)
+used by flamegraph.pl and speedscope. ``job/run.py --profile`` collects the
+events into a flamegraph file and a hotspot report.
+
+Samples and CPU time cover the thread running the node and the pool threads
+doing work for it (search provider calls, map-reduce LLM calls), which are
+tagged with ``in_profiled_thread`` when submitted. Allocation statistics are
+process-wide, so they also include concurrent runs in the same process.
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.config import get_stream_writer
+
+from ollama_deep_researcher.configuration import Configuration
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TOP_N = 15
+
+
+class SamplingProfiler:
+    """Sample the stacks of a set of threads at a fixed interval, from a background thread.
+
+    Args:
+        thread_id (int): ``threading.get_ident()`` of the thread to sample; pool
+            threads working for it are added with ``add_thread`` while they do
+        interval (float, optional): Seconds between samples. Defaults to ``SAMPLE_INTERVAL``.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        """Prepare to sample ``thread_id``; sampling starts with ``start``."""
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self.worker_cpu = 0.0
+        self._threads: Dict[int, int] = {thread_id: 1}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def add_thread(self, thread_id: int) -> None:
+        """Start sampling a thread that works for the profiled one."""
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+
+    def remove_thread(self, thread_id: int, cpu_seconds: float) -> None:
+        """Stop sampling a worker thread and add the CPU time it spent on the work."""
+        with self._lock:
+            self._threads[thread_id] -= 1
+            if not self._threads[thread_id]:
+                del self._threads[thread_id]
+            self.worker_cpu += cpu_seconds
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread to exit."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                thread_ids = list(self._threads)
+            current = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = current.get(thread_id)
+                if frame is None:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{frame.f_globals.get('__name__', code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack = ";".join(reversed(frames))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                self.samples += 1
+
+
+_current_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar("profiler", default=None)
+
+
+def in_profiled_thread(func: Callable) -> Callable:
+    """Tag a callable submitted to a thread pool with the node profiling the caller, if any.
+
+    While the returned callable runs, its thread is sampled along with the
+    node's own thread and its CPU time is added to the node's.
+
+    Args:
+        func (Callable): The callable to run in a pool thread
+
+    Returns:
+        Callable: ``func`` itself when no profiler is active, else a wrapper
+    """
+    profiler = _current_profiler.get()
+    if profiler is None:
+        return func
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        thread_id = threading.get_ident()
+        cpu_start = time.thread_time()
+        profiler.add_thread(thread_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.remove_thread(thread_id, time.thread_time() - cpu_start)
+
+    return run
+
+
+_tracemalloc_users = 0
+_tracemalloc_lock = threading.Lock()
+
+
+def _start_tracemalloc() -> bool:
+    """Start tracemalloc unless something else already did; return whether this call owns it."""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            return False
+        if _tracemalloc_users == 0:
+            tracemalloc.start(10)
+        _tracemalloc_users += 1
+        return True
+
+
+def _stop_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def top_self_frames(stacks: Dict[str, int], top: int = TOP_N) -> List[List[Any]]:
+    """Return the functions with the most samples at the top of the stack, with their counts."""
+    counts: Dict[str, int] = {}
+    for stack, count in stacks.items():
+        leaf = stack.rsplit(";", 1)[-1]
+        counts[leaf] = counts.get(leaf, 0) + count
+    return [[name, count] for name, count in sorted(counts.items(), key=lambda item: -item[1])[:top]]
+
+
+def profile_node(name: str, func: Callable, state: Any, config: Optional[RunnableConfig], takes_config: bool) -> Any:
+    """Run one node under the profilers and emit its profile as a custom stream event."""
+    owns_tracemalloc = _start_tracemalloc()
+    before = tracemalloc.take_snapshot() if owns_tracemalloc else None
+    profiler = SamplingProfiler(threading.get_ident())
+    wall_start, cpu_start = time.monotonic(), time.thread_time()
+    token = _current_profiler.set(profiler)
+    profiler.start()
+    try:
+        update = func(state, config) if takes_config else func(state)
+    finally:
+        _current_profiler.reset(token)
+        profiler.stop()
+        wall = time.monotonic() - wall_start
+        cpu = time.thread_time() - cpu_start + profiler.worker_cpu
+        allocations = []
+        if owns_tracemalloc:
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            _stop_tracemalloc()
+            for stat in after.compare_to(before, "lineno")[:TOP_N]:
+                if stat.size_diff > 0:
+                    frame = stat.traceback[0]
+                    allocations.append([f"{frame.filename}:{frame.lineno}", round(stat.size_diff / 1024, 1), stat.count_diff])
+        else:
+            peak = None
+
+    serialize_start = time.monotonic()
+    update_bytes = len(json.dumps(update, default=str))
+    serialize_seconds = time.monotonic() - serialize_start
+
+    profile = {
+        "node": name,
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "samples": profiler.samples,
+        "sample_interval": profiler.interval,
+        "folded": {f"{name};{stack}": count for stack, count in profiler.stacks.items()},
+        "top_self": top_self_frames(profiler.stacks),
+        "allocations": allocations,
+        "peak_traced_kb": round(peak / 1024, 1) if peak is not None else None,
+        "update_bytes": update_bytes,
+        "serialize_seconds": round(serialize_seconds, 6),
+    }
+    logger.info("Profiled %s: %.2fs wall, %.2fs CPU, %d samples, %d byte update",
+                name, wall, cpu, profiler.samples, update_bytes)
+    try:
+        get_stream_writer()({"profile": profile})
+    except Exception as e:
+        logger.debug("Could not emit the profile of %s: %s", name, e)
+    return update
+
+
+def profiled(name: str, func: Callable) -> Callable:
+    """Wrap a node so that it is profiled when the run's configuration enables ``profile``.
+
+    Args:
+        name (str): The node name, used as the root frame of its stacks
+        func (Callable): The node function, taking ``(state)`` or ``(state, config)``
+
+    Returns:
+        Callable: A node taking ``(state, config)``
+    """
+    takes_config = func.__code__.co_argcount > 1
+
+    def node(state: Any, config: RunnableConfig) -> Any:
+        if not Configuration.from_runnable_config(config).profile:
+            return func(state, config) if takes_config else func(state)
+        return profile_node(name, func, state, config, takes_config)
+
+    node.__name__ = func.__name__
+    node.__doc__ = func.__doc__
+    return node
@@ -68,6 +68,29 @@ Produce an extensively detailed and verbose research report from the provided we
 </FORMATTING>
 """
 
+# Reply of the map step for an excerpt without relevant information
+NO_RELEVANT_INFORMATION = "No relevant information"
+
+map_summarizer_instructions = """
+<GOAL>
+Extract every piece of information from the source excerpt below that is relevant to the research topic: {research_topic}
+</GOAL>
+
+<REQUIREMENTS>
+1. Write concise factual notes, one point per bullet.
+2. Keep specific figures, dates, names, definitions, methods and findings exactly as stated.
+3. Note disagreements, caveats and limitations the source mentions.
+4. Do not add information that is not in the excerpt.
+5. If the excerpt contains nothing relevant to the topic, respond with exactly "{no_relevant_information}" and nothing else, without the title and URL line.
+</REQUIREMENTS>
+
+<FORMATTING>
+- Otherwise, start with the source title and URL on one line.
+- Follow with Markdown bullet points.
+- DO NOT use XML tags in your output.
+</FORMATTING>
+"""
+
 reflection_instructions = """You are an expert research assistant performing a detailed critical review of a summary on {research_topic}.
 
 <GOAL>
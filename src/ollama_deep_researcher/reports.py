@@ -0,0 +1,59 @@
+"""Index of finished research reports, used to warm-start related runs.
+
+Topics recur and cluster. When a finished report's topic closely matches a
+new one, the new run starts from that report's summary, sources and queries
+and spends its loops on gaps and fresher information instead of researching
+everything again. Reports are stored in a :class:`CorpusIndex` of their own,
+embedded by topic, with the report itself kept in each document's metadata.
+"""
+
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from ollama_deep_researcher.corpus import get_corpus_index
+
+logger = logging.getLogger(__name__)
+
+
+def save_report(configurable: Any, topic: str, summary: str, sources: List[str], queries: List[str]) -> None:
+    """Add a finished report to the report index.
+
+    Args:
+        configurable: The ``Configuration`` of the run
+        topic (str): The research topic
+        summary (str): The final running summary, without the sources section
+        sources (List[str]): The formatted source lines of the report
+        queries (List[str]): The search queries the run made
+    """
+    index = get_corpus_index(configurable, configurable.warm_start_dir)
+    index.add([{
+        "title": topic,
+        "url": f"report:{uuid.uuid4().hex}",
+        "content": topic,
+        "metadata": {"topic": topic, "summary": summary, "sources": sources, "queries": queries, "created_at": time.time()},
+    }])
+
+
+def find_related_report(configurable: Any, topic: str) -> Optional[Dict[str, Any]]:
+    """Return the most similar recent report for a topic, if one is similar enough.
+
+    Args:
+        configurable: The ``Configuration`` of the current run
+        topic (str): The new research topic
+
+    Returns:
+        Optional[Dict[str, Any]]: The report's metadata plus its ``score``, or None
+    """
+    index = get_corpus_index(configurable, configurable.warm_start_dir)
+    max_age = configurable.warm_start_max_age_days * 86400
+    for score, result in index.search(topic, k=5, min_score=configurable.warm_start_min_score):
+        report = result.get("metadata")
+        if not report:
+            continue
+        if max_age and time.time() - report["created_at"] > max_age:
+            continue
+        logger.info("Warm-starting %r from the report on %r (similarity %.2f)", topic, report["topic"], score)
+        return {**report, "score": score}
+    return None
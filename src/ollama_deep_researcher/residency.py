@@ -0,0 +1,179 @@
+"""Model residency management for Ollama.
+
+Ollama unloads a model after its ``keep_alive`` expires and reloads it when
+another model or a different ``num_ctx`` is requested. A reload is the single
+largest source of latency variance in a research run, so this module pre-loads
+the configured models at startup, keeps them resident with the configured
+``keep_alive`` and ``num_ctx``, and logs whenever a model swap is observed.
+The loaded models are polled at most once per check interval, so building a
+chat model does not wait for ``/api/ps`` on every call.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class ModelResidencyManager:
+    """Track and control which models are loaded on one Ollama server.
+
+    Args:
+        base_url (str): The Ollama server
+        keep_alive (str, optional): How long loaded models stay resident. Defaults to "30m".
+        num_ctx (int, optional): Context window to load models with; 0 for the server default. Defaults to 0.
+        timeout (float, optional): Seconds to wait for a warm-up. Defaults to 600.
+        check_interval (float, optional): Seconds the loaded models are cached between polls. Defaults to 15.
+    """
+
+    def __init__(self, base_url: str, keep_alive: str = "30m", num_ctx: int = 0, timeout: float = 600.0,
+                 check_interval: float = 15.0):
+        """Manage ``base_url`` with nothing known about its loaded models yet."""
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._resident: Optional[set] = None
+        self._checked_at: Optional[float] = None
+
+    def options(self) -> Dict[str, Any]:
+        """Return the model options that must match between warm-up and real calls."""
+        return {"num_ctx": self.num_ctx} if self.num_ctx else {}
+
+    def loaded_models(self) -> Dict[str, Dict[str, Any]]:
+        """Return the models currently loaded on the server, keyed by name."""
+        response = httpx.get(f"{self.base_url}/api/ps", timeout=5.0)
+        response.raise_for_status()
+        return {m["name"]: m for m in response.json().get("models", [])}
+
+    def warm_up(self, model: str, embedding: bool = False) -> float:
+        """Load ``model`` and run a one-token generation so the first real call is warm.
+
+        Args:
+            model (str): Name of the Ollama model to load
+            embedding (bool, optional): Load it with an embedding request instead, for models
+                that cannot generate. Defaults to False.
+
+        Returns:
+            float: Seconds spent loading and warming the model
+        """
+        if embedding:
+            endpoint, payload = "embed", {"model": model, "input": "Hello", "keep_alive": self.keep_alive}
+        else:
+            endpoint, payload = "generate", {
+                "model": model,
+                "prompt": "Hello",
+                "stream": False,
+                "keep_alive": self.keep_alive,
+                "options": {**self.options(), "num_predict": 1},
+            }
+        response = httpx.post(f"{self.base_url}/api/{endpoint}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        load_seconds = response.json().get("load_duration", 0) / 1e9
+        logger.info("Warmed up %s on %s (load took %.1fs)", model, self.base_url, load_seconds)
+        self.check_residency(model, force=True)
+        return load_seconds
+
+    def check_residency(self, model: str, force: bool = False) -> bool:
+        """Log a model swap if ``model`` is not resident or the resident set changed.
+
+        The server is polled only when the last poll is older than ``check_interval``;
+        otherwise the cached set of loaded models answers.
+
+        Args:
+            model (str): Name of the model about to be used
+            force (bool, optional): Poll the server even if the cached set is fresh. Defaults to False.
+
+        Returns:
+            bool: Whether ``model`` was already loaded
+        """
+        with self._lock:
+            if not force and self._checked_at is not None and time.monotonic() - self._checked_at < self.check_interval:
+                if self._resident is None:
+                    return True
+                resident = model in self._resident
+                # The call about to be made loads it if it was not
+                self._resident.add(model)
+                return resident
+            self._checked_at = time.monotonic()
+        try:
+            loaded = set(self.loaded_models())
+        except Exception as e:
+            logger.debug("Could not query loaded models on %s: %s", self.base_url, e)
+            return True
+        with self._lock:
+            previous, self._resident = self._resident, loaded | {model}
+        if previous is not None and previous != loaded:
+            logger.warning(
+                "Model swap on %s: unloaded %s, loaded %s",
+                self.base_url, sorted(previous - loaded) or "none", sorted(loaded - previous) or "none",
+            )
+        if model not in loaded:
+            logger.warning("Model %s is not resident on %s and will be loaded (resident: %s)",
+                           model, self.base_url, sorted(loaded) or "none")
+            return False
+        return True
+
+
+_managers: Dict[tuple, ModelResidencyManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_residency_manager(configurable: Any, base_url: Optional[str] = None) -> ModelResidencyManager:
+    """Return the process-wide residency manager for an Ollama server.
+
+    Args:
+        configurable: The ``Configuration`` to take the keep-alive and context settings from
+        base_url (str, optional): The server to manage. Defaults to ``configurable.ollama_base_url``.
+    """
+    key = ((base_url or configurable.ollama_base_url).rstrip("/"), configurable.keep_alive, configurable.num_ctx)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = ModelResidencyManager(*key, check_interval=configurable.residency_check_interval)
+        return _managers[key]
+
+
+def configured_models(configurable: Any) -> Dict[str, bool]:
+    """Return every Ollama model the configuration uses, mapped to whether it is an embedding model.
+
+    Args:
+        configurable: The ``Configuration`` to take the model names from
+    """
+    models = {configurable.local_llm: False, configurable.title_llm: False}
+    if configurable.local_corpus_mode != "off":
+        models.setdefault(configurable.local_corpus_embedding_model, True)
+    models.pop("", None)
+    return models
+
+
+def warm_up_models(configurable: Any, models: Optional[Iterable[str]] = None) -> None:
+    """Pre-load the configured models on every endpoint, logging instead of raising on failure.
+
+    Args:
+        configurable: The ``Configuration`` to take the servers and model settings from
+        models (Iterable[str], optional): Models to warm up. Defaults to :func:`configured_models`.
+    """
+    if configurable.llm_provider != "ollama":
+        return
+    embedding_models = configured_models(configurable)
+    urls = [u.strip() for u in configurable.ollama_base_urls.split(",") if u.strip()] or [configurable.ollama_base_url]
+    for url in urls:
+        manager = get_residency_manager(configurable, url)
+        for model in models or embedding_models:
+            try:
+                manager.warm_up(model, embedding=embedding_models.get(model, False))
+            except Exception as e:
+                logger.warning("Failed to warm up %s on %s: %s", model, manager.base_url, e)
+
+
+def warm_up_in_background(configurable: Any) -> threading.Thread:
+    """Start :func:`warm_up_models` in a daemon thread so startup is not blocked."""
+    thread = threading.Thread(target=warm_up_models, args=(configurable,), name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,17 @@
+"""Structured output schemas for the query and reflection calls."""
+
+from pydantic import BaseModel, Field
+
+
+class SearchQuery(BaseModel):
+    """Output of the query writer."""
+
+    query: str = Field(description="The actual search query string")
+    rationale: str = Field(default="", description="Brief explanation of why this query is relevant")
+
+
+class Reflection(BaseModel):
+    """Output of the reflection step."""
+
+    knowledge_gap: str = Field(default="", description="Description of the specific gap or complexity")
+    follow_up_query: str = Field(description="Specific follow-up web search query addressing the gap")
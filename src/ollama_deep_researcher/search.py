@@ -0,0 +1,264 @@
+"""Search orchestration across multiple providers.
+
+``web_research`` used to depend on exactly one search provider. The
+orchestrator here tries the configured providers in order with a per-provider
+timeout, skips providers whose circuit breaker is open after repeated
+failures, and can optionally hedge: if the primary has not answered within a
+latency threshold, a backup provider is queried in parallel and the first good
+response wins.
+
+Timeouts and circuit breakers cover the provider's search API call only. Full
+pages of DuckDuckGo and SearXNG results are fetched after a response has been
+accepted, so slow third-party pages never count against the provider.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from ollama_deep_researcher.cassette import get_cassette
+from ollama_deep_researcher.profiling import in_profiled_thread
+from ollama_deep_researcher.shared_cache import search_cache
+from ollama_deep_researcher.utils import (
+    SPARE_RESULTS,
+    duckduckgo_search,
+    perplexity_search,
+    searxng_search,
+    tavily_search,
+    with_page_content,
+)
+
+logger = logging.getLogger(__name__)
+
+SEARCH_APIS = ("duckduckgo", "tavily", "perplexity", "searxng")
+# Providers whose result pages are fetched here rather than by the provider
+PAGE_FETCH_APIS = ("duckduckgo", "searxng")
+MAX_RESULTS = 3
+
+# Shared pool for provider calls; timed-out calls finish in the background
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="search")
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and the
+    provider is skipped for ``reset_timeout`` seconds. After that a single trial
+    request is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 120.0):
+        """Create a closed circuit."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent to the provider now."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: let one trial request through
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        """Count a failed request, opening the circuit at the threshold."""
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(search_api: str, failure_threshold: int, reset_timeout: float) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a provider."""
+    with _breakers_lock:
+        breaker = _breakers.get(search_api)
+        if breaker is None:
+            breaker = _breakers[search_api] = CircuitBreaker(failure_threshold, reset_timeout)
+        breaker.failure_threshold = failure_threshold
+        breaker.reset_timeout = reset_timeout
+        return breaker
+
+
+def run_search(search_api: str, query: str, fetch_full_page: bool, loop_count: int, timeout: float) -> Dict[str, List[Dict[str, Any]]]:
+    """Run a query against a single search provider, sharing results across runs.
+
+    Identical searches from concurrent runs (e.g. topics of the same batch) are
+    answered from the process-wide search cache.
+    """
+    key = (search_api, " ".join(query.lower().split()), fetch_full_page, loop_count if search_api == "perplexity" else 0)
+    return search_cache.get_or_compute(
+        key,
+        lambda: _recorded_search(search_api, query, fetch_full_page, loop_count, timeout),
+        should_cache=lambda response: bool(response.get("results")),
+    )
+
+
+def _recorded_search(search_api: str, query: str, fetch_full_page: bool, loop_count: int, timeout: float) -> Dict[str, List[Dict[str, Any]]]:
+    """Run a search through the active cassette, if any."""
+    cassette = get_cassette()
+    if cassette is None:
+        return _run_search(search_api, query, fetch_full_page, loop_count, timeout)
+    request = {"search_api": search_api, "query": query, "fetch_full_page": fetch_full_page, "loop_count": loop_count}
+    return cassette.call("search", request, lambda: _run_search(search_api, query, fetch_full_page, loop_count, timeout))
+
+
+def _run_search(search_api: str, query: str, fetch_full_page: bool, loop_count: int, timeout: float) -> Dict[str, List[Dict[str, Any]]]:
+    """Run a query against a single search provider, without fetching result pages.
+
+    When full pages are wanted from a provider in ``PAGE_FETCH_APIS``, spare
+    results are requested to replace pages that cannot be fetched later.
+
+    Args:
+        search_api (str): One of ``SEARCH_APIS``
+        query (str): The search query
+        fetch_full_page (bool): Whether full page content is wanted
+        loop_count (int): The current research loop, used for Perplexity source labels
+        timeout (float): Request timeout in seconds passed to the provider client
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: Search response with a 'results' list
+    """
+    if search_api == "tavily":
+        return tavily_search(query, fetch_full_page=fetch_full_page, max_results=1, timeout=timeout)
+    elif search_api == "perplexity":
+        return perplexity_search(query, loop_count, timeout=timeout)
+    elif search_api == "duckduckgo":
+        max_results = MAX_RESULTS + (SPARE_RESULTS if fetch_full_page else 0)
+        return duckduckgo_search(query, max_results=max_results, fetch_full_page=False, timeout=timeout)
+    elif search_api == "searxng":
+        max_results = MAX_RESULTS + (SPARE_RESULTS if fetch_full_page else 0)
+        return searxng_search(query, max_results=max_results, fetch_full_page=False, timeout=timeout)
+    else:
+        raise ValueError(f"Unsupported search API: {search_api}")
+
+
+class SearchOrchestrator:
+    """Query providers in order with timeouts, circuit breaking, failover and hedging.
+
+    Args:
+        providers (List[str]): Search APIs in order of preference
+        timeout (float, optional): Seconds to wait for each provider. Defaults to 30.
+        hedge_delay (float, optional): Seconds to wait for a provider before also
+            querying the next one; 0 disables hedging. Defaults to 0.
+        failure_threshold (int, optional): Consecutive failures that open a provider's
+            circuit. Defaults to 3.
+        reset_timeout (float, optional): Seconds a circuit stays open. Defaults to 120.
+    """
+
+    def __init__(
+        self,
+        providers: List[str],
+        timeout: float = 30.0,
+        hedge_delay: float = 0.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 120.0,
+    ):
+        """Set up the providers, sharing each one's process-wide circuit breaker."""
+        self.providers = providers
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.breakers = {p: get_circuit_breaker(p, failure_threshold, reset_timeout) for p in providers}
+
+    def search(self, query: str, fetch_full_page: bool, loop_count: int = 0) -> Dict[str, Any]:
+        """Return the first non-empty response from the configured providers.
+
+        Args:
+            query (str): The search query
+            fetch_full_page (bool): Whether to include full page content
+            loop_count (int, optional): The current research loop. Defaults to 0.
+
+        Returns:
+            Dict[str, Any]: Search response with a 'results' list (empty if every provider failed)
+                and a 'search_api' key naming the provider that answered
+        """
+        candidates = [p for p in self.providers if self.breakers[p].allow()]
+        if not candidates:
+            # Every circuit is open; try the primary anyway rather than returning nothing
+            candidates = self.providers[:1]
+
+        pending: Dict[Future, tuple] = {}
+
+        def launch() -> None:
+            provider = candidates.pop(0)
+            future = _executor.submit(in_profiled_thread(run_search), provider, query, fetch_full_page, loop_count, self.timeout)
+            pending[future] = (provider, time.monotonic() + self.timeout)
+
+        launch()
+        while pending:
+            now = time.monotonic()
+            wait_for = min(deadline for _, deadline in pending.values()) - now
+            if self.hedge_delay and candidates:
+                wait_for = min(wait_for, self.hedge_delay)
+            done, _ = wait(list(pending), timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider, _ = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    logger.warning("Search provider %s failed: %s", provider, e)
+                    response = None
+                if response is None:
+                    self.breakers[provider].record_failure()
+                    continue
+                # The provider answered; an empty result list fails over without counting against it
+                self.breakers[provider].record_success()
+                if response.get("results"):
+                    return self._with_pages(response, provider, fetch_full_page)
+                logger.warning("Search provider %s returned no results for %r", provider, query)
+
+            now = time.monotonic()
+            for future, (provider, deadline) in list(pending.items()):
+                if now >= deadline:
+                    logger.warning("Search provider %s timed out after %.1fs", provider, self.timeout)
+                    pending.pop(future)
+                    self.breakers[provider].record_failure()
+
+            if candidates and (not pending or (not done and self.hedge_delay)):
+                # Fail over when nothing is in flight, or hedge when the in-flight request is slow
+                launch()
+
+        return {"results": [], "search_api": None}
+
+    @staticmethod
+    def _with_pages(response: Dict[str, Any], provider: str, fetch_full_page: bool) -> Dict[str, Any]:
+        """Fetch the result pages of an accepted response, outside the provider's timeout."""
+        results = response["results"]
+        if provider in PAGE_FETCH_APIS:
+            results = with_page_content(results, MAX_RESULTS, fetch_full_page)
+        return {**response, "results": results, "search_api": provider}
+
+
+def get_search_orchestrator(configurable: Any) -> SearchOrchestrator:
+    """Build the orchestrator for a run's configured primary and fallback providers."""
+    providers = [configurable.search_api] + [
+        p.strip() for p in configurable.search_fallback_apis.split(",") if p.strip()
+    ]
+    unsupported = [p for p in providers if p not in SEARCH_APIS]
+    if unsupported:
+        raise ValueError(f"Unsupported search API: {', '.join(unsupported)}")
+    return SearchOrchestrator(
+        list(dict.fromkeys(providers)),
+        timeout=configurable.search_timeout,
+        hedge_delay=configurable.search_hedge_delay,
+        failure_threshold=configurable.search_failure_threshold,
+        reset_timeout=configurable.search_circuit_reset,
+    )
@@ -0,0 +1,476 @@
+"""Production HTTP server for the research graph.
+
+``langgraph dev`` resolves dependencies on every start and runs an in-memory
+development server. This module serves ``ollama_deep_researcher.graph.graph``
+directly with Starlette and uvicorn, with dependencies installed at build time:
+
+- ``POST /runs/stream`` runs the graph and streams server-sent events in the
+  format ``job/run.py`` consumes (``metadata``, ``values``, ``custom`` and
+  ``error`` events, plus heartbeat comments);
+- ``GET /runs/{run_id}`` returns a run's status and final output;
+- ``POST /runs/{run_id}/cancel`` cancels a run at the next node boundary,
+  whichever worker process runs it;
+- ``GET /metrics`` returns this worker process's run slots in use and, per
+  LLM backend, requests in flight, queue depth and queue-wait percentiles;
+- ``GET /ok`` is a health check.
+
+Each worker process starts loading the configured models (research, title
+and embedding) when it starts, unless ``WARM_UP_MODELS=false``. It runs at
+most ``MAX_CONCURRENT_RUNS`` graphs at once; further runs wait (with
+heartbeats) for a free slot. A run whose node does
+not finish within ``NODE_TIMEOUT`` seconds, that runs longer than
+``RUN_TIMEOUT`` seconds, or that does not stop within ``CANCEL_GRACE``
+seconds of being cancelled (or of its client disconnecting) is ended and
+its slot freed, even if its thread is stuck. Runs are recorded in a
+SQLite run store at ``RUN_DB_PATH``. Start it with::
+
+    python -m ollama_deep_researcher.server --workers 2 --max-concurrent-runs 8
+
+Requires the ``serve`` extra: ``pip install "ollama-deep-researcher[serve]"``.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from importlib import import_module
+from typing import Any, AsyncIterator, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from ollama_deep_researcher.configuration import Configuration
+from ollama_deep_researcher.governor import governor_metrics
+from ollama_deep_researcher.residency import warm_up_in_background
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_RUNS = int(os.environ.get("MAX_CONCURRENT_RUNS", "4"))
+RUN_DB_PATH = os.environ.get("RUN_DB_PATH", "runs.db")
+# Wall-clock limit per run; a run still going after this is failed and its slot freed (0 disables)
+RUN_TIMEOUT = float(os.environ.get("RUN_TIMEOUT", "14400"))
+HEARTBEAT_INTERVAL = 15.0  # seconds between heartbeat comments on an idle stream
+SUPERVISE_INTERVAL = 1.0  # seconds between deadline checks of a running run
+CANCEL_GRACE = 30.0  # seconds a cancelled run's thread gets to reach a node boundary before it is given up on
+
+
+class RunCancelled(Exception):
+    """Raised inside a run's thread when the run was cancelled."""
+
+
+class RunStore:
+    """SQLite-backed record of runs, shared by the worker processes.
+
+    Args:
+        path (str): The database file
+    """
+
+    def __init__(self, path: str):
+        """Open the database at ``path``, creating its table if needed."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL;")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    input TEXT,
+                    metadata TEXT,
+                    output TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    created_at TEXT,
+                    started_at TEXT,
+                    completed_at TEXT
+                )
+            """)
+
+    def create(self, run_id: str, input: Any, metadata: Dict[str, Any]) -> None:
+        """Record a new run as pending."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, status, input, metadata, created_at) VALUES (?, 'pending', ?, ?, ?)",
+                (run_id, json.dumps(input), json.dumps(metadata), _now()),
+            )
+
+    def update(self, run_id: str, status: str, **fields: Any) -> None:
+        """Set a run's status, and any of ``output``, ``error``, ``started_at``, ``completed_at``."""
+        if "output" in fields:
+            fields["output"] = json.dumps(fields["output"], default=str)
+        columns = ", ".join(f"{name}=?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE runs SET status=?{', ' + columns if columns else ''} WHERE run_id=?",
+                (status, *fields.values(), run_id),
+            )
+
+    def request_cancel(self, run_id: str) -> bool:
+        """Flag a pending or running run for cancellation; return whether there was one."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE runs SET cancel_requested=1 WHERE run_id=? AND status IN ('pending', 'running')", (run_id,)
+            )
+        return cursor.rowcount > 0
+
+    def cancel_requested(self, run_id: str) -> bool:
+        """Return whether cancellation of a run was requested, from any worker."""
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM runs WHERE run_id=?", (run_id,)).fetchone()
+        return bool(row and row[0])
+
+    def interrupt_unfinished(self) -> int:
+        """Mark runs left pending or running by a previous server as interrupted.
+
+        Returns:
+            int: The number of runs marked
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE runs SET status='interrupted', error=?, completed_at=? WHERE status IN ('pending', 'running')",
+                ("Server stopped before the run finished", _now()),
+            )
+        return cursor.rowcount
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Return a run's record, or None if it does not exist."""
+        with self._lock:
+            self._conn.row_factory = sqlite3.Row
+            row = self._conn.execute("SELECT * FROM runs WHERE run_id=?", (run_id,)).fetchone()
+            self._conn.row_factory = None
+        if row is None:
+            return None
+        record = dict(row)
+        for key in ("input", "metadata", "output"):
+            if record[key]:
+                record[key] = json.loads(record[key])
+        return record
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class ActiveRun:
+    """A run executing in this process: its cancel flag, its event queue and its outcome.
+
+    The outcome is recorded once, by the graph thread when the graph ends, or
+    by the run's supervisor when it gives up on a thread that overran its
+    deadline. Events from an abandoned thread are dropped.
+
+    Args:
+        run_id (str): The run
+        store (RunStore): Where the outcome is recorded
+        loop (asyncio.AbstractEventLoop): The server's event loop, which owns the queue
+    """
+
+    def __init__(self, run_id: str, store: RunStore, loop: asyncio.AbstractEventLoop):
+        """Register a run that has not finished yet."""
+        self.run_id = run_id
+        self.store = store
+        self.loop = loop
+        self.cancelled = threading.Event()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.last_progress = time.monotonic()
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def post(self, callback: Any, *args: Any) -> None:
+        """Schedule a callback on the event loop, which may be closed by the time an abandoned thread returns."""
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            logger.debug("Run %s: event loop closed, dropping %s", self.run_id, callback)
+
+    def emit(self, mode: str, chunk: Any) -> None:
+        """Queue a stream event for the client, unless the run already ended."""
+        if not self._finished:
+            self.post(self.queue.put_nowait, (mode, chunk))
+
+    def finish(self, status: str, event: Optional[Dict[str, str]] = None, **fields: Any) -> bool:
+        """Record the run's outcome and end its stream, unless the outcome was already recorded.
+
+        Args:
+            status (str): The final status
+            event (dict, optional): The ``error`` event sent to the client, if the run failed
+            **fields: ``output`` or ``error`` columns for the run store
+
+        Returns:
+            bool: Whether this call recorded the outcome
+        """
+        with self._lock:
+            if self._finished:
+                return False
+            if event is not None:
+                self.post(self.queue.put_nowait, ("error", event))
+            self._finished = True
+        self.store.update(self.run_id, status, completed_at=_now(), **fields)
+        self.post(self.queue.put_nowait, None)
+        return True
+
+
+class RunManager:
+    """Run graphs in threads with bounded concurrency, and track them for cancellation.
+
+    Args:
+        store (RunStore): Where runs are recorded
+        max_concurrent_runs (int): Maximum number of graphs running at once in this process
+        run_timeout (float, optional): Seconds a run may take; 0 disables the limit. Defaults to 0.
+    """
+
+    def __init__(self, store: RunStore, max_concurrent_runs: int, run_timeout: float = 0.0):
+        """Create the manager with ``max_concurrent_runs`` free slots and no active runs."""
+        self.store = store
+        self.max_concurrent_runs = max_concurrent_runs
+        self.run_timeout = run_timeout
+        self.slots = asyncio.Semaphore(max_concurrent_runs)
+        self.runs: Dict[str, ActiveRun] = {}
+        self._supervisors: set = set()
+
+    def cancel(self, run_id: str) -> bool:
+        """Cancel a pending or running run, in whichever worker it runs; return whether it was found."""
+        if not self.store.request_cancel(run_id):
+            return False
+        run = self.runs.get(run_id)
+        if run is not None:
+            run.cancelled.set()
+        return True
+
+    async def supervise(self, run: ActiveRun, worker: asyncio.Future, node_timeout: float) -> None:
+        """Free the run's slot when its graph thread ends, or give up on the thread at a deadline.
+
+        A node stuck in a call without a timeout of its own never reaches the
+        next node boundary, where the thread checks for cancellation. The run
+        is ended and its slot freed, even though the thread may never return,
+        once no node has finished for ``node_timeout`` seconds, once it has run
+        for ``run_timeout`` seconds, or ``CANCEL_GRACE`` seconds after it was
+        cancelled (here or from another worker) or its client disconnected.
+
+        Args:
+            run (ActiveRun): The run
+            worker (asyncio.Future): The graph thread's future
+            node_timeout (float): Seconds a node may run; 0 disables the deadline
+        """
+        started = time.monotonic()
+        cancelled_at = None
+        try:
+            while not worker.done():
+                await asyncio.wait({worker}, timeout=SUPERVISE_INTERVAL)
+                if worker.done():
+                    break
+                now = time.monotonic()
+                if cancelled_at is None and (run.cancelled.is_set() or self.store.cancel_requested(run.run_id)):
+                    run.cancelled.set()
+                    cancelled_at = now
+                if cancelled_at is not None and now - cancelled_at > CANCEL_GRACE:
+                    status, error = "interrupted", "RunCancelled"
+                    message = f"Run was cancelled and did not stop within {CANCEL_GRACE:.0f}s"
+                elif node_timeout and now - run.last_progress > node_timeout:
+                    status, error = "error", "NodeTimeout"
+                    message = f"No graph node finished within {node_timeout:.0f}s"
+                elif self.run_timeout and now - started > self.run_timeout:
+                    status, error = "error", "RunTimeout"
+                    message = f"Run did not finish within {self.run_timeout:.0f}s"
+                else:
+                    continue
+                run.cancelled.set()
+                if run.finish(status, {"error": error, "message": message}, error=f"{error}: {message}"):
+                    logger.error("Run %s: %s; abandoning its thread", run.run_id, message)
+                break
+        finally:
+            self.slots.release()
+            self.runs.pop(run.run_id, None)
+
+    async def stream(self, run_id: str, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """Run the graph for a request and yield its server-sent events."""
+        from ollama_deep_researcher.graph import graph
+
+        loop = asyncio.get_running_loop()
+        run = self.runs[run_id] = ActiveRun(run_id, self.store, loop)
+        stream_mode = payload.get("stream_mode") or ["values"]
+        stream_modes = [stream_mode] if isinstance(stream_mode, str) else list(stream_mode)
+        config = dict(payload.get("config") or {})
+        config["metadata"] = {**(payload.get("metadata") or {}), "run_id": run_id}
+        node_timeout = Configuration.from_runnable_config(config).node_timeout
+
+        def execute(worker: asyncio.Future) -> None:
+            output = None
+            try:
+                for mode, chunk in graph.stream(payload.get("input"), config, stream_mode=stream_modes):
+                    if run.cancelled.is_set():
+                        raise RunCancelled()
+                    if mode == "values":
+                        # Values arrive once per node; check for a cancel from another worker there
+                        run.last_progress = time.monotonic()
+                        if self.store.cancel_requested(run_id):
+                            raise RunCancelled()
+                        output = chunk
+                    run.emit(mode, chunk)
+                run.finish("success", output=output)
+            except RunCancelled:
+                run.finish("interrupted", {"error": "RunCancelled", "message": "Run was cancelled"})
+            except Exception as e:
+                logger.exception("Run %s failed", run_id)
+                run.finish("error", {"error": type(e).__name__, "message": str(e)}, error=f"{type(e).__name__}: {e}")
+            finally:
+                run.post(worker.set_result, None)
+
+        supervisor = None
+        try:
+            yield _sse("metadata", {"run_id": run_id})
+            # Wait for a free slot, keeping the connection alive meanwhile
+            while True:
+                try:
+                    await asyncio.wait_for(self.slots.acquire(), timeout=HEARTBEAT_INTERVAL)
+                    break
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+            try:
+                if run.cancelled.is_set() or self.store.cancel_requested(run_id):
+                    self.store.update(run_id, "interrupted", completed_at=_now())
+                    return
+                self.store.update(run_id, "running", started_at=_now())
+                run.last_progress = time.monotonic()
+                # A thread of its own rather than a pool thread, since a given-up thread may never return
+                worker = loop.create_future()
+                threading.Thread(target=execute, args=(worker,), name=f"run-{run_id[:8]}", daemon=True).start()
+                # The graph thread outlives a disconnected stream until its next node boundary;
+                # the supervisor frees the slot when the thread ends or is given up on
+                supervisor = loop.create_task(self.supervise(run, worker, node_timeout))
+                self._supervisors.add(supervisor)
+                supervisor.add_done_callback(self._supervisors.discard)
+            finally:
+                if supervisor is None:
+                    self.slots.release()
+            while True:
+                try:
+                    item = await asyncio.wait_for(run.queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if item is None:
+                    break
+                yield _sse(*item)
+        finally:
+            # Reached when the client disconnects too; stop the run unless asked to continue
+            if payload.get("on_disconnect", "cancel") == "cancel":
+                run.cancelled.set()
+            if supervisor is None:
+                self.runs.pop(run_id, None)
+
+
+async def stream_run(request: Request) -> StreamingResponse:
+    """Start a run and stream its events."""
+    payload = await request.json()
+    run_id = str(uuid.uuid4())
+    manager: RunManager = request.app.state.runs
+    manager.store.create(run_id, payload.get("input"), payload.get("metadata") or {})
+    return StreamingResponse(
+        manager.stream(run_id, payload),
+        media_type="text/event-stream",
+        headers={"Content-Location": f"/runs/{run_id}", "Cache-Control": "no-store"},
+    )
+
+
+async def get_run(request: Request) -> JSONResponse:
+    """Return a run's status and output."""
+    record = request.app.state.runs.store.get(request.path_params["run_id"])
+    if record is None:
+        return JSONResponse({"detail": "Run not found"}, status_code=404)
+    return JSONResponse(record)
+
+
+async def cancel_run(request: Request) -> JSONResponse:
+    """Cancel a pending or running run at its next node boundary."""
+    run_id = request.path_params["run_id"]
+    if not request.app.state.runs.cancel(run_id):
+        return JSONResponse({"detail": "Run is not pending or running"}, status_code=404)
+    return JSONResponse({"run_id": run_id, "status": "cancelling"}, status_code=202)
+
+
+async def metrics(request: Request) -> JSONResponse:
+    """Return the run and LLM request queue figures of this worker process."""
+    manager: RunManager = request.app.state.runs
+    return JSONResponse({
+        "pid": os.getpid(),
+        "runs": {"active": len(manager.runs), "max_concurrent": manager.max_concurrent_runs},
+        "llm": governor_metrics(),
+    })
+
+
+async def ok(request: Request) -> JSONResponse:
+    """Health check."""
+    return JSONResponse({"ok": True})
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    """Import the graph and start the model warm-up before serving the first request."""
+    import_module("ollama_deep_researcher.graph")
+    configurable = Configuration.from_runnable_config()
+    if configurable.warm_up_models:
+        warm_up_in_background(configurable)
+
+    app.state.runs = RunManager(RunStore(RUN_DB_PATH), MAX_CONCURRENT_RUNS, RUN_TIMEOUT)
+    logger.info("Serving with up to %d concurrent runs, run store %s", MAX_CONCURRENT_RUNS, RUN_DB_PATH)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/runs/stream", stream_run, methods=["POST"]),
+        Route("/runs/{run_id}", get_run, methods=["GET"]),
+        Route("/runs/{run_id}/cancel", cancel_run, methods=["POST"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/ok", ok, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main(argv: list = None) -> None:
+    """Parse the command line and start uvicorn."""
+    parser = argparse.ArgumentParser(description="Serve the research graph over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=2024)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "1")),
+                        help="Number of worker processes")
+    parser.add_argument("--max-concurrent-runs", type=int, default=MAX_CONCURRENT_RUNS,
+                        help="Maximum runs executing at once in each worker")
+    parser.add_argument("--run-db", default=RUN_DB_PATH, help="SQLite file of the run store")
+    parser.add_argument("--run-timeout", type=float, default=RUN_TIMEOUT,
+                        help="Seconds a run may take before it is failed and its slot freed (0 disables)")
+    args = parser.parse_args(argv)
+
+    # Worker processes import this module afresh and read their settings from the environment
+    os.environ["MAX_CONCURRENT_RUNS"] = str(args.max_concurrent_runs)
+    os.environ["RUN_DB_PATH"] = args.run_db
+    os.environ["RUN_TIMEOUT"] = str(args.run_timeout)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # Runs of a previous server cannot finish; done here, once, rather than in each worker
+    interrupted = RunStore(args.run_db).interrupt_unfinished()
+    if interrupted:
+        logger.info("Marked %d runs of a previous server as interrupted", interrupted)
+
+    import uvicorn
+
+    uvicorn.run("ollama_deep_researcher.server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
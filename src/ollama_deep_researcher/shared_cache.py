@@ -0,0 +1,99 @@
+"""Process-wide caches shared by all runs served from the same process.
+
+When many related topics run at the same time (for example a nightly batch),
+they often issue identical searches and fetch the same pages. These caches
+deduplicate that work: results are kept for a TTL, and concurrent requests for
+the same key wait for the first one instead of repeating it (single flight).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+
+class SingleFlightCache:
+    """TTL + LRU cache where concurrent misses for one key share a single call.
+
+    Args:
+        ttl (float, optional): Seconds a result stays valid; 0 disables caching. Defaults to 3600.
+        max_entries (int, optional): Maximum number of cached results. Defaults to 1024.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 1024):
+        """Create an empty cache."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple] = OrderedDict()
+        self._inflight: dict = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        should_cache: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Return the cached value for ``key``, computing it at most once at a time.
+
+        Exceptions are not cached; every waiter of a failed call sees the exception.
+
+        Args:
+            key (Hashable): The cache key
+            compute (Callable[[], Any]): Function producing the value on a miss
+            should_cache (Callable[[Any], bool], optional): Predicate deciding whether a
+                computed value is kept, e.g. to avoid caching empty results. Concurrent
+                waiters still receive the value either way.
+
+        Returns:
+            Any: The cached or freshly computed value
+        """
+        if not self.ttl:
+            return compute()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if should_cache is None or should_cache(value):
+                self._entries[key] = (time.monotonic(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+
+# Search responses keyed by (provider, normalized query, options)
+search_cache = SingleFlightCache(max_entries=1024)
+# Fetched page text keyed by canonical URL
+fetch_cache = SingleFlightCache(max_entries=4096)
+
+
+def configure_shared_caches(ttl: float) -> None:
+    """Set the TTL of the shared caches; 0 disables them."""
+    search_cache.ttl = ttl
+    fetch_cache.ttl = ttl
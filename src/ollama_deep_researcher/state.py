@@ -5,11 +5,14 @@ from typing_extensions import Annotated
 @dataclass(kw_only=True)
 class SummaryState:
     research_topic: str = field(default=None) # Report topic     
-    search_query: str = field(default=None) # Search query
-    web_research_results: Annotated[list, operator.add] = field(default_factory=list) 
+    search_query: str = field(default=None) # Search query; None once no new query is worth running
+    queries_run: Annotated[list, operator.add] = field(default_factory=list) # Queries already searched
+    web_research_results: Annotated[list, operator.add] = field(default_factory=list) # References into the content store
     sources_gathered: Annotated[list, operator.add] = field(default_factory=list) 
+    content_fingerprints: Annotated[list, operator.add] = field(default_factory=list) # SimHash of sources already used
     research_loop_count: int = field(default=0) # Research loop count
     running_summary: str = field(default=None) # Final report
+    prior_report: dict = field(default=None) # Topic, date and score of the past report the run was seeded from
 
 @dataclass(kw_only=True)
 class SummaryStateInput:
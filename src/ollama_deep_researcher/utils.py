@@ -1,18 +1,55 @@
+import functools
+import hashlib
+import io
+import logging
 import os
+import re
+import time
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 import httpx
-import requests
-from typing import Dict, Any, List, Union, Optional
 
-from markdownify import markdownify
-from langsmith import traceable
-from tavily import TavilyClient
-from duckduckgo_search import DDGS
+from ollama_deep_researcher.cassette import get_cassette
+from ollama_deep_researcher.clients import (
+    CONNECT_TIMEOUT,
+    get_ddgs,
+    get_http_client,
+    get_tavily_client,
+)
+from ollama_deep_researcher.host_health import host_health
+from ollama_deep_researcher.shared_cache import fetch_cache
 
-from langchain_community.utilities import SearxSearchWrapper
+# Search backends (tavily, duckduckgo_search, markdownify) and langsmith are imported
+# where they are used, so a deployment only pays the import cost of the backend it is
+# configured with. Provider clients are pooled and shared, see clients.py.
 
-def get_config_value(value: Any) -> str:
+logger = logging.getLogger(__name__)
+
+def traceable(func: Callable) -> Callable:
+    """Trace a function with LangSmith, importing langsmith on the first call.
+    
+    Args:
+        func (Callable): The function to trace
+        
+    Returns:
+        Callable: A wrapper that calls the langsmith-traced function
     """
-    Convert configuration values to string format, handling both string and enum types.
+    traced = None
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        nonlocal traced
+        if traced is None:
+            from langsmith import traceable as langsmith_traceable
+            traced = langsmith_traceable(func)
+        return traced(*args, **kwargs)
+
+    return wrapper
+
+def get_config_value(value: Any) -> str:
+    """Convert configuration values to string format, handling both string and enum types.
     
     Args:
         value (Any): The configuration value to process. Can be a string or an Enum.
@@ -28,11 +65,13 @@ def get_config_value(value: Any) -> str:
     """
     return value if isinstance(value, str) else value.value
 
+_THINK_BLOCK_RE = re.compile(r"<think>.*?</think>", re.DOTALL)
+
 def strip_thinking_tokens(text: str) -> str:
-    """
-    Remove <think> and </think> tags and their content from the text.
+    """Remove <think> and </think> tags and their content from the text.
     
-    Iteratively removes all occurrences of content enclosed in thinking tokens.
+    Removes all occurrences of content enclosed in thinking tokens in a single
+    pass. An unterminated <think> block is left in place.
     
     Args:
         text (str): The text to process
@@ -40,22 +79,261 @@ def strip_thinking_tokens(text: str) -> str:
     Returns:
         str: The text with thinking tokens and their content removed
     """
-    while "<think>" in text and "</think>" in text:
-        start = text.find("<think>")
-        end = text.find("</think>") + len("</think>")
-        text = text[:start] + text[end:]
-    return text
+    return _THINK_BLOCK_RE.sub("", text)
+
+class ThinkingTokenFilter:
+    """Incrementally remove <think> blocks from a stream of text chunks.
+    
+    Tags split across chunk boundaries are handled by holding back any trailing
+    text that could be the start of a tag until the next chunk arrives.
+    
+    Args:
+        max_reasoning_chars (int, optional): Maximum number of characters allowed inside
+                                             thinking blocks before ``budget_exceeded`` is set.
+                                             0 means unlimited. Defaults to 0.
+    """
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self, max_reasoning_chars: int = 0):
+        """Start outside of any thinking block."""
+        self.max_reasoning_chars = max_reasoning_chars
+        self.reasoning_chars = 0
+        self.in_think = False
+        self._pending = ""
+
+    @property
+    def budget_exceeded(self) -> bool:
+        """Whether the reasoning budget has been used up."""
+        return bool(self.max_reasoning_chars) and self.reasoning_chars > self.max_reasoning_chars
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of model output and return the visible part of it.
+        
+        Args:
+            chunk (str): The next chunk of streamed text
+            
+        Returns:
+            str: Text outside of thinking blocks that is safe to emit
+        """
+        text = self._pending + chunk
+        self._pending = ""
+        visible = []
+        while text:
+            tag = self.CLOSE_TAG if self.in_think else self.OPEN_TAG
+            index = text.find(tag)
+            if index >= 0:
+                if self.in_think:
+                    self.reasoning_chars += index
+                else:
+                    visible.append(text[:index])
+                text = text[index + len(tag):]
+                self.in_think = not self.in_think
+                continue
+            # Hold back a possible partial tag at the end of the chunk
+            keep = 0
+            for size in range(min(len(tag) - 1, len(text)), 0, -1):
+                if tag.startswith(text[-size:]):
+                    keep = size
+                    break
+            emit, self._pending = text[:len(text) - keep], text[len(text) - keep:]
+            if self.in_think:
+                self.reasoning_chars += len(emit)
+            else:
+                visible.append(emit)
+            break
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """Return any held-back text once the stream has ended."""
+        pending, self._pending = self._pending, ""
+        return "" if self.in_think else pending
+
+class JsonObjectScanner:
+    """Detect when the first complete top-level JSON object has been streamed.
+    
+    Tracks brace depth outside of string literals so that generation can be
+    stopped as soon as the closing brace of the object arrives.
+    """
+
+    def __init__(self):
+        """Start before the opening brace of the object."""
+        self._buffer: List[str] = []
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Consume a chunk of visible text.
+        
+        Args:
+            chunk (str): The next chunk of text, with thinking tokens already removed
+            
+        Returns:
+            Optional[str]: The complete JSON object text once it has closed, otherwise None
+        """
+        for char in chunk:
+            if not self._started:
+                if char != "{":
+                    continue
+                self._started = True
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return "".join(self._buffer)
+        return None
+
+def stream_json_completion(llm: Any, messages: List[Any], max_reasoning_tokens: int = 0) -> str:
+    """Stream a JSON-mode completion and stop as soon as the JSON object is complete.
+    
+    Thinking blocks are filtered out as they arrive. If the reasoning budget is
+    exhausted before any JSON appears, generation is abandoned and the visible
+    text produced so far is returned so the caller can apply its fallback.
+    
+    Args:
+        llm (Any): A LangChain chat model supporting ``stream``
+        messages (List[Any]): The messages to send
+        max_reasoning_tokens (int, optional): Budget for thinking tokens, estimated at
+                                              4 characters per token. 0 means unlimited.
+                                              Defaults to 0.
+        
+    Returns:
+        str: The first complete JSON object, or all visible text if none was produced
+    """
+    think_filter = ThinkingTokenFilter(max_reasoning_chars=max_reasoning_tokens * 4)
+    scanner = JsonObjectScanner()
+    visible = []
+    # Closing the stream early closes the HTTP response, which stops generation server-side
+    with closing(llm.stream(messages)) as stream:
+        for chunk in stream:
+            text = think_filter.feed(chunk.content if isinstance(chunk.content, str) else "")
+            visible.append(text)
+            json_text = scanner.feed(text)
+            if json_text is not None:
+                return json_text
+            if think_filter.budget_exceeded:
+                logger.warning("Reasoning budget of %d tokens exceeded, stopping generation", max_reasoning_tokens)
+                break
+    visible.append(think_filter.flush())
+    return "".join(visible)
+
+def stream_text_completion(
+    llm: Any,
+    messages: List[Any],
+    on_text: Callable[[str], None],
+    strip_thinking: bool = True,
+    min_chars: int = 32,
+    max_delay: float = 0.1,
+) -> str:
+    """Stream a completion, passing its visible text to ``on_text`` as it arrives.
+    
+    Text is handed over in small batches (at least ``min_chars`` characters, or
+    whatever arrived within ``max_delay`` seconds) so consumers are not flooded
+    with one event per token. Thinking blocks are not passed on when
+    ``strip_thinking`` is set, but are still part of the returned content.
+    
+    Args:
+        llm (Any): A LangChain chat model supporting ``stream``
+        messages (List[Any]): The messages to send
+        on_text (Callable[[str], None]): Called with each batch of visible text
+        strip_thinking (bool, optional): Whether to hold back thinking blocks. Defaults to True.
+        min_chars (int, optional): Batch size in characters. Defaults to 32.
+        max_delay (float, optional): Maximum seconds text is held before being passed on.
+                                     Defaults to 0.1.
+        
+    Returns:
+        str: The full content of the completion
+    """
+    think_filter = ThinkingTokenFilter() if strip_thinking else None
+    content = []
+    batch = []
+    batch_chars = 0
+    batch_started = time.monotonic()
+    with closing(llm.stream(messages)) as stream:
+        for chunk in stream:
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            content.append(text)
+            visible = think_filter.feed(text) if think_filter else text
+            if not visible:
+                continue
+            if not batch:
+                batch_started = time.monotonic()
+            batch.append(visible)
+            batch_chars += len(visible)
+            if batch_chars >= min_chars or time.monotonic() - batch_started >= max_delay:
+                on_text("".join(batch))
+                batch, batch_chars = [], 0
+    if think_filter:
+        batch.append(think_filter.flush())
+    if "".join(batch):
+        on_text("".join(batch))
+    return "".join(content)
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "twclid", "igshid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "_hsenc", "_hsmi", "mkt_tok", "ref", "ref_src",
+    "ref_url", "cmpid", "spm", "si", "oly_anon_id", "oly_enc_id", "vero_id", "wt_mc",
+}
+TRACKING_PARAM_PREFIXES = ("utm_", "pk_", "hsa_", "itm_")
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so that trivially different forms of the same page compare equal.
+    
+    Strips tracking parameters and the fragment, treats http and https as the
+    same, lowercases the host, drops a leading "www." and default ports, sorts
+    the remaining query parameters and removes trailing slashes from the path.
+    The result is meant for comparisons and cache keys, not for fetching or
+    display; citations keep the original URL.
+    
+    Args:
+        url (str): The URL to canonicalize
+        
+    Returns:
+        str: The canonical form of the URL
+        
+    Examples:
+        >>> canonicalize_url("http://www.Example.com/a/?utm_source=x&b=2&a=1#top")
+        'https://example.com/a?a=1&b=2'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
 
 def deduplicate_and_format_sources(
     search_response: Union[Dict[str, Any], List[Dict[str, Any]]], 
     max_tokens_per_source: int, 
     fetch_full_page: bool = False
 ) -> str:
-    """
-    Format and deduplicate search responses from various search APIs.
+    """Format and deduplicate search responses from various search APIs.
     
     Takes either a single search response or list of responses from search APIs,
-    deduplicates them by URL, and formats them into a structured string.
+    deduplicates them by canonical URL, and formats them into a structured string.
     
     Args:
         search_response (Union[Dict[str, Any], List[Dict[str, Any]]]): Either:
@@ -83,17 +361,17 @@ def deduplicate_and_format_sources(
     else:
         raise ValueError("Input must be either a dict with 'results' or a list of search results")
     
-    # Deduplicate by URL
+    # Deduplicate by canonical URL
     unique_sources = {}
     for source in sources_list:
-        if source['url'] not in unique_sources:
-            unique_sources[source['url']] = source
+        key = canonicalize_url(source['url'])
+        if key not in unique_sources:
+            unique_sources[key] = source
     
     # Format output
     formatted_text = "Sources:\n\n"
     for i, source in enumerate(unique_sources.values(), 1):
-        formatted_text += f"Source: {source['title']}\n===\n"
-        formatted_text += f"URL: {source['url']}\n===\n"
+        formatted_text += format_source_header(source)
         formatted_text += f"Most relevant content from source: {source['content']}\n===\n"
         if fetch_full_page:
             # Using rough estimate of 4 characters per token
@@ -109,11 +387,167 @@ def deduplicate_and_format_sources(
                 
     return formatted_text.strip()
 
-def format_sources(search_results: Dict[str, Any]) -> str:
+def format_source_header(source: Dict[str, Any]) -> str:
+    """Format the title and URL lines that introduce a source.
+    
+    Args:
+        source (Dict[str, Any]): A search result with 'title' and 'url' keys
+        
+    Returns:
+        str: The header, as used by deduplicate_and_format_sources
     """
-    Format search results into a bullet-point list of sources with URLs.
+    return f"Source: {source['title']}\n===\nURL: {source['url']}\n===\n"
+
+def split_into_chunks(text: str, max_chars: int, header: str = "") -> List[str]:
+    """Split text into chunks of at most ``max_chars`` characters.
+    
+    Splits on paragraph boundaries where possible, then on line boundaries,
+    and only cuts inside a line when a single line is longer than a chunk.
+    
+    Args:
+        text (str): The text to split
+        max_chars (int): Maximum number of characters per chunk, including the header
+        header (str, optional): Text to start every chunk with, e.g. a source's title
+                                and URL so each chunk can be attributed. Defaults to "".
+        
+    Returns:
+        List[str]: The chunks, in order
+    """
+    if header:
+        body_chars = max(max_chars - len(header), max_chars // 2)
+        return [header + chunk for chunk in split_into_chunks(text, body_chars)]
+    chunks: List[str] = []
+    current = ""
+    for piece in re.split(r"(\n\s*\n|\n)", text):
+        while len(piece) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(piece[:max_chars])
+            piece = piece[max_chars:]
+        if len(current) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current.strip():
+        chunks.append(current)
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+_WORD_RE = re.compile(r"\w+")
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """Compute a 64-bit SimHash fingerprint of a text.
+    
+    Texts that share most of their word shingles get fingerprints that differ
+    in only a few bits, so near-duplicates can be found by Hamming distance.
+    
+    Args:
+        text (str): The text to fingerprint
+        shingle_size (int, optional): Number of consecutive words per shingle. Defaults to 3.
+        
+    Returns:
+        int: The 64-bit fingerprint
+    """
+    words = _WORD_RE.findall(text.lower())
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+def drop_near_duplicates(
+    sources: List[Dict[str, Any]],
+    seen_fingerprints: List[str],
+    max_distance: int = 10,
+    min_words: int = 50
+) -> tuple:
+    """Remove sources whose content nearly duplicates an earlier source.
+    
+    Each source is fingerprinted with SimHash over its full content (or its
+    snippet if no full content was fetched) and compared with the fingerprints
+    of sources already kept in this call and in earlier research loops.
+    Sources with too little text to fingerprint reliably are always kept.
+    
+    Args:
+        sources (List[Dict[str, Any]]): Search results to filter
+        seen_fingerprints (List[str]): Hex fingerprints of sources kept in earlier loops
+        max_distance (int, optional): Maximum Hamming distance to treat as a duplicate.
+                                      Defaults to 10, well below the ~32 bits that
+                                      separate unrelated texts.
+        min_words (int, optional): Minimum number of words needed to fingerprint a source.
+                                   Defaults to 50.
+        
+    Returns:
+        tuple: The kept sources and the hex fingerprints of the newly kept sources
+    """
+    known = [int(f, 16) for f in seen_fingerprints]
+    kept, new_fingerprints = [], []
+    for source in sources:
+        text = (source.get('raw_content') or source.get('content') or '')[:12000]
+        if len(_WORD_RE.findall(text)) < min_words:
+            kept.append(source)
+            continue
+        fingerprint = simhash(text)
+        duplicate = next((f for f in known if bin(f ^ fingerprint).count("1") <= max_distance), None)
+        if duplicate is not None:
+            logger.info("Dropping near-duplicate source %s", source['url'])
+            continue
+        known.append(fingerprint)
+        new_fingerprints.append(f"{fingerprint:016x}")
+        kept.append(source)
+    return kept, new_fingerprints
+
+_QUERY_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "what", "when", "which", "who", "why", "with",
+    "about", "more", "tell", "me", "does", "do", "its", "their", "these", "those",
+}
+
+def query_similarity(a: str, b: str) -> float:
+    """Compute the lexical similarity of two search queries.
+    
+    Uses the Jaccard similarity of the queries' word sets, ignoring case and
+    common filler words, so reworded or reordered queries still match.
+    
+    Args:
+        a (str): The first query
+        b (str): The second query
+        
+    Returns:
+        float: Similarity between 0 (no words in common) and 1 (same words)
+    """
+    words_a = set(_WORD_RE.findall(a.lower())) - _QUERY_STOPWORDS
+    words_b = set(_WORD_RE.findall(b.lower())) - _QUERY_STOPWORDS
+    if not words_a or not words_b:
+        return 1.0 if a.strip().lower() == b.strip().lower() else 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+def most_similar_query(query: str, history: List[str]) -> Tuple[Optional[str], float]:
+    """Find the query in ``history`` most similar to ``query``.
+    
+    Args:
+        query (str): The candidate query
+        history (List[str]): Queries already run
+        
+    Returns:
+        Tuple[Optional[str], float]: The most similar earlier query and its similarity,
+            or ``(None, 0.0)`` if the history is empty
+    """
+    best, best_score = None, 0.0
+    for previous in history:
+        score = query_similarity(query, previous)
+        if score > best_score:
+            best, best_score = previous, score
+    return best, best_score
+
+def format_sources(search_results: Dict[str, Any]) -> str:
+    """Format search results into a bullet-point list of sources with URLs.
     
     Creates a simple bulleted list of search results with title and URL for each source.
+    Sources with the same canonical URL are listed once, under the URL of their
+    first occurrence as the search provider returned it.
     
     Args:
         search_results (Dict[str, Any]): Search response containing a 'results' key with
@@ -122,46 +556,235 @@ def format_sources(search_results: Dict[str, Any]) -> str:
     Returns:
         str: Formatted string with sources as bullet points in the format "* title : url"
     """
-    return '\n'.join(
-        f"* {source['title']} : {source['url']}"
-        for source in search_results['results']
-    )
+    seen = set()
+    lines = []
+    for source in search_results['results']:
+        key = canonicalize_url(source['url'])
+        if key not in seen:
+            seen.add(key)
+            lines.append(f"* {source['title']} : {source['url']}")
+    return '\n'.join(lines)
+
+# Limits for fetched page bodies
+MAX_FETCH_BYTES = 5 * 1024 * 1024
+MAX_PDF_BYTES = 20 * 1024 * 1024
+MAX_PDF_PAGES = 30
+FETCH_TIMEOUT = 10.0
+# Bytes of an untyped body read before sniffing its type
+SNIFF_BYTES = 1024
+# Extra search results requested to replace results whose page cannot be fetched
+SPARE_RESULTS = 3
+
+_HTML_TYPES = {"text/html", "application/xhtml+xml"}
+_TEXT_TYPES = {"text/plain", "text/markdown", "text/csv", "text/xml", "application/xml", "application/json"}
+_PDF_TYPES = {"application/pdf", "application/x-pdf"}
+# Types that give no hint about the body; these are sniffed from the first bytes
+_UNTYPED = {"", "application/octet-stream", "binary/octet-stream"}
+
+def _content_kind(content_type: str, url: str, head: bytes = b"") -> Optional[str]:
+    """Classify a response as 'html', 'text' or 'pdf', or None for content to skip.
+    
+    Args:
+        content_type (str): The media type from the Content-Type header, without parameters
+        url (str): The requested URL, used as a hint for untyped responses
+        head (bytes, optional): The first bytes of the body, used to sniff untyped responses
+        
+    Returns:
+        Optional[str]: The kind of content, or None if it cannot be turned into text
+    """
+    if content_type in _HTML_TYPES:
+        return "html"
+    if content_type in _PDF_TYPES:
+        return "pdf"
+    if content_type in _TEXT_TYPES or content_type.startswith("text/"):
+        return "text"
+    if content_type in _UNTYPED:
+        if head.startswith(b"%PDF-") or (not head and url.lower().split("?")[0].endswith(".pdf")):
+            return "pdf"
+        if head.lstrip()[:15].lower().startswith((b"<!doctype html", b"<html")):
+            return "html"
+        if not head:
+            # Decide once the first bytes have arrived
+            return "unknown"
+    return None
+
+def extract_pdf_text(data: bytes, max_pages: int = MAX_PDF_PAGES) -> Optional[str]:
+    """Extract plain text from a PDF document.
+    
+    Uses the optional ``pypdf`` dependency (``pip install ollama-deep-researcher[pdf]``).
+    
+    Args:
+        data (bytes): The PDF file contents
+        max_pages (int, optional): Maximum number of pages to extract. Defaults to MAX_PDF_PAGES.
+        
+    Returns:
+        Optional[str]: The extracted text, or None if pypdf is unavailable or the PDF cannot be read
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        logger.warning("pypdf is not installed, skipping PDF content")
+        return None
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        pages = [page.extract_text() or "" for page in reader.pages[:max_pages]]
+    except Exception as e:
+        logger.warning("Failed to extract PDF text: %s", e)
+        return None
+    text = "\n\n".join(p.strip() for p in pages if p.strip())
+    if len(reader.pages) > max_pages:
+        text += f"\n\n[... {len(reader.pages) - max_pages} more pages not extracted]"
+    return text or None
 
 def fetch_raw_content(url: str) -> Optional[str]:
+    """Fetch a URL and convert its content to text, sharing results across runs.
+    
+    Pages are cached by canonical URL in the process-wide fetch cache, so
+    concurrent runs that hit the same page only download it once.
+    
+    Args:
+        url (str): The URL to fetch content from
+        
+    Returns:
+        Optional[str]: The fetched content as text, or None if it could not be fetched
     """
-    Fetch HTML content from a URL and convert it to markdown format.
+    return fetch_cache.get_or_compute(
+        canonicalize_url(url), lambda: _recorded_fetch(url), should_cache=lambda text: text is not None
+    )
+
+def _recorded_fetch(url: str) -> Optional[str]:
+    """Fetch a URL through the active cassette, if any."""
+    cassette = get_cassette()
+    if cassette is None:
+        return _fetch_raw_content(url)
+    return cassette.call("fetch", {"url": url}, lambda: _fetch_raw_content(url))
+
+def _fetch_raw_content(url: str) -> Optional[str]:
+    """Fetch a URL and convert its content to text based on its content type.
     
-    Uses a 10-second timeout to avoid hanging on slow sites or large pages.
+    HTML is converted to markdown, PDFs are converted to text locally, plain
+    text is passed through, and other content (images, archives, binaries) is
+    skipped as soon as the response headers arrive, before the body is downloaded.
+    Bodies are read up to a size limit. Uses the shared fetch client, with a
+    10-second read timeout to avoid hanging on slow sites, or a shorter one for
+    hosts known to answer quickly. Hosts that recently timed out, failed to
+    connect or refused requests, and pages that returned 403, are skipped
+    without a request while they back off (see host_health.py).
     
     Args:
         url (str): The URL to fetch content from
         
     Returns:
-        Optional[str]: The fetched content converted to markdown if successful,
-                      None if any error occurs during fetching or conversion
+        Optional[str]: The fetched content as text if successful,
+                      None if the content type is unsupported or any error occurs
     """
+    if not host_health.allow(url, FETCH_TIMEOUT):
+        logger.info("Skipping %s: backing off after %s", url, host_health.status(url))
+        return None
+    timeout = host_health.timeout_for(url, FETCH_TIMEOUT)
+    start = time.monotonic()
     try:                
-        # Create a client with reasonable timeout
-        with httpx.Client(timeout=10.0) as client:
-            response = client.get(url)
+        # Reuse the process-wide client and its keep-alive connections
+        client = get_http_client("fetch", FETCH_TIMEOUT, follow_redirects=True)
+        request_timeout = httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout))
+        with client.stream("GET", url, timeout=request_timeout) as response:
+            host_health.record_response(url, response.status_code, time.monotonic() - start,
+                                        response.headers.get("retry-after"))
             response.raise_for_status()
-            return markdownify(response.text)
+            content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+            kind = _content_kind(content_type, url)
+            if kind is None:
+                logger.info("Skipping %s: unsupported content type %s", url, content_type)
+                return None
+            limit = MAX_PDF_BYTES if kind in ("pdf", "unknown") else MAX_FETCH_BYTES
+            declared_length = int(response.headers.get("content-length") or 0)
+            if kind == "pdf" and declared_length > limit:
+                logger.info("Skipping %s: PDF of %d bytes exceeds %d bytes", url, declared_length, limit)
+                return None
+
+            body = bytearray()
+            for chunk in response.iter_bytes():
+                body.extend(chunk)
+                # Wait for enough bytes to recognize a signature; chunks can be tiny
+                if kind == "unknown" and len(body) >= SNIFF_BYTES:
+                    kind = _content_kind(content_type, url, bytes(body[:SNIFF_BYTES]))
+                    if kind is None:
+                        logger.info("Skipping %s: unrecognized binary content", url)
+                        return None
+                    limit = MAX_PDF_BYTES if kind == "pdf" else MAX_FETCH_BYTES
+                if len(body) >= limit:
+                    if kind == "pdf":
+                        # A truncated PDF cannot be parsed
+                        logger.info("Skipping %s: PDF exceeds %d bytes", url, limit)
+                        return None
+                    break
+            encoding = response.charset_encoding or "utf-8"
+
+        if kind == "unknown":
+            # The whole body is shorter than SNIFF_BYTES
+            kind = _content_kind(content_type, url, bytes(body)) if body else None
+            if kind is None:
+                logger.info("Skipping %s: unrecognized binary content", url)
+                return None
+        if kind == "pdf":
+            return extract_pdf_text(bytes(body))
+        text = bytes(body[:limit]).decode(encoding, errors="replace")
+        if kind == "html":
+            from markdownify import markdownify
+            return markdownify(text)
+        return text
     except Exception as e:
-        print(f"Warning: Failed to fetch full page content for {url}: {str(e)}")
+        if isinstance(e, httpx.TransportError) and not isinstance(e, httpx.UnsupportedProtocol):
+            # Timeouts, connection and TLS errors: skip the host for a while
+            host_health.record_failure(url, type(e).__name__)
+        logger.warning("Failed to fetch full page content for %s: %s", url, e)
         return None
 
-@traceable
-def duckduckgo_search(query: str, max_results: int = 3, fetch_full_page: bool = False) -> Dict[str, List[Dict[str, Any]]]:
+def with_page_content(candidates: List[Dict[str, Any]], max_results: int, fetch_full_page: bool) -> List[Dict[str, Any]]:
+    """Add raw content to search results, replacing results whose page cannot be fetched.
+    
+    Candidates are taken in order. With fetch_full_page, a result whose page
+    cannot be fetched (for example because its host is backing off) is set
+    aside and the next candidate is tried instead; set-aside results are only
+    used, with raw_content None, when the candidates run out.
+    
+    Args:
+        candidates (List[Dict[str, Any]]): Results with title, url and content, in ranked
+            order, possibly more than max_results
+        max_results (int): Maximum number of results to return
+        fetch_full_page (bool): Whether to fetch full page content from result URLs
+        
+    Returns:
+        List[Dict[str, Any]]: Up to max_results results with raw_content added
     """
-    Search the web using DuckDuckGo and return formatted results.
+    results, unfetched = [], []
+    for candidate in candidates:
+        if len(results) >= max_results:
+            break
+        if not fetch_full_page:
+            results.append({**candidate, "raw_content": candidate["content"]})
+            continue
+        raw_content = fetch_raw_content(candidate["url"])
+        if raw_content is None:
+            unfetched.append({**candidate, "raw_content": None})
+            continue
+        results.append({**candidate, "raw_content": raw_content})
+    return results + unfetched[:max_results - len(results)]
+
+@traceable
+def duckduckgo_search(query: str, max_results: int = 3, fetch_full_page: bool = False, timeout: float = 10.0) -> Dict[str, List[Dict[str, Any]]]:
+    """Search the web using DuckDuckGo and return formatted results.
     
-    Uses the DDGS library to perform web searches through DuckDuckGo.
+    Uses the DDGS library to perform web searches through DuckDuckGo, reusing
+    this thread's DDGS session. When fetching full pages, a few spare results
+    are requested to replace results whose page cannot be fetched.
     
     Args:
         query (str): The search query to execute
         max_results (int, optional): Maximum number of results to return. Defaults to 3.
         fetch_full_page (bool, optional): Whether to fetch full page content from result URLs. 
                                          Defaults to False.
+        timeout (float, optional): Request timeout in seconds. Defaults to 10.
     Returns:
         Dict[str, List[Dict[str, Any]]]: Search response containing:
             - results (list): List of search result dictionaries, each containing:
@@ -170,54 +793,44 @@ def duckduckgo_search(query: str, max_results: int = 3, fetch_full_page: bool =
                 - content (str): Snippet/summary of the content
                 - raw_content (str or None): Full page content if fetch_full_page is True,
                                             otherwise same as content
+                                            
+    Raises:
+        Exception: Any DuckDuckGo error (e.g. rate limiting), so callers can fail over
     """
-    try:
-        with DDGS() as ddgs:
-            results = []
-            search_results = list(ddgs.text(query, max_results=max_results))
-            
-            for r in search_results:
-                url = r.get('href')
-                title = r.get('title')
-                content = r.get('body')
-                
-                if not all([url, title, content]):
-                    print(f"Warning: Incomplete result from DuckDuckGo: {r}")
-                    continue
+    ddgs = get_ddgs(timeout)
+    candidates = []
+    # Ask for spare results to replace pages that cannot be fetched
+    search_results = list(ddgs.text(query, max_results=max_results + (SPARE_RESULTS if fetch_full_page else 0)))
+    
+    for r in search_results:
+        url = r.get('href')
+        title = r.get('title')
+        content = r.get('body')
+        
+        if not all([url, title, content]):
+            print(f"Warning: Incomplete result from DuckDuckGo: {r}")
+            continue
 
-                raw_content = content
-                if fetch_full_page:
-                    raw_content = fetch_raw_content(url)
-                
-                # Add result to list
-                result = {
-                    "title": title,
-                    "url": url,
-                    "content": content,
-                    "raw_content": raw_content
-                }
-                results.append(result)
-            
-            return {"results": results}
-    except Exception as e:
-        print(f"Error in DuckDuckGo search: {str(e)}")
-        print(f"Full error details: {type(e).__name__}")
-        return {"results": []}
+        candidates.append({"title": title, "url": url, "content": content})
+    
+    return {"results": with_page_content(candidates, max_results, fetch_full_page)}
 
 @traceable
-def searxng_search(query: str, max_results: int = 3, fetch_full_page: bool = False) -> Dict[str, List[Dict[str, Any]]]:
-    """
-    Search the web using SearXNG and return formatted results.
+def searxng_search(query: str, max_results: int = 3, fetch_full_page: bool = False, timeout: float = 30.0) -> Dict[str, List[Dict[str, Any]]]:
+    """Search the web using SearXNG and return formatted results.
     
-    Uses the SearxSearchWrapper to perform searches through a SearXNG instance.
-    The SearXNG host URL is read from the SEARXNG_URL environment variable
-    or defaults to http://localhost:8888.
+    Queries the JSON API of a SearXNG instance through the shared SearXNG
+    client (the instance must have the json format enabled). The SearXNG host
+    URL is read from the SEARXNG_URL environment variable or defaults to
+    http://localhost:8888. When fetching full pages, results whose page cannot
+    be fetched are replaced by the next results of the response.
     
     Args:
         query (str): The search query to execute
         max_results (int, optional): Maximum number of results to return. Defaults to 3.
         fetch_full_page (bool, optional): Whether to fetch full page content from result URLs.
                                          Defaults to False.
+        timeout (float, optional): Read timeout in seconds. Defaults to 30.
         
     Returns:
         Dict[str, List[Dict[str, Any]]]: Search response containing:
@@ -227,48 +840,43 @@ def searxng_search(query: str, max_results: int = 3, fetch_full_page: bool = Fal
                 - content (str): Snippet/summary of the content
                 - raw_content (str or None): Full page content if fetch_full_page is True,
                                            otherwise same as content
+                                           
+    Raises:
+        httpx.HTTPError: If the request fails or times out
     """
-    host=os.environ.get("SEARXNG_URL", "http://localhost:8888")
-    s = SearxSearchWrapper(searx_host=host)
+    host=os.environ.get("SEARXNG_URL", "http://localhost:8888").rstrip("/")
+    client = get_http_client("searxng", timeout)
+    response = client.get(f"{host}/search", params={"q": query, "format": "json"})
+    response.raise_for_status()
 
-    results = []
-    search_results = s.results(query, num_results=max_results)
+    candidates = []
+    # Keep spare results to replace pages that cannot be fetched
+    search_results = response.json().get("results", [])[:max_results + (SPARE_RESULTS if fetch_full_page else 0)]
     for r in search_results:
-        url = r.get('link')
+        url = r.get('url')
         title = r.get('title')
-        content = r.get('snippet')
+        content = r.get('content')
         
         if not all([url, title, content]):
             print(f"Warning: Incomplete result from SearXNG: {r}")
             continue
 
-        raw_content = content
-        if fetch_full_page:
-            raw_content = fetch_raw_content(url)
-        
-        # Add result to list
-        result = {
-            "title": title,
-            "url": url,
-            "content": content,
-            "raw_content": raw_content
-        }
-        results.append(result)
-    return {"results": results}
+        candidates.append({"title": title, "url": url, "content": content})
+    return {"results": with_page_content(candidates, max_results, fetch_full_page)}
     
 @traceable
-def tavily_search(query: str, fetch_full_page: bool = True, max_results: int = 3) -> Dict[str, List[Dict[str, Any]]]:
-    """
-    Search the web using the Tavily API and return formatted results.
+def tavily_search(query: str, fetch_full_page: bool = True, max_results: int = 3, timeout: float = 30.0) -> Dict[str, List[Dict[str, Any]]]:
+    """Search the web using the Tavily API and return formatted results.
     
-    Uses the TavilyClient to perform searches. Tavily API key must be configured
-    in the environment.
+    Uses the shared TavilyClient to perform searches. Tavily API key must be
+    configured in the environment.
     
     Args:
         query (str): The search query to execute
         fetch_full_page (bool, optional): Whether to include raw content from sources.
                                          Defaults to True.
         max_results (int, optional): Maximum number of results to return. Defaults to 3.
+        timeout (float, optional): Request timeout in seconds. Defaults to 30.
         
     Returns:
         Dict[str, List[Dict[str, Any]]]: Search response containing:
@@ -279,24 +887,25 @@ def tavily_search(query: str, fetch_full_page: bool = True, max_results: int = 3
                 - raw_content (str or None): Full content of the page if available and 
                                             fetch_full_page is True
     """
-     
-    tavily_client = TavilyClient()
-    return tavily_client.search(query, 
+
+    return get_tavily_client().search(query, 
                          max_results=max_results, 
-                         include_raw_content=fetch_full_page)
+                         include_raw_content=fetch_full_page,
+                         timeout=int(timeout))
 
 @traceable
-def perplexity_search(query: str, perplexity_search_loop_count: int = 0) -> Dict[str, Any]:
-    """
-    Search the web using the Perplexity API and return formatted results.
+def perplexity_search(query: str, perplexity_search_loop_count: int = 0, timeout: float = 60.0) -> Dict[str, Any]:
+    """Search the web using the Perplexity API and return formatted results.
     
-    Uses the Perplexity API to perform searches with the 'sonar-pro' model.
+    Uses the Perplexity API to perform searches with the 'sonar-pro' model,
+    through the shared Perplexity client.
     Requires a PERPLEXITY_API_KEY environment variable to be set.
     
     Args:
         query (str): The search query to execute
         perplexity_search_loop_count (int, optional): The loop step for perplexity search
                                                      (used for source labeling). Defaults to 0.
+        timeout (float, optional): Request timeout in seconds. Defaults to 60.
   
     Returns:
         Dict[str, Any]: Search response containing:
@@ -308,7 +917,7 @@ def perplexity_search(query: str, perplexity_search_loop_count: int = 0) -> Dict
                                             citation sources
                                             
     Raises:
-        requests.exceptions.HTTPError: If the API request fails
+        httpx.HTTPError: If the API request fails or times out
     """
 
     headers = {
@@ -331,7 +940,7 @@ def perplexity_search(query: str, perplexity_search_loop_count: int = 0) -> Dict
         ]
     }
     
-    response = requests.post(
+    response = get_http_client("perplexity", timeout).post(
         "https://api.perplexity.ai/chat/completions",
         headers=headers,
         json=payload
@@ -0,0 +1,90 @@
+from ollama_deep_researcher.utils import (
+    deduplicate_and_format_sources,
+    format_source_header,
+    split_into_chunks,
+)
+
+
+def test_split_into_chunks_respects_the_limit_and_keeps_all_text():
+    paragraphs = [f"Paragraph {i} " + "word " * 40 for i in range(30)]
+    text = "\n\n".join(paragraphs)
+
+    chunks = split_into_chunks(text, 500)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_split_into_chunks_cuts_overlong_lines():
+    chunks = split_into_chunks("x" * 1050, 500)
+
+    assert [len(chunk) for chunk in chunks] == [500, 500, 50]
+
+
+def test_every_chunk_starts_with_the_source_header():
+    source = {"title": "Transistor history", "url": "https://example.com/transistor"}
+    header = format_source_header(source)
+
+    chunks = split_into_chunks("line of text\n" * 300, 800, header=header)
+
+    assert len(chunks) > 1
+    assert all(chunk.startswith(header) and len(chunk) <= 800 for chunk in chunks)
+
+
+def test_formatted_sources_use_the_same_header():
+    source = {"title": "T", "url": "https://example.com/", "content": "snippet", "raw_content": "body"}
+
+    text = deduplicate_and_format_sources({"results": [source]}, max_tokens_per_source=10, fetch_full_page=True)
+
+    assert text.startswith("Sources:\n\n" + format_source_header(source))
+
+
+def test_map_step_keeps_each_source_body_without_its_header(tmp_path, monkeypatch):
+    from ollama_deep_researcher import graph
+    from ollama_deep_researcher.content_store import get_content_store
+    from ollama_deep_researcher.state import SummaryState
+
+    for name in ("LOCAL_CORPUS_MODE", "CONTENT_STORE_DIR", "SUMMARIZATION_MODE", "FETCH_FULL_PAGE",
+                 "MAP_MAX_TOKENS_PER_SOURCE", "NEAR_DUPLICATE_DISTANCE"):
+        monkeypatch.delenv(name, raising=False)
+    config = {"configurable": {"summarization_mode": "map_reduce", "fetch_full_page": True, "map_max_tokens_per_source": 5,
+                               "content_store_dir": str(tmp_path), "near_duplicate_distance": 0}}
+    source = {"title": "T", "url": "https://example.com/t", "content": "snippet", "raw_content": "x" * 30}
+
+    class OneResult:
+        def search(self, query, fetch_full_page, loop_count):
+            return {"results": [source]}
+
+    monkeypatch.setattr(graph, "get_search_orchestrator", lambda _: OneResult())
+    update = graph.web_research(SummaryState(research_topic="t", search_query="t"), config)
+
+    [source_ref] = update["web_research_results"][0]["source_refs"]
+    store = get_content_store(graph.Configuration.from_runnable_config(config))
+    assert source_ref["header"] == format_source_header(source)
+    assert store.get(source_ref["ref"]) == "snippet\n\n" + "x" * 20 + "... [truncated]"
+
+
+def test_map_replies_without_relevant_information_are_dropped(monkeypatch):
+    from types import SimpleNamespace
+
+    from ollama_deep_researcher import graph
+
+    replies = {
+        "a": "- A relevant fact",
+        "b": "No relevant information",
+        "c": "Source C : https://example.com/c\nNo relevant information.",
+        "d": "Source D : https://example.com/d\n- Another fact",
+    }
+
+    class FakeLLM:
+        def invoke(self, messages):
+            assert "No relevant information" in messages[0].content
+            return SimpleNamespace(content=replies[messages[1].content[-1]])
+
+    monkeypatch.setattr(graph, "call_llm", lambda configurable, priority, call: call(FakeLLM()))
+    sources = [(f"Source {key}\n", f"text {key}") for key in replies]
+
+    notes = graph.condense_sources("topic", sources, graph.Configuration(strip_thinking_tokens=False))
+
+    assert notes == "- A relevant fact\n\nSource D : https://example.com/d\n- Another fact"
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from ollama_deep_researcher.content_store import DiskContentStore
+
+
+def test_disk_store_evicts_least_recently_used_entries(tmp_path):
+    store = DiskContentStore(str(tmp_path), max_bytes=3000)
+    keys = [store.put(letter * 1000) for letter in "abc"]
+    # Give the entries distinct ages, oldest first, then read the oldest
+    for age, key in enumerate(keys):
+        os.utime(store._file(key), (100 + age, 100 + age))
+    assert store.get(keys[0]) == "a" * 1000
+
+    new_key = store.put("d" * 1000)
+
+    assert store.get(new_key) == "d" * 1000
+    assert store.get(keys[0]) == "a" * 1000
+    for key in keys[1:]:
+        with pytest.raises(KeyError):
+            store.get(key)
+
+
+def test_disk_store_counts_existing_entries(tmp_path):
+    DiskContentStore(str(tmp_path), max_bytes=0).put("x" * 2000)
+    store = DiskContentStore(str(tmp_path), max_bytes=2500)
+    assert store._size == 2000
+
+    store.put("y" * 1000)
+
+    assert sum(size for _, size, _ in store._entries()) == 1000
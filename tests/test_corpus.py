@@ -0,0 +1,162 @@
+import numpy as np
+
+from ollama_deep_researcher.corpus import CorpusIndex, LexicalEmbedder
+
+TRANSISTOR_PAGE = {
+    "title": "The invention of the transistor",
+    "url": "https://example.com/history/transistor?utm_source=feed",
+    "content": "In 1947 John Bardeen and Walter Brattain at Bell Labs built the first point-contact transistor.",
+    "raw_content": (
+        "The transistor was invented at Bell Labs in December 1947. Bardeen, Brattain and Shockley "
+        "shared the 1956 Nobel Prize in Physics for their research on semiconductors and the "
+        "discovery of the transistor effect. Early transistors replaced vacuum tubes in radios. "
+    ) * 20,
+}
+BAKING_PAGE = {
+    "title": "Sourdough baking basics",
+    "url": "https://example.org/bread",
+    "content": "How to feed a starter and bake a loaf of sourdough bread at home.",
+    "raw_content": "Flour, water and salt are all a sourdough loaf needs. " * 40,
+}
+
+
+def test_lexical_corpus_returns_stored_document_at_default_threshold(tmp_path):
+    index = CorpusIndex(str(tmp_path), LexicalEmbedder())
+    assert index.add([TRANSISTOR_PAGE, BAKING_PAGE]) == 2
+
+    hits = index.search("history of the invention of transistors at Bell Labs", k=3, min_score=0.6)
+
+    assert [result["url"] for _, result in hits] == [TRANSISTOR_PAGE["url"]]
+    assert hits[0][1]["raw_content"].startswith("The transistor was invented")
+    assert index.search("quantum computing error correction", k=3, min_score=0.6) == []
+
+
+def test_corpus_persists_and_skips_known_urls(tmp_path):
+    index = CorpusIndex(str(tmp_path), LexicalEmbedder())
+    index.add([TRANSISTOR_PAGE])
+
+    reloaded = CorpusIndex(str(tmp_path), LexicalEmbedder())
+    same_page = {**TRANSISTOR_PAGE, "url": "https://example.com/history/transistor"}
+
+    assert len(reloaded) == 1
+    assert reloaded.add([same_page]) == 0
+    assert reloaded.search("Bell Labs transistor", min_score=0.6)[0][1]["title"] == TRANSISTOR_PAGE["title"]
+
+
+class OneHotEmbedder:
+    """Embeds each text as a one-hot vector of its first character, for exact expectations."""
+
+    key = "one-hot"
+    stores_vectors = True
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), 26), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row, ord(text[0].lower()) - ord("a")] = 1.0
+        return matrix
+
+
+def test_vector_corpus_grows_across_many_adds_and_reloads(tmp_path):
+    index = CorpusIndex(str(tmp_path), OneHotEmbedder())
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for i in range(200):
+        letter = letters[i % 26]
+        index.add([{"title": f"{letter} page {i}", "url": f"https://example.com/{i}", "content": letter}])
+
+    hits = index.search("k", k=10, min_score=0.5)
+    assert len(index) == 200
+    assert len(hits) == 8
+    assert all(result["title"].startswith("k ") for _, result in hits)
+
+    reloaded = CorpusIndex(str(tmp_path), OneHotEmbedder())
+    assert len(reloaded.search("k", k=10, min_score=0.5)) == 8
+
+
+def test_prefer_mode_answers_from_the_corpus_without_searching(tmp_path, monkeypatch):
+    from ollama_deep_researcher import graph
+    from ollama_deep_researcher.content_store import get_content_store
+    from ollama_deep_researcher.state import SummaryState
+
+    for name in ("LOCAL_CORPUS_MODE", "LOCAL_CORPUS_DIR", "LOCAL_CORPUS_EMBEDDING_MODEL", "LOCAL_CORPUS_MIN_HITS",
+                 "LOCAL_CORPUS_MIN_SCORE", "CONTENT_STORE_DIR", "SUMMARIZATION_MODE"):
+        monkeypatch.delenv(name, raising=False)
+    configurable = {"local_corpus_mode": "prefer", "local_corpus_dir": str(tmp_path / "corpus"),
+                    "local_corpus_min_hits": 1, "content_store_dir": str(tmp_path / "store")}
+    config = {"configurable": configurable}
+    CorpusIndex(str(tmp_path / "corpus" / "lexical"), LexicalEmbedder()).add([TRANSISTOR_PAGE, BAKING_PAGE])
+
+    def no_search(_):
+        raise AssertionError("the web was searched")
+
+    monkeypatch.setattr(graph, "get_search_orchestrator", no_search)
+    state = SummaryState(research_topic="transistors", search_query="invention of the transistor at Bell Labs")
+
+    update = graph.web_research(state, config)
+
+    assert TRANSISTOR_PAGE["url"] in update["sources_gathered"][0]
+    assert BAKING_PAGE["url"] not in update["sources_gathered"][0]
+    store = get_content_store(graph.Configuration.from_runnable_config(config))
+    assert "Bell Labs" in store.get(update["web_research_results"][0]["ref"])
+
+
+def test_indexes_sharing_a_directory_see_each_others_documents(tmp_path):
+    # Two instances stand in for two server worker processes
+    first = CorpusIndex(str(tmp_path), OneHotEmbedder())
+    second = CorpusIndex(str(tmp_path), OneHotEmbedder())
+
+    assert first.add([{"title": "k page", "url": "https://example.com/k", "content": "k"}]) == 1
+    assert [result["url"] for _, result in second.search("k", min_score=0.5)] == ["https://example.com/k"]
+    assert second.add([{"title": "k page", "url": "https://example.com/k?utm_source=x", "content": "k"}]) == 0
+    assert second.add([{"title": "m page", "url": "https://example.com/m", "content": "m"}]) == 1
+    assert len(first.search("m", min_score=0.5)) == 1
+    assert len(CorpusIndex(str(tmp_path), OneHotEmbedder())) == 2
+
+
+def test_interrupted_write_is_cut_off_before_the_next_append(tmp_path):
+    index = CorpusIndex(str(tmp_path), OneHotEmbedder())
+    index.add([{"title": "a page", "url": "https://example.com/a", "content": "a"}])
+    # A writer died after writing a vector row and half a document line
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        np.ones((1, 26), dtype=np.float32).tofile(f)
+    with open(tmp_path / "documents.jsonl", "a") as f:
+        f.write('{"key": "half')
+
+    assert index.add([{"title": "b page", "url": "https://example.com/b", "content": "b"}]) == 1
+
+    reloaded = CorpusIndex(str(tmp_path), OneHotEmbedder())
+    assert len(reloaded) == 2
+    assert [result["url"] for _, result in reloaded.search("b", min_score=0.5)] == ["https://example.com/b"]
+
+
+def test_search_skips_excluded_urls(tmp_path):
+    index = CorpusIndex(str(tmp_path), LexicalEmbedder())
+    other_page = {**TRANSISTOR_PAGE, "url": "https://example.net/transistor"}
+    index.add([TRANSISTOR_PAGE, other_page])
+
+    hits = index.search("Bell Labs transistor", k=1, min_score=0.6, exclude_urls=["https://example.com/history/transistor"])
+
+    assert [result["url"] for _, result in hits] == [other_page["url"]]
+
+
+def test_augment_mode_leaves_out_sources_the_run_already_used(tmp_path, monkeypatch):
+    from ollama_deep_researcher import graph
+    from ollama_deep_researcher.state import SummaryState
+
+    for name in ("LOCAL_CORPUS_MODE", "LOCAL_CORPUS_DIR", "LOCAL_CORPUS_EMBEDDING_MODEL", "LOCAL_CORPUS_MIN_SCORE",
+                 "CONTENT_STORE_DIR", "SUMMARIZATION_MODE", "NEAR_DUPLICATE_DISTANCE"):
+        monkeypatch.delenv(name, raising=False)
+    config = {"configurable": {"local_corpus_mode": "augment", "local_corpus_dir": str(tmp_path / "corpus"),
+                               "content_store_dir": str(tmp_path / "store"), "near_duplicate_distance": 0}}
+    CorpusIndex(str(tmp_path / "corpus" / "lexical"), LexicalEmbedder()).add([TRANSISTOR_PAGE])
+
+    class NoResults:
+        def search(self, query, fetch_full_page, loop_count):
+            return {"results": []}
+
+    monkeypatch.setattr(graph, "get_search_orchestrator", lambda _: NoResults())
+    state = SummaryState(research_topic="transistors", search_query="invention of the transistor at Bell Labs")
+
+    assert TRANSISTOR_PAGE["url"] in graph.web_research(state, config)["sources_gathered"][0]
+
+    state.sources_gathered = [f"* {TRANSISTOR_PAGE['title']} : https://example.com/history/transistor"]
+    assert graph.web_research(state, config)["sources_gathered"][0] == ""
@@ -0,0 +1,41 @@
+import random
+
+from ollama_deep_researcher.utils import drop_near_duplicates, simhash
+
+WORDS = ("model latency queue worker summary source evidence result analysis system report data "
+         "method finding context detail topic search page research throughput cache index").split()
+
+
+def article(seed, words=300):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def test_simhash_is_close_for_near_duplicates_and_far_for_unrelated_texts():
+    text = article(1)
+    edited = text.replace("queue", "queues", 2) + " Updated yesterday."
+
+    assert bin(simhash(text) ^ simhash(edited)).count("1") <= 10
+    assert bin(simhash(text) ^ simhash(article(2))).count("1") > 10
+
+
+def test_drop_near_duplicates_keeps_the_first_copy_and_short_sources():
+    original = {"url": "https://a.example/story", "raw_content": article(1)}
+    mirror = {"url": "https://b.example/copy", "raw_content": article(1) + " Shared from a.example."}
+    other = {"url": "https://c.example/other", "raw_content": article(2)}
+    short = {"url": "https://d.example/short", "raw_content": "too short to fingerprint"}
+
+    kept, fingerprints = drop_near_duplicates([original, mirror, other, short, dict(short)], [])
+
+    assert [s["url"] for s in kept] == [original["url"], other["url"], short["url"], short["url"]]
+    assert len(fingerprints) == 2
+
+
+def test_drop_near_duplicates_compares_with_earlier_loops():
+    first = {"url": "https://a.example/story", "raw_content": article(1)}
+    _, fingerprints = drop_near_duplicates([first], [])
+
+    mirror = {"url": "https://b.example/copy", "content": article(1)}
+    kept, new_fingerprints = drop_near_duplicates([mirror], fingerprints)
+
+    assert kept == [] and new_fingerprints == []
@@ -0,0 +1,81 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from ollama_deep_researcher import llm
+from ollama_deep_researcher.configuration import Configuration
+from ollama_deep_researcher.endpoints import EndpointPool, get_endpoint_pool
+from ollama_deep_researcher.governor import PRIORITY_BULK
+
+
+def test_health_checks_do_not_block_requests(monkeypatch):
+    pool = EndpointPool(["http://a:11434", "http://b:11434"], health_interval=60)
+    release = threading.Event()
+    checks = []
+
+    def slow_check(endpoint):
+        checks.append(endpoint.url)
+        release.wait(5)
+        endpoint.checked_at = time.monotonic()
+
+    monkeypatch.setattr(pool, "check", slow_check)
+
+    start = time.monotonic()
+    pool.choose("model")
+    assert pool.refresh() is None  # one refresh at a time
+    pool.choose("model")
+    assert time.monotonic() - start < 1
+
+    release.set()
+    for _ in range(100):
+        if not pool._refreshing:
+            break
+        time.sleep(0.01)
+    assert checks == ["http://a:11434", "http://b:11434"]
+    assert pool.refresh() is None  # nothing is due again yet
+
+
+@pytest.fixture
+def two_endpoints():
+    configurable = Configuration(ollama_base_urls="http://down.test:11434,http://up.test:11434", llm_parallel_slots=0)
+    pool = get_endpoint_pool(configurable)
+    for endpoint in pool.endpoints:
+        endpoint.healthy = True
+        endpoint.checked_at = time.monotonic()
+    return configurable, pool
+
+
+def test_a_request_that_cannot_connect_is_retried_on_another_endpoint(two_endpoints, monkeypatch):
+    configurable, pool = two_endpoints
+    monkeypatch.setattr(llm, "get_llm", lambda configurable, format=None, base_url=None: SimpleNamespace(base_url=base_url))
+    attempts = []
+
+    def call(model):
+        attempts.append(model.base_url)
+        if model.base_url == "http://down.test:11434":
+            raise ConnectionError("Failed to connect to Ollama")
+        return "answer"
+
+    # The first request sticks to the unreachable endpoint
+    pool._sticky["run"] = pool.endpoints[0]
+    assert llm.call_llm(configurable, PRIORITY_BULK, call, run_key="run") == "answer"
+
+    assert attempts == ["http://down.test:11434", "http://up.test:11434"]
+    assert not pool.endpoints[0].healthy
+    assert all(endpoint.outstanding == 0 for endpoint in pool.endpoints)
+
+
+def test_other_errors_are_not_retried(two_endpoints, monkeypatch):
+    configurable, _ = two_endpoints
+    monkeypatch.setattr(llm, "get_llm", lambda configurable, format=None, base_url=None: SimpleNamespace(base_url=base_url))
+    attempts = []
+
+    def call(model):
+        attempts.append(model.base_url)
+        raise ValueError("bad output")
+
+    with pytest.raises(ValueError):
+        llm.call_llm(configurable, PRIORITY_BULK, call)
+    assert len(attempts) == 1
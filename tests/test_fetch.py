@@ -0,0 +1,103 @@
+import httpx
+import pytest
+
+from ollama_deep_researcher import utils
+
+
+def _pdf_with_text(text):
+    """Build a one-page PDF showing ``text``."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+class Chunks(httpx.SyncByteStream):
+    """Response body delivered in the given chunks, recording whether it was read."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = False
+
+    def __iter__(self):
+        self.read = True
+        yield from self.chunks
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Answer every fetch with the given headers and body chunks, returning the body stream."""
+
+    def serve(headers, *chunks):
+        body = Chunks(chunks)
+        client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, headers=headers, stream=body)))
+        monkeypatch.setattr(utils, "get_http_client", lambda *args, **kwargs: client)
+        return body
+
+    return serve
+
+
+def test_html_is_converted_to_markdown(serve):
+    serve({"content-type": "text/html; charset=utf-8"}, b"<html><body><h1>Title</h1><p>Caf\xc3\xa9</p></body></html>")
+
+    text = utils._fetch_raw_content("https://fetch.test/page")
+
+    assert "Title\n=====" in text
+    assert "Café" in text
+
+
+def test_declared_charset_is_used_to_decode_text(serve):
+    serve({"content-type": "text/plain; charset=iso-8859-1"}, "Café crème".encode("iso-8859-1"))
+
+    assert utils._fetch_raw_content("https://fetch.test/notes.txt") == "Café crème"
+
+
+def test_pdf_text_is_extracted(serve):
+    serve({"content-type": "application/pdf"}, _pdf_with_text("Transistors at Bell Labs"))
+
+    assert "Transistors at Bell Labs" in utils._fetch_raw_content("https://fetch.test/paper")
+
+
+def test_images_are_skipped_without_reading_the_body(serve):
+    body = serve({"content-type": "image/png"}, b"\x89PNG\r\n" + b"\x00" * 2000)
+
+    assert utils._fetch_raw_content("https://fetch.test/photo.png") is None
+    assert not body.read
+
+
+def test_untyped_bodies_are_sniffed(serve):
+    serve({"content-type": "application/octet-stream"}, _pdf_with_text("Sniffed PDF"))
+    assert "Sniffed PDF" in utils._fetch_raw_content("https://fetch.test/download")
+
+    serve({}, b"  <!DOCTYPE html><html><body><p>Sniffed page</p></body></html>")
+    assert "Sniffed page" in utils._fetch_raw_content("https://fetch.test/untyped")
+
+    serve({"content-type": "application/octet-stream"}, b"PK\x03\x04" + b"\x00" * 2000)
+    assert utils._fetch_raw_content("https://fetch.test/archive") is None
+
+
+def test_untyped_body_in_tiny_chunks_is_sniffed_once_enough_arrived(serve):
+    serve({}, b"<ht", b"ml><body><p>Slow page</p>", b"</body></html>")
+
+    assert "Slow page" in utils._fetch_raw_content("https://fetch.test/slow")
+
+
+def test_text_is_truncated_at_the_size_limit(serve, monkeypatch):
+    monkeypatch.setattr(utils, "MAX_FETCH_BYTES", 100)
+    serve({"content-type": "text/plain"}, b"a" * 60, b"b" * 60, b"c" * 60)
+
+    assert utils._fetch_raw_content("https://fetch.test/long.txt") == "a" * 60 + "b" * 40
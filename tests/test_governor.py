@@ -0,0 +1,71 @@
+import threading
+import time
+
+from ollama_deep_researcher.configuration import Configuration
+from ollama_deep_researcher.governor import (
+    PRIORITY_BULK,
+    PRIORITY_CONTROL,
+    PrioritySemaphore,
+    get_governor,
+    governor_metrics,
+)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert condition()
+
+
+def test_free_slots_are_granted_without_waiting():
+    semaphore = PrioritySemaphore(2)
+    semaphore.acquire(PRIORITY_BULK)
+    semaphore.acquire(PRIORITY_BULK)
+
+    assert semaphore.queued == 0
+
+
+def test_released_slots_go_to_the_highest_priority_then_the_oldest_waiter():
+    semaphore = PrioritySemaphore(1)
+    semaphore.acquire(PRIORITY_BULK)
+    order = []
+
+    def waiter(name, priority):
+        semaphore.acquire(priority)
+        order.append(name)
+        semaphore.release()
+
+    threads = []
+    for name, priority in (("bulk 1", PRIORITY_BULK), ("bulk 2", PRIORITY_BULK), ("control", PRIORITY_CONTROL)):
+        thread = threading.Thread(target=waiter, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: semaphore.queued == len(threads))
+    assert semaphore.queued_by_priority() == {PRIORITY_BULK: 2, PRIORITY_CONTROL: 1}
+
+    semaphore.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["control", "bulk 1", "bulk 2"]
+    assert semaphore.queued == 0
+    assert semaphore._in_use == 0
+
+
+def test_metrics_report_slots_queue_depth_and_waits():
+    configurable = Configuration(ollama_base_url="http://metrics.test:11434/", llm_parallel_slots=2)
+    governor = get_governor(configurable)
+    with governor.slot(PRIORITY_CONTROL):
+        figures = governor_metrics()["http://metrics.test:11434"]
+        assert figures["slots"] == 2
+        assert figures["in_flight"] == 1
+    with governor.slot(PRIORITY_BULK):
+        pass
+
+    figures = governor_metrics()["http://metrics.test:11434"]
+    assert figures["in_flight"] == 0
+    assert figures["control"]["requests"] == 1
+    assert figures["bulk"]["requests"] == 1
+    assert figures["bulk"]["queued"] == 0
+    assert figures["control"]["p95"] >= 0.0
@@ -0,0 +1,60 @@
+import time
+
+from ollama_deep_researcher.host_health import HostHealthRegistry
+
+
+def test_failures_back_off_the_host_until_a_trial_fetch():
+    registry = HostHealthRegistry(backoff=60)
+    registry.record_failure("https://slow.example/a", "ConnectTimeout")
+
+    assert not registry.allow("https://slow.example/b", trial_timeout=10)
+    assert registry.status("https://slow.example/b") == "ConnectTimeout"
+    assert registry.allow("https://other.example/a", trial_timeout=10)
+
+    # Once the backoff has passed, one trial fetch goes through
+    registry._hosts["slow.example"].blocked_until = 0.0
+    assert registry.allow("https://slow.example/b", trial_timeout=10)
+    assert not registry.allow("https://slow.example/c", trial_timeout=10)
+
+    registry.record_response("https://slow.example/b", 200, 0.5)
+    assert registry.allow("https://slow.example/c", trial_timeout=10)
+
+
+def test_backoff_doubles_and_respects_retry_after():
+    registry = HostHealthRegistry(backoff=10, max_backoff=1000)
+    for _ in range(3):
+        registry.record_failure("https://busy.example/", "HTTP 503")
+    health = registry._hosts["busy.example"]
+    assert 35 < health.blocked_until - time.monotonic() <= 40
+
+    registry.record_response("https://busy.example/", 429, 0.1, retry_after="500")
+    assert health.failures == 4
+    assert 495 < health.blocked_until - time.monotonic() <= 500
+    assert registry.status("https://busy.example/") == "HTTP 429"
+
+
+def test_403_skips_only_the_refused_page():
+    registry = HostHealthRegistry(backoff=60)
+    registry.record_response("https://news.example/paywalled?id=1", 403, 0.2)
+
+    assert not registry.allow("https://news.example/paywalled?id=2", trial_timeout=10)
+    assert registry.status("https://news.example/paywalled") == "HTTP 403"
+    assert registry.allow("https://news.example/free", trial_timeout=10)
+
+
+def test_timeout_adapts_to_fast_hosts_only_after_enough_samples():
+    registry = HostHealthRegistry()
+    assert registry.timeout_for("https://fast.example/", 10.0) == 10.0
+    for _ in range(5):
+        registry.record_response("https://fast.example/", 200, 0.2)
+
+    assert registry.timeout_for("https://fast.example/", 10.0) == 4.0
+    assert registry.timeout_for("https://unknown.example/", 10.0) == 10.0
+
+
+def test_zero_backoff_disables_skipping():
+    registry = HostHealthRegistry(backoff=0)
+    registry.record_failure("https://down.example/", "ConnectError")
+    registry.record_response("https://down.example/page", 403, 0.1)
+
+    assert registry.allow("https://down.example/page", trial_timeout=10)
@@ -0,0 +1,18 @@
+from ollama_deep_researcher.lmstudio import response_format_for
+from ollama_deep_researcher.schemas import Reflection, SearchQuery
+
+
+def test_strict_response_format_requires_every_property():
+    for model in (SearchQuery, Reflection):
+        response_format = response_format_for(model.model_json_schema())
+        schema = response_format["json_schema"]["schema"]
+
+        assert response_format["json_schema"]["strict"] is True
+        assert sorted(schema["required"]) == sorted(schema["properties"])
+        assert schema["additionalProperties"] is False
+        assert all("default" not in prop for prop in schema["properties"].values())
+
+
+def test_json_mode_and_plain_text_formats():
+    assert response_format_for("json") == {"type": "json_object"}
+    assert response_format_for(None) is None
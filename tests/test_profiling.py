@@ -0,0 +1,30 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ollama_deep_researcher import profiling
+
+
+def spin(seconds):
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+def test_samples_pool_threads_tagged_by_the_node(monkeypatch):
+    events = []
+    monkeypatch.setattr(profiling, "get_stream_writer", lambda: events.append)
+
+    def node(state):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(profiling.in_profiled_thread(lambda _: spin(0.1)), range(2)))
+        return {}
+
+    profiling.profile_node("node", node, {}, None, False)
+
+    profile = events[0]["profile"]
+    assert any(stack.endswith(":spin") for stack in profile["folded"])
+    assert profile["cpu_seconds"] >= 0.05
+
+
+def test_callables_are_not_wrapped_outside_a_profiled_node():
+    assert profiling.in_profiled_thread(spin) is spin
@@ -0,0 +1,40 @@
+from ollama_deep_researcher.configuration import Configuration
+from ollama_deep_researcher.residency import (
+    ModelResidencyManager,
+    get_residency_manager,
+    warm_up_models,
+)
+
+
+def test_warm_up_loads_every_configured_model(monkeypatch):
+    warmed = []
+    monkeypatch.setattr(ModelResidencyManager, "warm_up",
+                        lambda self, model, embedding=False: warmed.append((self.base_url, model, embedding)))
+    configurable = Configuration(
+        local_llm="research-model", title_llm="title-model", local_corpus_mode="augment",
+        local_corpus_embedding_model="embed-model", ollama_base_urls="http://a:11434,http://b:11434",
+    )
+
+    warm_up_models(configurable)
+
+    assert warmed == [
+        (url, model, embedding)
+        for url in ("http://a:11434", "http://b:11434")
+        for model, embedding in (("research-model", False), ("title-model", False), ("embed-model", True))
+    ]
+
+
+def test_warm_up_skips_the_embedder_without_a_corpus(monkeypatch):
+    warmed = []
+    monkeypatch.setattr(ModelResidencyManager, "warm_up", lambda self, model, embedding=False: warmed.append(model))
+
+    warm_up_models(Configuration(local_llm="model", title_llm="model", local_corpus_mode="off",
+                                 local_corpus_embedding_model="embed-model"))
+
+    assert warmed == ["model"]
+
+
+def test_residency_cache_uses_its_own_interval():
+    configurable = Configuration(ollama_base_url="http://residency-test:11434", residency_check_interval=42,
+                                 endpoint_health_interval=5)
+    assert get_residency_manager(configurable).check_interval == 42
@@ -0,0 +1,50 @@
+import time
+
+from ollama_deep_researcher import search, utils
+from ollama_deep_researcher.search import SearchOrchestrator
+from ollama_deep_researcher.shared_cache import configure_shared_caches
+
+
+def fake_results(count):
+    return {"results": [
+        {"title": f"Result {i}", "url": f"https://site{i}.example/page", "content": f"snippet {i}", "raw_content": f"snippet {i}"}
+        for i in range(count)
+    ]}
+
+
+def test_slow_pages_do_not_count_as_provider_timeouts(monkeypatch):
+    configure_shared_caches(0)
+    requested = []
+
+    def fake_duckduckgo(query, max_results, fetch_full_page, timeout):
+        requested.append((max_results, fetch_full_page))
+        return fake_results(max_results)
+
+    def slow_fetch(url):
+        time.sleep(0.1)
+        return None if "site0" in url else f"page of {url}"
+
+    monkeypatch.setattr(search, "duckduckgo_search", fake_duckduckgo)
+    monkeypatch.setattr(utils, "fetch_raw_content", slow_fetch)
+    orchestrator = SearchOrchestrator(["duckduckgo"], timeout=0.2, failure_threshold=1)
+
+    response = orchestrator.search("test query", fetch_full_page=True)
+
+    assert requested == [(search.MAX_RESULTS + utils.SPARE_RESULTS, False)]
+    assert response["search_api"] == "duckduckgo"
+    assert [r["url"] for r in response["results"]] == [f"https://site{i}.example/page" for i in (1, 2, 3)]
+    assert all(r["raw_content"].startswith("page of") for r in response["results"])
+    assert orchestrator.breakers["duckduckgo"].allow()
+
+
+def test_empty_results_fail_over_without_opening_the_circuit(monkeypatch):
+    configure_shared_caches(0)
+    monkeypatch.setattr(search, "duckduckgo_search", lambda query, **kwargs: {"results": []})
+    monkeypatch.setattr(search, "searxng_search", lambda query, **kwargs: fake_results(kwargs["max_results"]))
+    orchestrator = SearchOrchestrator(["duckduckgo", "searxng"], timeout=1, failure_threshold=1)
+
+    response = orchestrator.search("another query", fetch_full_page=False)
+
+    assert response["search_api"] == "searxng"
+    assert len(response["results"]) == search.MAX_RESULTS
+    assert orchestrator.breakers["duckduckgo"].allow()
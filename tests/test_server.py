@@ -0,0 +1,188 @@
+import asyncio
+import sys
+import threading
+import types
+
+import pytest
+
+from ollama_deep_researcher import server
+from ollama_deep_researcher.server import RunManager, RunStore
+
+
+@pytest.fixture
+def fast_supervision(monkeypatch):
+    monkeypatch.setattr(server, "SUPERVISE_INTERVAL", 0.05)
+    monkeypatch.setattr(server, "CANCEL_GRACE", 0.3)
+
+
+async def wait_for_slot(manager, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if not manager.slots.locked():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("the slot was not released")
+
+
+class BlockingGraph:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def stream(self, input, config, stream_mode):
+        yield "values", {"step": 1}
+        self.release.wait(5)
+        yield "values", {"step": 2}
+
+
+def test_slot_is_held_until_the_graph_thread_ends(monkeypatch, tmp_path):
+    graph = BlockingGraph()
+    monkeypatch.setitem(sys.modules, "ollama_deep_researcher.graph", types.SimpleNamespace(graph=graph))
+    store = RunStore(str(tmp_path / "runs.db"))
+
+    async def scenario():
+        manager = RunManager(store, 1)
+        store.create("run", {}, {})
+        events = manager.stream("run", {"input": {}, "on_disconnect": "continue"})
+        assert (await events.__anext__()).startswith("event: metadata")
+        assert "values" in await events.__anext__()
+        # The client goes away while the graph thread is still running
+        await events.aclose()
+        assert manager.slots.locked()
+        graph.release.set()
+        await wait_for_slot(manager)
+
+    asyncio.run(scenario())
+    assert store.get("run")["status"] == "success"
+
+
+def test_unfinished_runs_of_a_previous_server_are_interrupted(tmp_path):
+    store = RunStore(str(tmp_path / "runs.db"))
+    for run_id, status in (("pending", "pending"), ("running", "running"), ("done", "success")):
+        store.create(run_id, {}, {})
+        store.update(run_id, status)
+
+    assert RunStore(str(tmp_path / "runs.db")).interrupt_unfinished() == 2
+    assert [store.get(run_id)["status"] for run_id in ("pending", "running", "done")] == ["interrupted", "interrupted", "success"]
+
+
+class HungGraph:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def stream(self, input, config, stream_mode):
+        yield "values", {"step": 1}
+        # A node stuck in a call without a timeout of its own
+        self.release.wait(10)
+        yield "values", {"step": 2}
+
+
+def test_a_hung_node_fails_the_run_and_frees_its_slot(monkeypatch, tmp_path):
+    graph = HungGraph()
+    monkeypatch.setitem(sys.modules, "ollama_deep_researcher.graph", types.SimpleNamespace(graph=graph))
+    monkeypatch.setenv("NODE_TIMEOUT", "1")
+    store = RunStore(str(tmp_path / "runs.db"))
+
+    async def scenario():
+        manager = RunManager(store, 1)
+        store.create("run", {}, {})
+        events = [event async for event in manager.stream("run", {"input": {}})]
+        assert "NodeTimeout" in events[-1]
+        assert not manager.slots.locked()
+
+    asyncio.run(scenario())
+    graph.release.set()
+    record = store.get("run")
+    assert record["status"] == "error"
+    assert record["error"].startswith("NodeTimeout")
+
+
+def test_cancelling_a_hung_run_frees_its_slot(monkeypatch, tmp_path, fast_supervision):
+    graph = HungGraph()
+    monkeypatch.setitem(sys.modules, "ollama_deep_researcher.graph", types.SimpleNamespace(graph=graph))
+    store = RunStore(str(tmp_path / "runs.db"))
+
+    async def scenario():
+        manager = RunManager(store, 1)
+        store.create("run", {}, {})
+        events = manager.stream("run", {"input": {}})
+        await events.__anext__()
+        await events.__anext__()
+        assert manager.cancel("run")
+        rest = [event async for event in events]
+        assert "RunCancelled" in rest[-1]
+        await wait_for_slot(manager)
+        assert "run" not in manager.runs
+
+    asyncio.run(scenario())
+    graph.release.set()
+    assert store.get("run")["status"] == "interrupted"
+
+
+def test_a_disconnected_hung_run_frees_its_slot(monkeypatch, tmp_path, fast_supervision):
+    graph = HungGraph()
+    monkeypatch.setitem(sys.modules, "ollama_deep_researcher.graph", types.SimpleNamespace(graph=graph))
+    store = RunStore(str(tmp_path / "runs.db"))
+
+    async def scenario():
+        manager = RunManager(store, 1)
+        store.create("run", {}, {})
+        events = manager.stream("run", {"input": {}})
+        await events.__anext__()
+        await events.__anext__()
+        await events.aclose()
+        assert manager.slots.locked()
+        await wait_for_slot(manager)
+
+    asyncio.run(scenario())
+    graph.release.set()
+    assert store.get("run")["status"] == "interrupted"
+
+
+def test_a_run_over_its_time_limit_frees_its_slot(monkeypatch, tmp_path, fast_supervision):
+    graph = HungGraph()
+    monkeypatch.setitem(sys.modules, "ollama_deep_researcher.graph", types.SimpleNamespace(graph=graph))
+    store = RunStore(str(tmp_path / "runs.db"))
+
+    async def scenario():
+        manager = RunManager(store, 1, run_timeout=0.3)
+        store.create("run", {}, {})
+        events = [event async for event in manager.stream("run", {"input": {}})]
+        assert "RunTimeout" in events[-1]
+        await wait_for_slot(manager)
+
+    asyncio.run(scenario())
+    graph.release.set()
+    assert store.get("run")["error"].startswith("RunTimeout")
+
+
+def test_a_cancel_from_another_worker_stops_the_run_at_the_next_node(monkeypatch, tmp_path, fast_supervision):
+    graph = BlockingGraph()
+    monkeypatch.setitem(sys.modules, "ollama_deep_researcher.graph", types.SimpleNamespace(graph=graph))
+    store = RunStore(str(tmp_path / "runs.db"))
+
+    async def scenario():
+        manager = RunManager(store, 1)
+        store.create("run", {}, {})
+        events = manager.stream("run", {"input": {}})
+        await events.__anext__()
+        await events.__anext__()
+        # Another worker process flags the run in the shared store
+        assert RunStore(str(tmp_path / "runs.db")).request_cancel("run")
+        graph.release.set()
+        rest = [event async for event in events]
+        assert "RunCancelled" in rest[-1]
+        await wait_for_slot(manager)
+
+    asyncio.run(scenario())
+    assert store.get("run")["status"] == "interrupted"
+
+
+def test_metrics_endpoint_reports_runs_and_llm_queues(tmp_path):
+    from starlette.testclient import TestClient
+
+    server.app.state.runs = RunManager(RunStore(str(tmp_path / "runs.db")), 3)
+    response = TestClient(server.app).get("/metrics")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["runs"] == {"active": 0, "max_concurrent": 3}
+    assert isinstance(body["llm"], dict)
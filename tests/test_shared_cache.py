@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from ollama_deep_researcher.shared_cache import SingleFlightCache
+
+
+def test_concurrent_misses_share_one_call():
+    cache = SingleFlightCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute))) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert cache.get_or_compute("key", lambda: "other") == "value"
+
+
+def test_values_are_kept_only_when_should_cache_accepts_them():
+    cache = SingleFlightCache(ttl=60)
+
+    assert cache.get_or_compute("key", lambda: [], should_cache=bool) == []
+    assert cache.get_or_compute("key", lambda: ["result"], should_cache=bool) == ["result"]
+    assert cache.get_or_compute("key", lambda: [], should_cache=bool) == ["result"]
+
+
+def test_exceptions_are_not_cached():
+    cache = SingleFlightCache(ttl=60)
+
+    def fail():
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("key", fail)
+    assert cache.get_or_compute("key", lambda: "value") == "value"
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SingleFlightCache(ttl=60, max_entries=2)
+    for key in ("a", "b"):
+        cache.get_or_compute(key, lambda: key)
+    cache.get_or_compute("a", lambda: "new")  # a is now the most recent
+    cache.get_or_compute("c", lambda: "c")
+
+    assert cache.get_or_compute("a", lambda: "new") == "a"
+    assert cache.get_or_compute("b", lambda: "new") == "new"
+
+
+def test_zero_ttl_disables_caching():
+    cache = SingleFlightCache(ttl=0)
+    cache.get_or_compute("key", lambda: "first")
+
+    assert cache.get_or_compute("key", lambda: "second") == "second"
@@ -0,0 +1,38 @@
+from ollama_deep_researcher.utils import ThinkingTokenFilter, strip_thinking_tokens
+
+
+def feed_all(chunks, **kwargs):
+    stream_filter = ThinkingTokenFilter(**kwargs)
+    visible = "".join(stream_filter.feed(chunk) for chunk in chunks) + stream_filter.flush()
+    return visible, stream_filter
+
+
+def test_tags_split_across_chunks_are_removed():
+    text = "Intro <think>private reasoning</think>answer <think>more</think>end"
+    for size in (1, 2, 3, 5, 8):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+
+        visible, _ = feed_all(chunks)
+
+        assert visible == strip_thinking_tokens(text) == "Intro answer end"
+
+
+def test_text_resembling_a_tag_is_emitted_once_the_stream_ends():
+    visible, _ = feed_all(["a < b and 2 <", "th"])
+
+    assert visible == "a < b and 2 <th"
+
+
+def test_unterminated_block_is_withheld_and_counted_against_the_budget():
+    visible, stream_filter = feed_all(["Answer<think>", "x" * 30], max_reasoning_chars=20)
+
+    assert visible == "Answer"
+    assert stream_filter.in_think
+    assert stream_filter.reasoning_chars == 30
+    assert stream_filter.budget_exceeded
+
+
+def test_no_budget_is_never_exceeded():
+    _, stream_filter = feed_all(["<think>", "x" * 1000])
+
+    assert not stream_filter.budget_exceeded
@@ -0,0 +1,19 @@
+from ollama_deep_researcher.utils import canonicalize_url, format_sources
+
+
+def test_canonicalize_url_ignores_trivial_differences():
+    assert canonicalize_url("http://www.Example.com/a/?utm_source=x&b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+    assert canonicalize_url("https://example.com:443/a?fbclid=abc") == canonicalize_url("https://example.com/a")
+    assert canonicalize_url("https://example.com:8080/a") == "https://example.com:8080/a"
+    assert canonicalize_url("https://example.com/a?id=1") != canonicalize_url("https://example.com/a?id=2")
+
+
+def test_format_sources_dedups_by_canonical_url_but_shows_the_original():
+    original = "https://www.example.com/search?q=a%20b&id&ref=home"
+    results = {"results": [
+        {"title": "First", "url": original},
+        {"title": "Duplicate", "url": "http://example.com/search?id=&q=a+b"},
+        {"title": "Other", "url": "https://example.org/"},
+    ]}
+
+    assert format_sources(results) == f"* First : {original}\n* Other : https://example.org/"